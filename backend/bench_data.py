@@ -0,0 +1,205 @@
+# Liga de prueba y las implementaciones anteriores que sirven de referencia; las usan benchmark.py y tests/
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy import inspect, or_, func, desc
+from sqlalchemy.orm import joinedload
+from database import SessionLocal, engine
+from models import Base, Category, Club, Team, Match, MatchEvent, Player, Venue, MatchDay
+from populate_data import first_names, last_names, generate_rut
+import crud
+
+CATEGORIES = [
+    {"name": "Primera Adulto", "parent_category": "Adultos", "points_win": 6, "points_draw": 3},
+    {"name": "Segunda Adulto", "parent_category": "Adultos", "points_win": 4, "points_draw": 2},
+    {"name": "Tercera Adulto", "parent_category": "Adultos", "points_win": 2, "points_draw": 1},
+    {"name": "Senior", "parent_category": None},
+    {"name": "Super Senior", "parent_category": None},
+]
+
+# Cota de queries para /clubs/{club_id}/details, independiente de la cantidad de categorías y jugadores
+CLUB_DETAILS_MAX_QUERIES = 6
+
+# --- Datos ---
+def is_scratch_database(url):
+    # Solo se borra y se vuelve a llenar una base SQLite en un archivo del directorio temporal
+    return url.get_backend_name() == "sqlite" and bool(url.database) and \
+        os.path.abspath(url.database).startswith(os.path.join(os.path.abspath(tempfile.gettempdir()), ""))
+
+def seed(n_clubs=20, rounds=10):
+    if is_scratch_database(engine.url): Base.metadata.drop_all(bind=engine)
+    elif inspect(engine).get_table_names():
+        raise RuntimeError(f"{engine.url.render_as_string()} ya tiene tablas: solo se borra una base SQLite temporal, usar una base vacía")
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    random.seed(42)
+    venue = Venue(name="Estadio Municipal de Renca", location="Domingo Santa María 3987")
+    db.add(venue)
+    cats = [Category(**c) for c in CATEGORIES]
+    db.add_all(cats)
+    clubs = [Club(name=f"Club {i}", logo_url=f"https://api.dicebear.com/7.x/identicon/svg?seed={i}", league_series="HONOR" if i % 2 else "ASCENSO") for i in range(n_clubs)]
+    db.add_all(clubs)
+    db.commit()
+
+    base_date = datetime.now() - timedelta(days=7 * rounds)
+    days = [MatchDay(name=f"Fecha {i + 1}", start_date=base_date + timedelta(days=7 * i), end_date=base_date + timedelta(days=7 * i + 6)) for i in range(rounds)]
+    db.add_all(days)
+    teams = {}
+    for club in clubs:
+        for cat in cats:
+            teams[(club.id, cat.id)] = Team(club_id=club.id, category_id=cat.id)
+    db.add_all(teams.values())
+    db.commit()
+
+    players = []
+    for team in teams.values():
+        for n in range(random.randint(15, 22)):
+            players.append(Player(team_id=team.id, name=f"{random.choice(first_names)} {random.choice(last_names)}", number=n + 1, dni=f"{generate_rut()}-{team.id}-{n}"))
+    db.add_all(players)
+
+    matches = []
+    for cat in cats:
+        for r, day in enumerate(days):
+            for series in ("HONOR", "ASCENSO"):
+                ids = [c.id for c in clubs if c.league_series == series]
+                random.shuffle(ids)
+                for h, a in zip(ids[::2], ids[1::2]):
+                    played = r < rounds - 2
+                    matches.append(Match(category_id=cat.id, match_day_id=day.id, venue_id=venue.id, home_team_id=teams[(h, cat.id)].id, away_team_id=teams[(a, cat.id)].id,
+                                         match_date=datetime.combine(day.start_date, datetime.min.time()), is_played=played,
+                                         home_score=random.randint(0, 4) if played else 0, away_score=random.randint(0, 4) if played else 0))
+    db.add_all(matches)
+    db.commit()
+    events = []
+    for m in matches:
+        if not m.is_played: continue
+        roster = [p for p in players if p.team_id in (m.home_team_id, m.away_team_id)]
+        for _ in range(random.randint(0, 4)):
+            events.append(MatchEvent(match_id=m.id, player_id=random.choice(roster).id, event_type=random.choice(["GOAL", "GOAL", "YELLOW_CARD", "RED_CARD"]), minute=random.randint(1, 90)))
+    db.add_all(events)
+    db.commit()
+    crud.rebuild_standings(db)
+    crud.rebuild_player_stats(db)
+    print(f"Datos: {len(clubs)} clubes, {len(teams)} equipos, {len(players)} jugadores, {len(matches)} partidos, {len(events)} eventos.")
+    db.close()
+
+# --- Implementaciones anteriores (referencia para comparar) ---
+def legacy_get_leaderboard(db, category_id, series="HONOR"):
+    cat = db.query(Category).filter(Category.id == category_id).first()
+    if not cat: return []
+    query = db.query(Team).join(Club).filter(Team.category_id == category_id)
+    if cat.parent_category == "Adultos":
+        query = query.filter(Club.league_series == series)
+    teams = query.all()
+    leaderboard = []
+    for team in teams:
+        stats = {"club_id": team.club.id, "club_name": team.club.name, "logo_url": team.club.logo_url, "pj": 0, "pg": 0, "pe": 0, "pp": 0, "gf": 0, "gc": 0, "dg": 0, "pts": 0}
+        matches = db.query(Match).filter(or_(Match.is_played == True, Match.home_score > 0, Match.away_score > 0), or_(Match.home_team_id == team.id, Match.away_team_id == team.id)).all()
+        for m in matches:
+            stats["pj"] += 1
+            is_home = m.home_team_id == team.id
+            gf = m.home_score if is_home else m.away_score
+            gc = m.away_score if is_home else m.home_score
+            stats["gf"] += gf; stats["gc"] += gc
+            if gf > gc: stats["pg"] += 1; stats["pts"] += cat.points_win
+            elif gf == gc: stats["pe"] += 1; stats["pts"] += cat.points_draw
+            else: stats["pp"] += 1
+        stats["dg"] = stats["gf"] - stats["gc"]
+        leaderboard.append(stats)
+    return sorted(leaderboard, key=lambda x: (x["pts"], x["dg"]), reverse=True)
+
+def legacy_get_aggregated_adultos_leaderboard(db, series="HONOR"):
+    adult_cats = db.query(Category).filter(Category.parent_category == "Adultos").all()
+    cat_ids = [c.id for c in adult_cats]
+    clubs = db.query(Club).filter(Club.league_series == series).all()
+    leaderboard = []
+    for club in clubs:
+        stats = {"club_id": club.id, "club_name": club.name, "logo_url": club.logo_url, "pts": 0, "dg": 0, "pj": 0, "pg": 0, "pe": 0, "pp": 0, "gf": 0, "gc": 0}
+        teams = db.query(Team).filter(Team.club_id == club.id, Team.category_id.in_(cat_ids)).all()
+        for team in teams:
+            cat = next(c for c in adult_cats if c.id == team.category_id)
+            matches = db.query(Match).filter(or_(Match.is_played == True, Match.home_score > 0, Match.away_score > 0), or_(Match.home_team_id == team.id, Match.away_team_id == team.id)).all()
+            for m in matches:
+                stats["pj"] += 1
+                is_home = m.home_team_id == team.id
+                gf = m.home_score if is_home else m.away_score
+                gc = m.away_score if is_home else m.home_score
+                stats["gf"] += gf; stats["gc"] += gc
+                if gf > gc: stats["pg"] += 1; stats["pts"] += cat.points_win
+                elif gf == gc: stats["pe"] += 1; stats["pts"] += cat.points_draw
+                else: stats["pp"] += 1
+        stats["dg"] = stats["gf"] - stats["gc"]
+        leaderboard.append(stats)
+    return sorted(leaderboard, key=lambda x: (x["pts"], x["dg"]), reverse=True)
+
+def legacy_get_club_full_details(db, club_id):
+    club = db.query(Club).filter(Club.id == club_id).first()
+    if not club: return None
+    categories_data = []
+    teams = db.query(Team).options(joinedload(Team.category), joinedload(Team.players)).filter(Team.club_id == club_id).all()
+    for team in teams:
+        if not team.category: continue
+        stats = {"pj": 0, "pg": 0, "pe": 0, "pp": 0, "gf": 0, "gc": 0, "pts": 0}
+        all_matches = db.query(Match).filter(or_(Match.home_team_id == team.id, Match.away_team_id == team.id)).order_by(Match.match_date.desc()).all()
+        past = []; upcoming = []
+        for m in all_matches:
+            is_home = m.home_team_id == team.id
+            opponent = db.query(Team).options(joinedload(Team.club)).filter(Team.id == (m.away_team_id if is_home else m.home_team_id)).first()
+            match_data = {"id": m.id, "opponent_name": opponent.club.name if opponent else "Rival", "home_score": m.home_score, "away_score": m.away_score, "match_date": m.match_date}
+            if m.is_played or m.home_score > 0 or m.away_score > 0:
+                stats["pj"] += 1
+                gf = m.home_score if is_home else m.away_score
+                gc = m.away_score if is_home else m.home_score
+                stats["gf"] += gf; stats["gc"] += gc
+                if gf > gc: stats["pg"] += 1; stats["pts"] += team.category.points_win
+                elif gf == gc: stats["pe"] += 1; stats["pts"] += team.category.points_draw
+                else: stats["pp"] += 1
+                past.append(match_data)
+            else: upcoming.append(match_data)
+        players = [{"id": p.id, "name": p.name, "number": p.number, "goals": db.query(MatchEvent).filter(MatchEvent.player_id == p.id, MatchEvent.event_type == "GOAL").count(), "yellow_cards": db.query(MatchEvent).filter(MatchEvent.player_id == p.id, MatchEvent.event_type == "YELLOW_CARD").count(), "red_cards": db.query(MatchEvent).filter(MatchEvent.player_id == p.id, MatchEvent.event_type == "RED_CARD").count()} for p in team.players]
+        categories_data.append({"category_name": team.category.name, "stats": stats, "players": players, "past_matches": past, "upcoming_matches": upcoming})
+    return {"id": club.id, "name": club.name, "logo_url": club.logo_url, "league_series": club.league_series, "categories": categories_data}
+
+def legacy_get_top_scorers(db, category_id, series="HONOR"):
+    # Igual al original, con desempate por Player.id para poder comparar resultados
+    query = db.query(Player.id, Player.name.label("player_name"), Club.name.label("club_name"), Club.logo_url.label("club_logo"), func.count(MatchEvent.id).label("total_goals")).join(MatchEvent, Player.id == MatchEvent.player_id).join(Team, Player.team_id == Team.id).join(Club, Team.club_id == Club.id).filter(MatchEvent.event_type == "GOAL")
+    if str(category_id) == "adultos":
+        cat_ids = [c.id for c in db.query(Category).filter(Category.parent_category == "Adultos").all()]
+        query = query.filter(Team.category_id.in_(cat_ids)).filter(Club.league_series == series)
+    else:
+        cat = db.query(Category).filter(Category.id == int(category_id)).first()
+        query = query.filter(Team.category_id == int(category_id))
+        if cat and cat.parent_category == "Adultos": query = query.filter(Club.league_series == series)
+    results = query.group_by(Player.id, Player.name, Club.name, Club.logo_url).order_by(desc("total_goals"), Player.id).limit(20).all()
+    return [{"player_id": r.id, "player_name": r.player_name, "club_name": r.club_name, "club_logo": r.club_logo, "goals": r.total_goals} for r in results]
+
+def legacy_bulk_create_players_from_excel(db, team_id, df):
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    created = 0; updated = 0; errors = []
+    col_nombre = next((c for c in df.columns if c in ['nombre', 'jugador']), None)
+    col_rut = next((c for c in df.columns if c in ['rut', 'dni']), None)
+    if not col_nombre or not col_rut: return 0, 0, ["Excel inválido."]
+    for index, row in df.iterrows():
+        try:
+            name = str(row.get(col_nombre, '')).strip(); dni = str(row.get(col_rut, '')).strip()
+            if not name or not dni: continue
+            dni_clean = dni.replace('.', '').replace('-', '').upper()
+            existing = db.query(Player).filter(Player.dni == dni_clean).first()
+            if existing: existing.name = name; existing.team_id = team_id; updated += 1
+            else: db.add(Player(team_id=team_id, name=name, dni=dni_clean)); created += 1
+            db.commit()
+        except: db.rollback(); continue
+    return created, updated, errors
+
+def generate_roster(n_rows, path):
+    # Planilla con el formato de prueba_subida_jug.xlsx y RUTs con dígito verificador válido
+    def with_dv(n):
+        total = sum(int(c) * (2 + i % 6) for i, c in enumerate(reversed(str(n))))
+        r = 11 - total % 11
+        return f"{n:,}".replace(",", ".") + "-" + ("0" if r == 11 else "K" if r == 10 else str(r))
+    import pandas as pd
+    random.seed(12)
+    ruts = random.sample(range(5_000_000, 25_000_000), n_rows)
+    pd.DataFrame({"Nombre": [f"{random.choice(first_names)} {random.choice(last_names)}" for _ in ruts], "RUT": [with_dv(n) for n in ruts],
+                  "Nacimiento": None, "Numero": [i % 30 + 1 for i in range(n_rows)]}).to_excel(path, index=False)
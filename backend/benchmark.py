@@ -0,0 +1,822 @@
+import os
+import sys
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+# El benchmark usa su propia base SQLite temporal, que se borra y se vuelve a llenar en cada corrida. Con
+# BENCH_DATABASE_URL (p.ej. Postgres para notify/jobs) la base tiene que estar vacía: seed() no borra otras bases.
+BENCH_DB = os.path.join(tempfile.gettempdir(), "renca_fc_bench.db")
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{BENCH_DB}")
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import joinedload
+from database import SessionLocal, engine
+from models import Category, Club, Team, Match, MatchEvent, Player, PlayerStats, Venue, MatchDay
+from bench_data import seed, generate_roster, legacy_get_leaderboard, legacy_get_aggregated_adultos_leaderboard, legacy_get_club_full_details, \
+    legacy_get_top_scorers, CLUB_DETAILS_MAX_QUERIES, legacy_bulk_create_players_from_excel
+import crud
+import schemas
+
+# --- Contador de queries ---
+query_count = 0
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    global query_count
+    query_count += 1
+
+# --- Medición ---
+def measure(label, fn, iterations=50):
+    global query_count
+    timings = []; queries = 0
+    for _ in range(iterations):
+        db = SessionLocal()
+        query_count = 0
+        start = time.perf_counter()
+        fn(db)
+        timings.append((time.perf_counter() - start) * 1000)
+        queries = query_count
+        db.close()
+    timings.sort()
+    p50 = timings[len(timings) // 2]
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{label:<40} queries/req={queries:<5} p50={p50:8.2f} ms  p95={p95:8.2f} ms")
+    return queries
+
+def compare(label, old_fn, new_fn):
+    db = SessionLocal()
+    ok = old_fn(db) == new_fn(db)
+    db.close()
+    print(f"{label:<40} {'OK (mismo resultado)' if ok else 'DIFERENCIAS'}")
+    return ok
+
+def bench_leaderboard():
+    db = SessionLocal()
+    cat_ids = [c.id for c in db.query(Category).all()]
+    db.close()
+    ok = True
+    for cat_id in cat_ids:
+        for series in ("HONOR", "ASCENSO"):
+            ok &= compare(f"leaderboard cat={cat_id} {series}", lambda db: legacy_get_leaderboard(db, cat_id, series), lambda db: crud.get_leaderboard(db, cat_id, series))
+    measure("leaderboard (antes)", lambda db: legacy_get_leaderboard(db, cat_ids[0], "HONOR"))
+    measure("leaderboard (después)", lambda db: crud.get_leaderboard(db, cat_ids[0], "HONOR"))
+    return ok
+
+def bench_adultos():
+    ok = True
+    for series in ("HONOR", "ASCENSO", "SIN_CLUBES"):
+        ok &= compare(f"adultos agregado {series}", lambda db: legacy_get_aggregated_adultos_leaderboard(db, series), lambda db: crud.get_aggregated_adultos_leaderboard(db, series))
+    measure("adultos agregado (antes)", lambda db: legacy_get_aggregated_adultos_leaderboard(db, "HONOR"))
+    measure("adultos agregado (después)", lambda db: crud.get_aggregated_adultos_leaderboard(db, "HONOR"))
+    return ok
+
+def bench_standings():
+    # Aplica cambios por las rutas de escritura y verifica que la tabla incremental coincida con el recálculo
+    db = SessionLocal()
+    random.seed(7)
+    matches = db.query(Match).all()
+    for m in random.sample(matches, 200):
+        crud.update_match_result(db, m.id, schemas.MatchUpdateResult(home_score=random.randint(0, 5), away_score=random.randint(0, 5), is_played=random.random() < 0.7))
+    for m in random.sample(matches, 200):
+        player = db.query(Player).filter(Player.team_id.in_([m.home_team_id, m.away_team_id])).first()
+        crud.create_match_event(db, schemas.MatchEventCreate(match_id=m.id, player_id=player.id, event_type="GOAL", minute=10))
+    for e in random.sample(db.query(MatchEvent).all(), 100):
+        crud.delete_match_event(db, e.id)
+    cat_ids = [c.id for c in db.query(Category).all()]
+    db.close()
+    ok = True
+    for cat_id in cat_ids:
+        ok &= compare(f"standings incremental cat={cat_id}", lambda db: legacy_get_leaderboard(db, cat_id, "HONOR"), lambda db: crud.get_leaderboard(db, cat_id, "HONOR"))
+    ok &= compare("standings incremental adultos", lambda db: legacy_get_aggregated_adultos_leaderboard(db, "ASCENSO"), lambda db: crud.get_aggregated_adultos_leaderboard(db, "ASCENSO"))
+    for cat_id in cat_ids + ["adultos"]:
+        ok &= compare(f"goleadores incremental cat={cat_id}", lambda db: legacy_get_top_scorers(db, cat_id, "HONOR"), lambda db: crud.get_top_scorers(db, cat_id, "HONOR"))
+    ok &= compare("detalle club incremental", lambda db: legacy_get_club_full_details(db, 1), lambda db: crud.get_club_full_details(db, 1))
+    def player_stats(db): return sorted((s.player_id, s.goals, s.yellow_cards, s.red_cards, s.appearances) for s in db.query(PlayerStats).all() if s.goals or s.yellow_cards or s.red_cards or s.appearances)
+    def rebuilt_player_stats(db): crud.rebuild_player_stats(db); return player_stats(db)
+    ok &= compare("player_stats incremental vs recálculo", player_stats, rebuilt_player_stats)
+    return ok
+
+def bench_top_scorers():
+    ok = True
+    for cat_id in (1, 4, "adultos"):
+        for series in ("HONOR", "ASCENSO"):
+            ok &= compare(f"goleadores cat={cat_id} {series}", lambda db: legacy_get_top_scorers(db, cat_id, series), lambda db: crud.get_top_scorers(db, cat_id, series))
+    measure("goleadores adultos (antes)", lambda db: legacy_get_top_scorers(db, "adultos", "HONOR"))
+    measure("goleadores adultos (después)", lambda db: crud.get_top_scorers(db, "adultos", "HONOR"))
+    return ok
+
+def bench_club_details():
+    db = SessionLocal()
+    club_ids = [c.id for c in db.query(Club).all()]
+    db.close()
+    ok = True
+    for club_id in club_ids[:4] + [0]:
+        ok &= compare(f"detalle club={club_id}", lambda db: legacy_get_club_full_details(db, club_id), lambda db: crud.get_club_full_details(db, club_id))
+    measure("detalle club (antes)", lambda db: legacy_get_club_full_details(db, club_ids[0]), iterations=5)
+    queries = measure("detalle club (después)", lambda db: crud.get_club_full_details(db, club_ids[0]))
+    if queries > CLUB_DETAILS_MAX_QUERIES:
+        print(f"ERROR: /clubs/{{club_id}}/details ejecutó {queries} queries (máximo {CLUB_DETAILS_MAX_QUERIES})")
+        ok = False
+    return ok
+
+def bench_live(n_subscribers=500, n_messages=200):
+    # Fan-out del feed SSE: muchas conexiones ociosas en un loop, publicando desde otro hilo como lo hace crud.py.
+    # Un suscriptor que nunca lee debe terminar en "resync" sin crecer en memoria ni frenar al resto.
+    import asyncio, threading
+    from live import LiveBus, LIVE_QUEUE_SIZE
+    bus = LiveBus()
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        subs = [bus.subscribe(loop, category_id=1 if i % 2 else 2) for i in range(n_subscribers)]
+        slow = bus.subscribe(loop, category_id=1)
+        received = [0]; done = asyncio.Event(); expected = (n_subscribers // 2) * n_messages
+
+        async def reader(sub):
+            while True:
+                await sub.queue.get(); received[0] += 1
+                if received[0] == expected: done.set()
+
+        readers = [asyncio.create_task(reader(s)) for s in subs]
+        start = time.perf_counter()
+        threading.Thread(target=lambda: [bus.deliver("score", {"match_id": i, "category_id": 1}) for i in range(n_messages)]).start()
+        await asyncio.wait_for(done.wait(), 30)
+        elapsed = (time.perf_counter() - start) * 1000
+        for t in readers: t.cancel()
+        return elapsed, slow
+
+    elapsed, slow = asyncio.run(run())
+    ok = slow.queue.qsize() <= LIVE_QUEUE_SIZE and slow.resyncs > 0
+    print(f"{'live fan-out':<40} subs={n_subscribers} msgs={n_messages} total={elapsed:8.2f} ms  cliente lento: cola={slow.queue.qsize()} resyncs={slow.resyncs}")
+    return ok
+
+def bench_notify(n_messages=100):
+    # LISTEN/NOTIFY entre dos "workers" (dos LiveBus con distinto origin) sobre la misma base Postgres. Cada aviso va
+    # en la transacción de una escritura: uno deshecho no llega. Correr con BENCH_DATABASE_URL=postgresql://... ; con
+    # SQLite no aplica.
+    import asyncio
+    from live import LiveBus
+    if engine.dialect.name != "postgresql":
+        print(f"{'notify entre workers':<40} omitido (requiere BENCH_DATABASE_URL de Postgres)")
+        return True
+    writer, reader = LiveBus(), LiveBus()
+    writer.attach(engine); reader.attach(engine)
+
+    async def run():
+        got = []; done = asyncio.Event()
+        def on_message(kind, data):
+            got.append((kind, data["match_id"]))
+            if len(got) == n_messages: done.set()
+        listener = asyncio.create_task(reader.listen(on_message))
+        own = asyncio.create_task(writer.listen(lambda kind, data: got.append(("propio", None))))
+        await asyncio.sleep(0.5)
+        start = time.perf_counter()
+        def write(match_id, commit=True):
+            db = SessionLocal()
+            writer.publish(db, "score", {"match_id": match_id, "category_id": 1})
+            db.commit() if commit else db.rollback()
+            db.close()
+        await asyncio.to_thread(write, -1, False)
+        for i in range(n_messages): await asyncio.to_thread(write, i)
+        await asyncio.wait_for(done.wait(), 10)
+        elapsed = (time.perf_counter() - start) * 1000
+        listener.cancel(); own.cancel()
+        return got, elapsed
+
+    got, elapsed = asyncio.run(run())
+    ok = got == [("score", i) for i in range(n_messages)]
+    print(f"{'notify entre workers':<40} msgs={n_messages} total={elapsed:8.2f} ms  {'OK (en orden, sin eco propio ni deshechos)' if ok else 'DIFERENCIAS'}")
+    return ok
+
+# Tablas que crecen con la temporada: sus lecturas en las rutas públicas tienen que ir por índice
+HOT_TABLES = ("matches", "match_events", "teams", "players", "standings", "player_stats", "audit_logs")
+
+def explain(db, statement, parameters):
+    if engine.dialect.name == "postgresql":
+        # Con tablas chicas Postgres prefiere seq scan aunque exista el índice; se desactiva para ver si es posible usarlo
+        db.execute(text("SET enable_seqscan = off"))
+        rows = db.connection().exec_driver_sql("EXPLAIN " + statement, parameters).fetchall()
+        return [r[0] for r in rows], [t for t in HOT_TABLES for r in rows if f"Seq Scan on {t} " in r[0] + " "]
+    rows = db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    return [r[-1] for r in rows], [t for t in HOT_TABLES for r in rows if r[-1].startswith(f"SCAN {t}") and "USING" not in r[-1]]
+
+def bench_indexes():
+    # Captura las queries de cada lectura y verifica con EXPLAIN que ninguna recorre completa una tabla caliente
+    db = SessionLocal()
+    club_id = db.query(Club.id).first()[0]
+    match_id = db.query(Match.id).first()[0]
+    reads = {
+        "leaderboard": lambda: crud.get_leaderboard(db, 1, "HONOR"),
+        "adultos agregado": lambda: crud.get_aggregated_adultos_leaderboard(db, "HONOR"),
+        "detalle club": lambda: crud.get_club_full_details(db, club_id),
+        "partidos categoría": lambda: crud.get_matches_by_category(db, 1, "HONOR"),
+        "jugadores partido": lambda: crud.get_match_players(db, match_id),
+        "eventos partido": lambda: crud.get_match_events(db, match_id),
+        "auditoría partido": lambda: crud.get_match_audit_logs(db, match_id),
+        "goleadores": lambda: crud.get_top_scorers(db, 1, "HONOR"),
+    }
+    ok = True
+    for label, read in reads.items():
+        captured = []
+        listener = lambda conn, cursor, statement, parameters, context, executemany: captured.append((statement, parameters))
+        event.listen(engine, "before_cursor_execute", listener)
+        try: read()
+        finally: event.remove(engine, "before_cursor_execute", listener)
+        scans = []
+        for statement, parameters in captured:
+            plan, full_scans = explain(db, statement, parameters)
+            scans += full_scans
+        db.rollback()
+        print(f"{'índices ' + label:<40} queries={len(captured):<3} {'OK (solo index scans)' if not scans else 'SCAN COMPLETO en ' + ', '.join(sorted(set(scans)))}")
+        ok &= not scans
+    db.close()
+    return ok
+
+def bench_import(n_rows=5000):
+    # /players/upload: importación fila a fila (antes) vs. normalización vectorizada + upsert por bloques (después)
+    import pandas as pd
+    global query_count
+    path = os.path.join(tempfile.gettempdir(), f"renca_fc_roster_{n_rows}.xlsx")
+    generate_roster(n_rows, path)
+    sample = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "prueba_subida_jug.xlsx")
+    db = SessionLocal()
+    team_a, team_b = [t.id for t in db.query(Team).limit(2).all()]
+    db.close()
+    ok = True
+    for label, fn in (("antes", legacy_bulk_create_players_from_excel), ("después", crud.bulk_create_players_from_excel)):
+        for run, team_id in (("nuevos", team_a), ("existentes", team_b)):
+            db = SessionLocal()
+            if run == "nuevos": db.query(Player).filter(Player.dni.in_(pd.read_excel(path)["RUT"].str.replace(r"[.\-]", "", regex=True).tolist())).delete(synchronize_session=False); db.commit()
+            df = pd.read_excel(path)
+            query_count = 0
+            start = time.perf_counter()
+            created, updated, errors = fn(db, team_id, df)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{'importación ' + str(n_rows) + ' ' + run + ' (' + label + ')':<40} queries={query_count:<6} total={elapsed:9.2f} ms  creados={created} actualizados={updated} errores={len(errors)}")
+            ok &= (created, updated) == ((n_rows, 0) if run == "nuevos" else (0, n_rows))
+            db.close()
+    db = SessionLocal()
+    created, updated, errors = crud.bulk_create_players_from_excel(db, team_a, pd.read_excel(sample))
+    db.close()
+    print(f"{'importación prueba_subida_jug.xlsx':<40} creados={created} actualizados={updated}")
+    for e in errors: print(f"{'':<40} {e}")
+    return ok
+
+def bench_league_import(n_rows=20000):
+    # Importación por liga (club + categoría por fila) leída por bloques: memoria pico acotada por IMPORT_BATCH_SIZE
+    import tracemalloc
+    import pandas as pd
+    from roster_import import iter_roster_chunks
+    db = SessionLocal()
+    teams = db.query(Club.name, Category.name).join(Team, Team.club_id == Club.id).join(Category, Team.category_id == Category.id).all()
+    db.close()
+    path = os.path.join(tempfile.gettempdir(), f"renca_fc_liga_{n_rows}.xlsx")
+    generate_roster(n_rows, path)
+    df = pd.read_excel(path)
+    random.seed(3)
+    picks = [random.choice(teams) for _ in range(n_rows)]
+    df["Club"] = [c for c, _ in picks]; df["Categoria"] = [k.upper() for _, k in picks]  # mayúsculas: el cruce no distingue
+    df.loc[0, "Club"] = "Club Inexistente"
+    df.to_excel(path, index=False); df.to_csv(path.replace(".xlsx", ".csv"), index=False, sep=";")
+    ok = True
+    def run(file, traced):
+        db = SessionLocal()
+        db.query(Player).filter(Player.dni.in_(df["RUT"].str.replace(r"[.\-]", "", regex=True).tolist())).delete(synchronize_session=False); db.commit()
+        if traced: tracemalloc.start()
+        start = time.perf_counter()
+        totals = crud.import_league_roster(db, iter_roster_chunks(file))
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] / 2**20 if traced else None
+        if traced: tracemalloc.stop()
+        db.close()
+        return totals, elapsed, peak
+    for file in (path, path.replace(".xlsx", ".csv")):
+        # Velocidad y memoria en corridas separadas: tracemalloc hace mucho más lenta la importación
+        totals, elapsed, _ = run(file, False)
+        _, _, peak = run(file, True)
+        print(f"{'liga ' + os.path.basename(file):<40} filas={totals['rows']} creados={totals['created']} errores={totals['error_count']} {totals['rows'] / elapsed:8.0f} filas/s  memoria pico={peak:6.1f} MB")
+        ok &= totals["created"] == n_rows - 1 and totals["error_count"] == 1
+    tracemalloc.start()
+    pd.read_excel(path)
+    print(f"{'referencia: pd.read_excel completo':<40} memoria pico={tracemalloc.get_traced_memory()[1] / 2**20:6.1f} MB")
+    tracemalloc.stop()
+    return ok
+
+def bench_async_reads(concurrency=64, seconds=10):
+    # Prueba de carga de las lecturas públicas con uvicorn: motor síncrono en el threadpool (antes) vs. ASYNC_DB=1
+    # (asyncpg/aiosqlite, después). CACHE_TTL_SECONDS=0 para que cada request llegue a la base.
+    import asyncio, subprocess, httpx
+    paths = ["/clubs", "/matches/1", "/matches/1/players", "/matches/1/events", "/leaderboard/1", "/top-scorers/1", "/teams/1/players", "/match-days"]
+
+    async def load(port):
+        timings = []; errors = [0]
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30, limits=httpx.Limits(max_connections=concurrency)) as client:
+            deadline = time.perf_counter() + seconds
+            async def worker(i):
+                n = i
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try: ok = (await client.get(paths[n % len(paths)])).status_code == 200
+                    except httpx.TransportError: ok = False
+                    if not ok: errors[0] += 1
+                    n += 1
+                    timings.append((time.perf_counter() - start) * 1000)
+            await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        return timings, errors[0]
+
+    results = {}
+    for label, async_db in (("sync (threadpool)", "0"), ("async (ASYNC_DB=1)", "1")):
+        port = 8765 + int(async_db)
+        env = dict(os.environ, ASYNC_DB=async_db, CACHE_TTL_SECONDS="0", AUTO_MIGRATE="0")
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"], env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+        try:
+            for _ in range(100):
+                try: httpx.get(f"http://127.0.0.1:{port}/categories"); break
+                except httpx.TransportError: time.sleep(0.1)
+            timings, errors = asyncio.run(load(port))
+        finally:
+            server.terminate(); server.wait()
+        timings.sort()
+        results[label] = len(timings) / seconds
+        print(f"{'lecturas ' + label:<40} conc={concurrency} req/s={results[label]:8.1f}  p50={timings[len(timings) // 2]:8.2f} ms  p95={timings[int(len(timings) * 0.95)]:8.2f} ms  errores={errors}")
+    return all(results.values())
+
+def bench_auth(iterations=2000):
+    # Costo de autenticar un request: antes decode + SELECT por username en cada request; después decode + user_cache
+    import asyncio
+    from jose import jwt
+    import main
+    from cache import user_cache
+    from models import User
+    db = SessionLocal()
+    user = db.query(User).filter(User.username == "bench_admin").first()
+    if not user:
+        user = User(username="bench_admin", hashed_password="x", role="admin"); db.add(user); db.commit(); db.refresh(user)
+    token = jwt.encode({"sub": user.username, "uid": user.id, "role": user.role, "exp": datetime.utcnow() + timedelta(hours=1)}, main.SECRET_KEY, algorithm=main.ALGORITHM)
+    db.close()
+
+    def legacy(db):
+        username = jwt.decode(token, main.SECRET_KEY, algorithms=[main.ALGORITHM]).get("sub")
+        return crud.get_user_by_username(db, username=username).username == "bench_admin"
+
+    loop = asyncio.new_event_loop()
+    def current(db): return loop.run_until_complete(main.user_from_token(token)).role == "admin"
+    user_cache.clear()
+    global query_count
+    timings = {}
+    for label, fn in (("auth antes (SELECT por request)", legacy), ("auth después (user_cache)", current)):
+        session = SessionLocal(); query_count = 0
+        start = time.perf_counter()
+        ok = all(fn(session) for _ in range(iterations))
+        timings[label] = (time.perf_counter() - start) / iterations * 1e6
+        session.close()
+        print(f"{label:<40} queries={query_count:<6} por request={timings[label]:8.1f} µs  {'OK' if ok else 'ERROR'}")
+    loop.close()
+    return ok
+
+def bench_login(n_logins=16):
+    # n_logins logins simultáneos a /token mientras una tarea mide el atraso del loop (tick cada 10 ms).
+    # Antes: bcrypt.checkpw dentro de la ruta async (bloquea el loop); después: run_bcrypt en su pool.
+    import asyncio, httpx
+    import main
+    from models import User
+    db = SessionLocal()
+    db.query(User).filter(User.username == "bench_login").delete()
+    db.add(User(username="bench_login", hashed_password=main.get_password_hash("clave"), role="operator")); db.commit()
+    hashed = db.query(User.hashed_password).filter(User.username == "bench_login").scalar()
+    db.close()
+
+    async def legacy_login():
+        main.verify_password("clave", hashed)
+
+    async def run(label, login):
+        lag = [0.0]; stop = asyncio.Event()
+        async def ticker():
+            loop = asyncio.get_running_loop()
+            while not stop.is_set():
+                start = loop.time(); await asyncio.sleep(0.01)
+                lag[0] = max(lag[0], (loop.time() - start - 0.01) * 1000)
+        tick = asyncio.create_task(ticker()); await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(login() for _ in range(n_logins)))
+        elapsed = (time.perf_counter() - start) * 1000
+        stop.set(); await tick
+        print(f"{label:<40} logins={n_logins} total={elapsed:8.1f} ms  atraso máx. del loop={lag[0]:8.1f} ms")
+        return results, lag[0]
+
+    async def main_run():
+        await run("login antes (bcrypt en el loop)", legacy_login)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+            async def login(): return (await client.post("/token", data={"username": "bench_login", "password": "clave"})).status_code
+            await login()  # calienta imports y conexiones, fuera de la medición
+            statuses, lag = await run(f"login después (pool bcrypt x{main.BCRYPT_MAX_WORKERS})", login)
+        # Cliente y servidor comparten el loop en la medición; el criterio es que ningún hash lo detenga entero
+        start = time.perf_counter(); main.verify_password("clave", hashed); one_hash = (time.perf_counter() - start) * 1000
+        print(f"{'referencia: un bcrypt.checkpw':<40} {one_hash:8.1f} ms")
+        return all(s == 200 for s in statuses) and lag < one_hash
+
+    ok = asyncio.run(main_run())
+    # Cambio de costo: el siguiente login guarda un hash con el costo nuevo
+    import security
+    rounds = security.BCRYPT_ROUNDS; security.BCRYPT_ROUNDS = 4
+    try:
+        from fastapi.testclient import TestClient
+        with TestClient(main.app) as client: client.post("/token", data={"username": "bench_login", "password": "clave"})
+        db = SessionLocal()
+        rehashed = db.query(User.hashed_password).filter(User.username == "bench_login").scalar()
+        db.close()
+    finally: security.BCRYPT_ROUNDS = rounds
+    print(f"{'rehash al cambiar BCRYPT_ROUNDS':<40} {hashed[:7]} -> {rehashed[:7]}  {'OK' if rehashed.startswith('$2b$04$') else 'ERROR'}")
+    return ok and rehashed.startswith("$2b$04$")
+
+def bench_audit(n_logs=20000, page=100):
+    # /audit-logs: antes una query de logs + carga perezosa de partido, equipos y clubes por fila; después una sola
+    # query con joins. Página profunda: OFFSET (recorre todo lo anterior) contra keyset sobre (timestamp, id).
+    from models import AuditLog, User
+    db = SessionLocal()
+    db.query(AuditLog).delete()
+    user = db.query(User).filter(User.username == "bench_audit").first()
+    if not user:
+        user = User(username="bench_audit", hashed_password="x", role="operator"); db.add(user); db.commit(); db.refresh(user)
+    match_ids = [m for (m,) in db.query(Match.id)]
+    start_ts = datetime(2026, 3, 1)
+    db.bulk_insert_mappings(AuditLog, [{"match_id": random.choice(match_ids), "user_id": user.id if i % 3 else None, "action": "EVENT",
+                                        "details": f"GOAL - Jugador {i}", "timestamp": start_ts + timedelta(seconds=i * 7)} for i in range(n_logs)])
+    db.commit(); db.close()
+
+    def legacy(db):
+        logs = db.query(AuditLog).options(joinedload(AuditLog.user)).order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(page).all()
+        return [{"id": l.id, "user_name": l.user.username if l.user else "Sistema",
+                 "match_info": f"{l.match.home_team.club.name} vs {l.match.away_team.club.name}" if l.match else "N/A"} for l in logs]
+    def current(db): return [{k: r[k] for k in ("id", "user_name", "match_info")} for r in crud.get_audit_logs(db, page)]
+
+    ok = compare("audit-logs página 1", legacy, current)
+    old_q = measure("audit-logs antes (lazy por fila)", legacy)
+    new_q = measure("audit-logs después (una query)", current)
+    # Última página: la posición del cursor se toma una vez, fuera de la medición
+    offset = n_logs - page
+    db = SessionLocal()
+    edge = db.query(AuditLog.timestamp, AuditLog.id).order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).offset(offset - 1).first()
+    db.close()
+    def deep_offset(db): return [r.id for r in db.execute(crud._audit_log_query().order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).offset(offset).limit(page))]
+    def deep_keyset(db): return [r["id"] for r in crud.get_audit_logs(db, page, after=tuple(edge))]
+    ok = compare(f"audit-logs página en fila {offset}", deep_offset, deep_keyset) and ok
+    measure("página profunda con OFFSET", deep_offset)
+    measure("página profunda con keyset", deep_keyset)
+    db = SessionLocal()
+    start = time.perf_counter()
+    exported = sum(1 for _ in crud.iter_audit_logs(db))
+    db.close()
+    print(f"{'exportación completa (iter_audit_logs)':<40} filas={exported:<6} total={(time.perf_counter() - start) * 1000:8.1f} ms")
+    return ok and new_q == 1 and old_q > new_q and exported == n_logs
+
+def bench_snapshot(iterations=50):
+    # Refresco del dashboard público de una categoría: antes /matches + /leaderboard + /top-scorers (tres requests,
+    # tres sesiones); después /snapshot. Sin caché (se vacía antes de cada refresco) y con caché.
+    from fastapi.testclient import TestClient
+    import main
+    from cache import response_cache
+    checkouts = [0]
+    event.listen(engine, "checkout", lambda *a: checkouts.__setitem__(0, checkouts[0] + 1))
+    with TestClient(main.app) as client:
+        def legacy(category_id, series="HONOR"):
+            board = f"/leaderboard/aggregated/adultos?series={series}" if category_id == "adultos" else f"/leaderboard/{category_id}?series={series}"
+            matches = [] if category_id == "adultos" else client.get(f"/matches/{category_id}?series={series}").json()
+            return {"matches": matches, "standings": client.get(board).json(), "top_scorers": client.get(f"/top-scorers/{category_id}?series={series}").json()}
+        def current(category_id, series="HONOR"):
+            data = client.get(f"/snapshot/{category_id}?series={series}").json()
+            return {k: data[k] for k in ("matches", "standings", "top_scorers")}
+        ok = True
+        for category_id in ("1", "4", "adultos"):
+            for series in ("HONOR", "ASCENSO"):
+                response_cache.clear(); same = legacy(category_id, series) == current(category_id, series)
+                ok = ok and same
+        print(f"{'snapshot vs. tres endpoints':<40} {'OK (mismo resultado)' if ok else 'DIFERENCIAS'}")
+        global query_count
+        for cached in (False, True):
+            for label, fn in (("antes (3 requests)", legacy), ("después (/snapshot)", current)):
+                timings = []; queries = sessions = 0
+                for _ in range(iterations):
+                    if not cached: response_cache.clear()
+                    query_count = 0; checkouts[0] = 0
+                    start = time.perf_counter(); fn("1")
+                    timings.append((time.perf_counter() - start) * 1000)
+                    queries, sessions = query_count, checkouts[0]
+                timings.sort()
+                print(f"{('con caché ' if cached else 'sin caché ') + label:<40} queries={queries:<3} sesiones={sessions:<3} p50={timings[len(timings) // 2]:8.2f} ms  p95={timings[int(len(timings) * 0.95)]:8.2f} ms")
+        # Un resultado cargado cambia version y ETag del snapshot de su categoría
+        first = client.get("/snapshot/1")
+        match_id = first.json()["matches"][0]["id"]
+        token = main.jwt.encode({"sub": "bench_snapshot", "role": "admin", "exp": datetime.utcnow() + timedelta(minutes=5)}, main.SECRET_KEY, algorithm=main.ALGORITHM)
+        db = SessionLocal()
+        from models import User
+        if not db.query(User).filter(User.username == "bench_snapshot").first(): db.add(User(username="bench_snapshot", hashed_password="x", role="admin")); db.commit()
+        db.close()
+        client.put(f"/matches/{match_id}/result", json={"home_score": 9, "away_score": 0, "is_played": True}, headers={"Authorization": f"Bearer {token}"})
+        after = client.get("/snapshot/1", headers={"If-None-Match": first.headers["etag"]})
+        updated = after.status_code == 200 and after.json()["version"] != first.json()["version"] and \
+            next(m for m in after.json()["matches"] if m["id"] == match_id)["home_score"] == 9
+        print(f"{'snapshot tras cargar un resultado':<40} {'OK (version y datos nuevos)' if updated else 'ERROR'}")
+    return ok and updated
+
+def bench_delta():
+    # /matches/{id}: lista completa contra ?since=<versión> después de un cambio de resultado, un gol, una tarjeta
+    # y un evento borrado. La copia local armada con los deltas tiene que quedar igual a la lista completa.
+    from fastapi.testclient import TestClient
+    import main
+    from models import User
+    db = SessionLocal()
+    if not db.query(User).filter(User.username == "bench_delta").first(): db.add(User(username="bench_delta", hashed_password="x", role="admin")); db.commit()
+    category_id = 1
+    events_before = {e.id for e in db.query(MatchEvent.id).join(Match).filter(Match.category_id == category_id)}
+    db.close()
+    token = main.jwt.encode({"sub": "bench_delta", "role": "admin", "exp": datetime.utcnow() + timedelta(minutes=5)}, main.SECRET_KEY, algorithm=main.ALGORITHM)
+    auth = {"Authorization": f"Bearer {token}"}
+    with TestClient(main.app) as client:
+        full = client.get(f"/matches/{category_id}")
+        version = int(full.headers["x-data-version"])
+        local = {m["id"]: m for m in full.json()}
+        local_events = set(events_before)
+        empty = client.get(f"/matches/{category_id}?since={version}")
+        matches = full.json()
+        db = SessionLocal()
+        home = db.query(Player.id).filter(Player.team_id == matches[1]["home_team_id"]).first()[0]
+        removed = db.query(MatchEvent.id).filter(MatchEvent.match_id.in_([m["id"] for m in matches[3:]])).first()[0]
+        db.close()
+        client.put(f"/matches/{matches[0]['id']}/result", json={"home_score": 3, "away_score": 1, "is_played": True}, headers=auth)
+        client.post("/match-events", json={"match_id": matches[1]["id"], "player_id": home, "event_type": "GOAL", "minute": 10}, headers=auth)
+        client.post("/match-events", json={"match_id": matches[1]["id"], "player_id": home, "event_type": "YELLOW_CARD", "minute": 20}, headers=auth)
+        client.delete(f"/match-events/{removed}", headers=auth)
+        delta = client.get(f"/matches/{category_id}?since={version}")
+        changes = delta.json()
+        local.update({m["id"]: m for m in changes["matches"]})
+        local_events = (local_events | {e["id"] for e in changes["events"]}) - set(changes["deleted_event_ids"])
+        after = client.get(f"/matches/{category_id}")
+        db = SessionLocal()
+        events_after = {e.id for e in db.query(MatchEvent.id).join(Match).filter(Match.category_id == category_id)}
+        db.close()
+        same = sorted(local.values(), key=lambda m: m["id"]) == sorted(after.json(), key=lambda m: m["id"]) and local_events == events_after
+        print(f"{'lista completa':<40} partidos={len(full.json()):<4} bytes={len(full.content):>8}")
+        print(f"{'?since sin cambios':<40} partidos={len(empty.json()['matches']):<4} bytes={len(empty.content):>8}")
+        print(f"{'?since tras 4 cambios':<40} partidos={len(changes['matches']):<4} eventos={len(changes['events'])} borrados={len(changes['deleted_event_ids'])} bytes={len(delta.content):>8}")
+        print(f"{'copia local + delta = lista completa':<40} {'OK' if same else 'DIFERENCIAS'}  versión {version} -> {changes['version']}")
+        # Renombrar un jugador cambia sus eventos (llevan nombre y número): vuelven en el delta siguiente
+        db = SessionLocal()
+        crud.update_player(db, home, schemas.PlayerUpdate(name="Jugador Renombrado", number=99))
+        db.close()
+        renamed = client.get(f"/matches/{category_id}?since={changes['version']}").json()
+        touched = [e for e in renamed["events"] if e["player_id"] == home]
+        renamed_ok = bool(touched) and all(e["player"]["name"] == "Jugador Renombrado" and e["player"]["number"] == 99 for e in touched)
+        print(f"{'?since tras renombrar un jugador':<40} eventos={len(renamed['events'])}  {'OK' if renamed_ok else 'ERROR'}")
+    return same and renamed_ok and len(changes["matches"]) >= 2 and removed in changes["deleted_event_ids"] and not empty.json()["matches"]
+
+def bench_serialize(sizes=(1000, 10000), iterations=5):
+    # /clubs y /matches/{id} con n filas: antes objetos ORM + schemas.Club/schemas.Match (from_attributes) y el
+    # encoder de FastAPI (validación del response_model + dump + json.dumps) en cada respuesta; después consultas
+    # por columnas a dicts (crud.get_*_rows) y to_json de pydantic-core una vez por llenado de caché.
+    import json
+    from pydantic import TypeAdapter
+    from pydantic_core import to_json
+    from typing import List
+    adapters = {"clubs": TypeAdapter(List[schemas.Club]), "matches": TypeAdapter(List[schemas.Match])}
+    fastapi_encode = lambda kind, models: json.dumps(adapters[kind].dump_python(adapters[kind].validate_python(models, from_attributes=True), mode="json"),
+                                                     ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+    ok = True
+    for n in sizes:
+        db = SessionLocal()
+        category = Category(name=f"Serie Bench {n}", points_win=3, points_draw=1)
+        day = MatchDay(name=f"Fecha Bench {n}", start_date=datetime(2026, 9, 1).date(), end_date=datetime(2026, 9, 2).date())
+        db.add_all([category, day]); db.flush()
+        clubs = [Club(name=f"Club Bench {n}-{i}", league_series="HONOR") for i in range(n)]
+        db.add_all(clubs); db.flush()
+        teams = [Team(club_id=c.id, category_id=category.id) for c in clubs]
+        db.add_all(teams); db.flush()
+        venue_id = db.query(Venue.id).scalar()
+        db.bulk_insert_mappings(Match, [{"category_id": category.id, "match_day_id": day.id, "home_team_id": teams[i].id, "away_team_id": teams[(i + 1) % n].id,
+                                         "venue_id": venue_id, "match_date": datetime(2026, 9, 1) + timedelta(minutes=i)} for i in range(n)])
+        db.commit()
+        category_id = category.id
+        db.close()
+        paths = {"clubs": (lambda db: crud.get_clubs(db), lambda db: crud.get_club_rows(db)),
+                 "matches": (lambda db: crud.get_matches_by_category(db, category_id), lambda db: crud.get_match_rows(db, category_id))}
+        for kind, (old_load, new_load) in paths.items():
+            def run(label, load, encode):
+                timings = {"carga": [], "json": []}
+                for _ in range(iterations):
+                    db = SessionLocal()
+                    start = time.perf_counter(); rows = load(db); loaded = time.perf_counter()
+                    body = encode(rows); timings["carga"].append((loaded - start) * 1000); timings["json"].append((time.perf_counter() - loaded) * 1000)
+                    db.close()
+                load_ms, json_ms = (sorted(t)[len(t) // 2] for t in timings.values())
+                print(f"{kind + ' ' + label:<40} filas={len(rows):<6} carga={load_ms:8.1f} ms  json={json_ms:8.1f} ms  total={load_ms + json_ms:8.1f} ms")
+                return body, json_ms
+            old_body, old_json = run("antes (ORM + schemas)", lambda db: [adapters[kind].validate_python([r], from_attributes=True)[0] for r in old_load(db)],
+                                     lambda models: fastapi_encode(kind, models))
+            new_body, _ = run("después (filas + to_json)", new_load, to_json)
+            same = sorted(json.loads(old_body), key=lambda r: r["id"]) == sorted(json.loads(new_body), key=lambda r: r["id"])
+            print(f"{kind + ' mismo JSON':<40} {'OK' if same else 'DIFERENCIAS'}  respuesta cacheada: antes {old_json:.1f} ms por request, después 0 (bytes)")
+            ok = ok and same
+        db = SessionLocal()
+        db.query(Match).filter(Match.category_id == category_id).delete()
+        db.query(Team).filter(Team.category_id == category_id).delete()
+        db.query(Club).filter(Club.name.like(f"Club Bench {n}-%")).delete(synchronize_session=False)
+        db.query(Category).filter(Category.id == category_id).delete(); db.query(MatchDay).filter(MatchDay.name == f"Fecha Bench {n}").delete()
+        db.commit(); db.close()
+    return ok
+
+def bench_wire(category_id=1):
+    # Bytes en la red de una categoría completa: /matches y /snapshot en full y lite, sin comprimir, gzip y br.
+    # La versión lite, rearmada con sus tablas, tiene que dar los mismos partidos que la full.
+    from fastapi.testclient import TestClient
+    import main
+    ok = True
+    with TestClient(main.app) as client:
+        for path in (f"/matches/{category_id}", f"/snapshot/{category_id}?series=HONOR"):
+            sizes = {}
+            bodies = {}
+            for view in ("full", "lite"):
+                url = f"{path}{'&' if '?' in path else '?'}view={view}"
+                for encoding in ("identity", "gzip", "br"):
+                    r = client.get(url, headers={"Accept-Encoding": encoding})
+                    sizes[(view, encoding)] = r.num_bytes_downloaded
+                    ok = ok and r.headers.get("content-encoding", "identity") == encoding
+                    bodies.setdefault(view, r.json())
+                    ok = ok and r.json() == bodies[view]
+            full, lite = bodies["full"], bodies["lite"]
+            full_matches = full if isinstance(full, list) else full["matches"]
+            rebuilt = [{**m, "home_club": lite["clubs"].get(str(m["home_club_id"])), "away_club": lite["clubs"].get(str(m["away_club_id"])),
+                        "venue": lite["venues"].get(str(m["venue_id"]))} for m in lite["matches"]]
+            same = [(m["id"], m["home_team"]["club"], m["away_team"]["club"], m["venue"], m["home_score"], m["match_date"]) for m in full_matches] == \
+                   [(m["id"], m["home_club"], m["away_club"], m["venue"], m["home_score"], m["match_date"]) for m in rebuilt]
+            ok = ok and same
+            print(f"{path:<40} partidos={len(full_matches):<4} lite rearmado = full: {'OK' if same else 'DIFERENCIAS'}")
+            for view in ("full", "lite"):
+                print(f"{'  ' + view:<40} " + "  ".join(f"{enc}={sizes[(view, enc)]:>7} B" for enc in ("identity", "gzip", "br")))
+        # Respuestas sin bytes precomprimidos: las comprime el middleware si superan el umbral
+        big = client.get(f"/teams/{category_id}", headers={"Accept-Encoding": "br, gzip"})
+        small = client.get("/categories", headers={"Accept-Encoding": "br, gzip"})
+        print(f"{'middleware /teams (' + str(len(big.content)) + ' B)':<40} Content-Encoding={big.headers.get('content-encoding')}  en la red={big.num_bytes_downloaded} B")
+        print(f"{'middleware /categories (' + str(len(small.content)) + ' B)':<40} Content-Encoding={small.headers.get('content-encoding')}  (bajo el umbral)")
+        ok = ok and big.headers.get("content-encoding") == "br" and ("content-encoding" in small.headers) == (len(small.content) >= main.COMPRESS_MIN_BYTES)
+    return ok
+
+def bench_matches_filters(category_id=1, page=7):
+    # /matches/{id} con filtros y keyset: recorrer las páginas tiene que dar la lista filtrada completa, también los
+    # partidos sin fecha (van al final), sin repetir ni saltar filas. Bytes de la fecha en curso contra la temporada.
+    from fastapi.testclient import TestClient
+    import main
+    from cache import response_cache
+    db = SessionLocal()
+    team_ids = [t for (t,) in db.query(Team.id).filter(Team.category_id == category_id).order_by(Team.id).limit(6)]
+    undated = [Match(category_id=category_id, home_team_id=team_ids[i], away_team_id=team_ids[i + 1]) for i in range(0, 6, 2)]
+    db.add_all(undated); db.commit()
+    undated_ids = {m.id for m in undated}
+    days = db.query(MatchDay).order_by(MatchDay.start_date).all()
+    today = datetime.now().date()
+    current = next((d for d in days if d.end_date >= today), days[-1])
+    match_id = db.query(Match.id).filter(Match.category_id == category_id, Match.match_date.isnot(None)).first()[0]
+    db.close()
+    response_cache.clear()
+    ok = True
+    with TestClient(main.app) as client:
+        def walk(url, limit):
+            rows, cursor, requests = [], None, 0
+            while True:
+                r = client.get(f"{url}{'&' if '?' in url else '?'}limit={limit}" + (f"&cursor={cursor}" if cursor else ""))
+                rows += r.json(); requests += 1
+                if not (cursor := r.headers.get("x-next-cursor")): return rows, requests
+        full = client.get(f"/matches/{category_id}").json()
+        day_of = lambda m: m["match_date"] and m["match_date"][:10]
+        cases = {"todos": ("", lambda m: True),
+                 "match_day_id": (f"match_day_id={current.id}", lambda m: m["match_day_id"] == current.id),
+                 "from": (f"from={current.start_date}", lambda m: day_of(m) and day_of(m) >= str(current.start_date)),
+                 "to": (f"to={current.start_date}", lambda m: day_of(m) and day_of(m) <= str(current.start_date)),
+                 "is_played=false": ("is_played=false", lambda m: not m["is_played"]),
+                 "is_played=true + fechas": (f"is_played=true&from={days[0].start_date}&to={days[2].end_date}",
+                                             lambda m: m["is_played"] and day_of(m) and str(days[0].start_date) <= day_of(m) <= str(days[2].end_date))}
+        for label, (query, keep) in cases.items():
+            url = f"/matches/{category_id}" + (f"?{query}" if query else "")
+            expected = [m["id"] for m in full if keep(m)]
+            filtered = [m["id"] for m in client.get(url).json()]
+            paged, requests = walk(url, page)
+            paged = [m["id"] for m in paged]
+            same = filtered == expected == paged and len(set(paged)) == len(paged)
+            ok = ok and same and bool(expected)
+            print(f"{'filtro ' + label:<40} partidos={len(expected):<5} páginas de {page}={requests:<4} {'OK' if same else 'DIFERENCIAS'}")
+        last = [m["id"] for m in full[-len(undated_ids):]] == sorted(undated_ids)
+        ok = ok and last
+        print(f"{'partidos sin fecha al final':<40} {'OK' if last else 'ERROR'}")
+        bad = [client.get(f"/matches/{category_id}?limit=5&cursor=xyz").status_code, client.get(f"/matches/{category_id}?since=0&limit=5").status_code]
+        ok = ok and bad == [400, 400]
+        print(f"{'cursor inválido / since con limit':<40} {bad}")
+        season = client.get(f"/snapshot/{category_id}?view=lite")
+        round_only = client.get(f"/snapshot/{category_id}?view=lite&from={current.start_date}")
+        print(f"{'/snapshot lite temporada':<40} partidos={len(season.json()['matches']):<5} bytes={len(season.content):>8}")
+        print(f"{'/snapshot lite desde la fecha en curso':<40} partidos={len(round_only.json()['matches']):<5} bytes={len(round_only.content):>8}")
+        ok = ok and 0 < len(round_only.json()["matches"]) < len(season.json()["matches"])
+        # Planteles del partido: las páginas juntan los dos completos; team_id deja uno
+        everyone = [p["id"] for p in client.get(f"/matches/{match_id}/players").json()]
+        paged, requests = walk(f"/matches/{match_id}/players", 5)
+        home_team = next(m["home_team_id"] for m in full if m["id"] == match_id)
+        home_only = client.get(f"/matches/{match_id}/players?team_id={home_team}").json()
+        same = sorted(everyone) == [p["id"] for p in paged] and len(set(everyone)) == len(everyone) and \
+            bool(home_only) and all(p["team_id"] == home_team for p in home_only) and len(home_only) < len(everyone)
+        ok = ok and same
+        print(f"{'jugadores del partido paginados':<40} jugadores={len(everyone):<4} páginas de 5={requests:<4} {'OK' if same else 'DIFERENCIAS'}")
+    db = SessionLocal()
+    db.query(Match).filter(Match.id.in_(undated_ids)).delete(synchronize_session=False); db.commit(); db.close()
+    response_cache.clear()
+    # Planes de la fecha en curso y de los pendientes
+    db = SessionLocal()
+    for label, criteria in (("match_day_id", {"match_day_id": current.id}), ("is_played", {"is_played": False})):
+        stmt = db.query(Match.id).filter(Match.category_id == category_id, *crud._match_criteria(**criteria)).order_by(*crud.MATCH_ORDER).limit(page).statement
+        plan, scans = explain(db, str(stmt.compile(engine, compile_kwargs={"literal_binds": True})), {})
+        print(f"{'plan ' + label:<40} {' | '.join(l.strip() for l in plan if 'matches' in l)}")
+        ok = ok and "matches" not in scans
+    db.close()
+    return ok
+
+def bench_cache_race(category_id=1):
+    # Un resultado confirma mientras /leaderboard y /snapshot están cargando: la entrada cargada queda con la versión
+    # anterior, así la siguiente lectura vuelve a la BD en vez de servir la tabla vieja con el ETag nuevo, y el ETag
+    # que recibe el cliente es el de la versión con la que se cargó lo que recibió.
+    from fastapi.testclient import TestClient
+    import main
+    db = SessionLocal()
+    match_id = db.query(Match.id).filter(Match.category_id == category_id).first()[0]
+    db.close()
+    real_read, pending = main.db_read, []
+    async def racing_read(fn, *args, **kwargs):
+        rows = await real_read(fn, *args, **kwargs)
+        while pending:
+            db = SessionLocal()
+            crud.update_match_result(db, match_id, schemas.MatchUpdateResult(home_score=pending.pop(), away_score=0, is_played=True))
+            db.close(); main.invalidate_match_data(category_id)
+        return rows
+    main.db_read = racing_read
+    ok = True
+    goals = lambda body: sum(r["gf"] for r in (body if isinstance(body, list) else body["standings"]))
+    try:
+        with TestClient(main.app) as client:
+            for n, path in enumerate((f"/leaderboard/{category_id}", f"/snapshot/{category_id}")):
+                pending.append(11 + n)
+                first = client.get(path)
+                second = client.get(path, headers={"If-None-Match": first.headers["etag"]})
+                third = client.get(path, headers={"If-None-Match": second.headers.get("etag", "")})
+                fresh = second.status_code == 200 and goals(second.json()) != goals(first.json()) and third.status_code == 304
+                ok = ok and fresh
+                print(f"{path + ' con escritura durante la carga':<40} {first.status_code} -> {second.status_code} -> {third.status_code}  {'OK (datos nuevos)' if fresh else 'ERROR (entrada vieja)'}")
+                # ETag débil (vale para identity, gzip y br) con Vary: Accept-Encoding, también en el 304
+                headers = [first.headers, third.headers]
+                weak = all(h["etag"].startswith('W/"') and "Accept-Encoding" in h.get("vary", "") for h in headers)
+                ok = ok and weak
+                print(f"{'  ETag débil + Vary en 200 y 304':<40} {'OK' if weak else 'ERROR'}  {first.headers['etag']}")
+    finally:
+        main.db_read = real_read
+    return ok
+
+def bench_jobs(lease=1.5):
+    # Dos workers sobre la misma tabla jobs: el arranque de B no marca FAILED el job que A sigue corriendo (renueva
+    # su heartbeat), sí el que quedó sin heartbeat. Mientras corre el handler, el job ocupa una sola conexión.
+    import jobs
+    from models import Job
+    jobs.JOB_HEARTBEAT_SECONDS, jobs.JOB_LEASE_SECONDS = lease / 5, lease
+    a, b = jobs.JobRunner(), jobs.JobRunner()
+    seen = {}
+    @a.handler("bench_slow")
+    def slow(db, params, progress):
+        db.execute(text("SELECT 1"))
+        seen["connections"] = engine.pool.checkedout()
+        time.sleep(lease * 2.5)
+        return {}
+    db = SessionLocal()
+    db.query(Job).filter(Job.kind == "bench_slow").delete()
+    db.add(Job(id=f"bench-stale-{time.time_ns()}", kind="bench_slow", status="RUNNING", created_at=datetime.utcnow(), heartbeat_at=datetime.utcnow() - timedelta(minutes=5)))
+    db.commit(); db.close()
+    a.start()
+    job_id = a.submit("bench_slow")["id"]
+    time.sleep(lease * 1.5)
+    b.start()
+    def statuses():
+        db = SessionLocal()
+        try: return {j.id: j.status for j in db.query(Job).filter(Job.kind == "bench_slow")}
+        finally: db.close()
+    during = statuses()
+    time.sleep(lease * 2)
+    final = statuses()[job_id]
+    a.shutdown(); b.shutdown()
+    stale = [s for i, s in during.items() if i != job_id]
+    ok = during[job_id] == "RUNNING" and stale == ["FAILED"] and final == "DONE" and seen.get("connections") == 1
+    print(f"{'job vivo de otro worker tras arrancar B':<40} {during[job_id]} -> {final}  sin heartbeat: {stale}  {'OK' if ok else 'ERROR'}")
+    print(f"{'conexiones mientras corre el handler':<40} {seen.get('connections')}")
+    return ok
+
+BENCHMARKS = {"leaderboard": bench_leaderboard, "adultos": bench_adultos, "standings": bench_standings, "club_details": bench_club_details, "top_scorers": bench_top_scorers, "live": bench_live, "notify": bench_notify, "indexes": bench_indexes, "import": bench_import, "league_import": bench_league_import, "async_reads": bench_async_reads, "auth": bench_auth, "login": bench_login, "audit": bench_audit, "snapshot": bench_snapshot, "delta": bench_delta, "serialize": bench_serialize, "wire": bench_wire, "matches_filters": bench_matches_filters, "cache_race": bench_cache_race, "jobs": bench_jobs}
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    seed(n_clubs=int(os.getenv("BENCH_CLUBS", 20)), rounds=int(os.getenv("BENCH_ROUNDS", 60)))
+    results = [BENCHMARKS[name]() for name in selected]
+    sys.exit(0 if all(r is not False for r in results) else 1)
@@ -0,0 +1,112 @@
+import os
+import time
+import threading
+import uuid
+import zlib
+from collections import OrderedDict, defaultdict
+
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+
+class ResponseCache:
+    # Caché LRU con TTL para respuestas públicas. Las claves son tuplas (endpoint, *params)
+    # y las rutas de escritura invalidan por prefijo, p.ej. ("matches", category_id).
+    # stamp (opcional) es la versión de los datos (DataVersions.stamp) tomada antes de cargar la entrada: una
+    # lectura con otra versión no la usa, así lo cargado mientras confirmaba una escritura no queda servido.
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0; self.misses = 0; self.evictions = 0; self.invalidations = 0
+
+    def get(self, key, stamp=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry and entry[0] > time.monotonic() and entry[2] == stamp:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry: del self._data[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value, stamp=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value, stamp)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader, stamp=None):
+        found, value = self.get(key, stamp)
+        if found: return value
+        value = loader()
+        self.set(key, value, stamp)
+        return value
+
+    async def aget_or_load(self, key, loader, stamp=None):
+        # Igual que get_or_load, para rutas async: loader es una función que devuelve un awaitable
+        found, value = self.get(key, stamp)
+        if found: return value
+        value = await loader()
+        self.set(key, value, stamp)
+        return value
+
+    def invalidate(self, *prefix):
+        with self._lock:
+            keys = [k for k in self._data if k[:len(prefix)] == prefix]
+            for k in keys: del self._data[k]
+            self.invalidations += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._data), "max_entries": self.max_entries, "ttl_seconds": self.ttl, "hits": self.hits, "misses": self.misses,
+                    "hit_ratio": round(self.hits / total, 4) if total else 0.0, "evictions": self.evictions, "invalidations": self.invalidations}
+
+response_cache = ResponseCache()
+
+# Usuarios resueltos desde el JWT (get_current_user): evita una query por request autenticado. crud.create_user y
+# crud.delete_user la vacían; el TTL acota cuánto tarda en verse un cambio hecho por fuera de la app.
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "1024"))
+user_cache = ResponseCache(max_entries=AUTH_CACHE_MAX_ENTRIES, ttl=AUTH_CACHE_TTL_SECONDS)
+
+class DataVersions:
+    # Contadores de versión en memoria: "catalog" (clubes, equipos, jugadores, fechas), "matches" (cualquier
+    # partido/evento) y ("category", id). Las rutas de escritura de crud.py los incrementan después del commit.
+    def __init__(self):
+        self.boot_id = uuid.uuid4().hex[:8]
+        self._versions = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def bump(self, *scopes):
+        with self._lock:
+            for scope in scopes: self._versions[scope] += 1
+
+    def bump_catalog(self):
+        self.bump("catalog")
+
+    def bump_match_data(self, category_id: int = None):
+        if category_id is None: self.bump("matches", "catalog")
+        else: self.bump("matches", ("category", category_id))
+
+    def stamp(self, *scopes):
+        # Versión de un conjunto de datos: reinicio del proceso + contadores de los scopes
+        with self._lock:
+            versions = "-".join(str(self._versions[s]) for s in scopes)
+        return f"{self.boot_id}-{versions}"
+
+    def etag(self, key: str, stamp: str):
+        # ETag débil: versión con la que se cargó la respuesta (stamp) + hash de la URL. Débil porque el mismo valor
+        # vale para el cuerpo sin comprimir, gzip y br (la respuesta lleva Vary: Accept-Encoding)
+        return f'W/"{stamp}-{zlib.crc32(key.encode()):08x}"'
+
+data_versions = DataVersions()
@@ -0,0 +1,101 @@
+import os
+import gzip
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # sin el paquete se negocia solo gzip
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+EXCLUDED_MEDIA_TYPES = ("text/event-stream",)
+
+def negotiate(accept_encoding: str):
+    # Codificación a usar según Accept-Encoding: br (si está instalado) antes que gzip; q=0 la excluye
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()[2:] if params.strip().startswith("q=") else "1"
+        try:
+            if float(q) > 0: accepted.add(name.strip())
+        except ValueError: pass
+    if brotli and ("br" in accepted or "*" in accepted): return "br"
+    if "gzip" in accepted or "*" in accepted: return "gzip"
+    return None
+
+def compress(body: bytes, encoding: str):
+    if encoding == "br": return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+class CompressionMiddleware:
+    # Middleware ASGI que negocia br o gzip (como GZipMiddleware de Starlette, sin depender de sus clases internas).
+    # Las respuestas que ya traen Content-Encoding (los bytes precomprimidos de response_cache) y los tipos excluidos
+    # (text/event-stream del feed) pasan tal cual. Un cuerpo de un solo mensaje se comprime entero si supera
+    # minimum_size; uno en streaming (exportaciones) se comprime por partes y pierde el Content-Length.
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", "")) if scope["type"] == "http" else None
+        if not encoding:
+            await self.app(scope, receive, send); return
+        start, compressor = None, None
+
+        async def send_compressed(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if "content-encoding" in headers or headers.get("content-type", "").startswith(EXCLUDED_MEDIA_TYPES):
+                    await send(message); start = False
+                else: start = message  # se decide con el primer cuerpo
+                return
+            if start is False or message["type"] != "http.response.body":
+                await send(message); return
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    await send(start); await send(message); start = False; return
+                compressor = _Compressor(encoding)
+                headers = MutableHeaders(raw=list(start["headers"]))
+                start["headers"] = headers.raw
+                headers["Content-Encoding"] = encoding
+                if "accept-encoding" not in headers.get("vary", "").lower(): headers.add_vary_header("Accept-Encoding")
+                if more_body: del headers["Content-Length"]
+                else:
+                    body = compressor.finish(body)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start); await send({"type": "http.response.body", "body": body}); return
+                await send(start)
+            await send({"type": "http.response.body", "body": compressor.finish(body) if not more_body else compressor.process(body), "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+class _Compressor:
+    # Compresión incremental: process() por cada parte, finish() con la última
+    def __init__(self, encoding: str):
+        if encoding == "br": self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+        else: self._c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self._br = encoding == "br"
+
+    def process(self, body: bytes):
+        return self._c.process(body) if self._br else self._c.compress(body)
+
+    def finish(self, body: bytes = b""):
+        return self.process(body) + (self._c.finish() if self._br else self._c.flush())
+
+class Payload:
+    # JSON ya codificado que guarda response_cache, con sus versiones comprimidas: cada codificación se calcula
+    # una vez por llenado de caché y no en cada respuesta
+    __slots__ = ("body", "_encoded")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self._encoded = {}
+
+    def encoded(self, encoding: str):
+        if encoding not in self._encoded: self._encoded[encoding] = compress(self.body, encoding)
+        return self._encoded[encoding]
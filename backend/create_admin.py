@@ -0,0 +1,26 @@
+import sys
+import getpass
+from database import SessionLocal
+from migrate import upgrade_database
+from security import get_password_hash
+import crud
+
+def create_admin(username: str):
+    # Da el rol admin a un usuario existente o lo crea (pide la contraseña). Sirve para el primer admin de una base
+    # nueva o para recuperar el acceso si no queda ninguno; desde la app solo un admin puede crear otro.
+    upgrade_database()
+    db = SessionLocal()
+    try:
+        hashed = None
+        if not crud.get_user_by_username(db, username):
+            password = getpass.getpass(f"Contraseña para {username}: ")
+            if not password or password != getpass.getpass("Repetir contraseña: "): sys.exit("Las contraseñas no coinciden.")
+            hashed = get_password_hash(password)
+        user = crud.grant_admin(db, username, hashed)
+        print(f"¡Listo! {user.username} es admin.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2: sys.exit("Uso: python create_admin.py <usuario>")
+    create_admin(sys.argv[1])
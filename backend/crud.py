@@ -1,8 +1,14 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, func, desc
-from models import Club, Category, Team, Match, MatchEvent, Player, Venue, MatchDay, AuditLog, User
+from sqlalchemy.orm import Session, joinedload, aliased
+from sqlalchemy import and_, or_, func, desc, case, select, update, union_all, tuple_, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import Club, Category, Team, Match, MatchEvent, Player, Venue, MatchDay, AuditLog, User, Standing, PlayerStats, DeletedMatchEvent, ChangeCounter
 import schemas
+from cache import data_versions, user_cache
+from live import live_bus
+from database import after_commit
 import pandas as pd
+from datetime import datetime, timedelta
 
 # --- Users ---
 def get_user_by_username(db: Session, username: str):
@@ -14,18 +20,42 @@ def get_users(db: Session):
 def delete_user(db: Session, user_id: int):
     db_user = db.query(User).filter(User.id == user_id).first()
     if db_user:
-        if db_user.username == "admin_renca": return False
+        if db_user.role == "admin": return False
         db.delete(db_user)
+        _users_changed(db)
         db.commit()
         return True
     return False
 
 def create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
-    db_user = User(username=user.username, hashed_password=hashed_password)
+    db_user = User(username=user.username, hashed_password=hashed_password, role=user.role or "operator")
     db.add(db_user)
+    _users_changed(db)
     db.commit(); db.refresh(db_user)
     return db_user
 
+def has_admin(db: Session):
+    return db.query(User.id).filter(User.role == "admin").first() is not None
+
+def grant_admin(db: Session, username: str, hashed_password: str = None):
+    # Primer admin de una base nueva (INITIAL_ADMIN_* o create_admin.py): promueve al usuario si existe (sin tocar
+    # su contraseña) o lo crea con hashed_password
+    db_user = get_user_by_username(db, username)
+    if db_user: db_user.role = "admin"
+    elif hashed_password: db_user = User(username=username, hashed_password=hashed_password, role="admin"); db.add(db_user)
+    else: return None
+    _users_changed(db)
+    db.commit(); db.refresh(db_user)
+    return db_user
+
+def update_user_password_hash(db: Session, user: User, hashed_password: str):
+    user.hashed_password = hashed_password
+    db.commit()
+
+def _users_changed(db: Session):
+    # Antes del commit. También se cachean los "no existe": un alta puede reutilizar un id o un nombre
+    live_bus.notify(db, "users", {}); after_commit(db, user_cache.clear)
+
 # --- Players ---
 def create_player(db: Session, player: schemas.PlayerCreate):
     try:
@@ -34,6 +64,7 @@ def create_player(db: Session, player: schemas.PlayerCreate):
         if existing: return None
         db_player = Player(team_id=player.team_id, name=player.name, dni=dni_clean, number=player.number, birth_date=player.birth_date)
         db.add(db_player)
+        _catalog_changed(db)
         db.commit(); db.refresh(db_player)
         return db_player
     except: return None
@@ -42,6 +73,7 @@ def create_player(db: Session, player: schemas.PlayerCreate):
 def create_match_day(db: Session, match_day: schemas.MatchDayCreate):
     db_match_day = MatchDay(**match_day.model_dump())
     db.add(db_match_day)
+    _catalog_changed(db)
     db.commit(); db.refresh(db_match_day)
     return db_match_day
 
@@ -49,6 +81,7 @@ def delete_match_day(db: Session, match_day_id: int):
     db_match_day = db.query(MatchDay).filter(MatchDay.id == match_day_id).first()
     if db_match_day:
         db.delete(db_match_day)
+        _catalog_changed(db)
         db.commit()
         return True
     return False
@@ -56,6 +89,7 @@ def delete_match_day(db: Session, match_day_id: int):
 def create_club(db: Session, club: schemas.ClubCreate):
     db_club = Club(name=club.name, logo_url=club.logo_url, league_series=club.league_series)
     db.add(db_club)
+    _catalog_changed(db)
     db.commit(); db.refresh(db_club)
     return db_club
 
@@ -65,6 +99,11 @@ def update_club(db: Session, club_id: int, club_data: schemas.ClubCreate):
         db_club.name = club_data.name
         db_club.logo_url = club_data.logo_url
         db_club.league_series = club_data.league_series
+        # El club va anidado en los partidos de sus equipos: cambian para los clientes de ?since=
+        team_ids = select(Team.id).where(Team.club_id == club_id)
+        db.query(Match).filter(or_(Match.home_team_id.in_(team_ids), Match.away_team_id.in_(team_ids))) \
+            .update({Match.version: next_change_version(db)}, synchronize_session=False)
+        _catalog_changed(db)
         db.commit(); db.refresh(db_club)
     return db_club
 
@@ -73,29 +112,75 @@ def create_team(db: Session, team: schemas.TeamCreate):
     if existing_team: return existing_team
     db_team = Team(**team.model_dump())
     db.add(db_team)
+    _catalog_changed(db)
     db.commit(); db.refresh(db_team)
     return db_team
 
 def create_match(db: Session, match: schemas.MatchCreate):
-    db_match = Match(**match.model_dump())
+    # Igual que create_team: el mismo cruce en la misma fecha devuelve el partido existente (ux_matches_fixture)
+    existing_match = db.query(Match).filter(Match.category_id == match.category_id, Match.match_day_id == match.match_day_id, Match.home_team_id == match.home_team_id, Match.away_team_id == match.away_team_id).first()
+    if existing_match: return existing_match
+    db_match = Match(**match.model_dump(), version=next_change_version(db))
     db.add(db_match)
+    db.flush()
+    live_bus.notify(db, "match_created", {"match_id": db_match.id, "category_id": db_match.category_id})
     db.commit(); db.refresh(db_match)
+    data_versions.bump_match_data(db_match.category_id)
     return db_match
 
 def update_match_result(db: Session, match_id: int, result: schemas.MatchUpdateResult, user_id: int = None):
     db_match = db.query(Match).filter(Match.id == match_id).first()
     if db_match:
+        # Contador de cambios antes que standings, en el mismo orden de bloqueo que los eventos (sin deadlocks)
+        db_match.version = next_change_version(db)
+        _apply_match_to_standings(db, db_match, -1)
         db_match.home_score = result.home_score
         db_match.away_score = result.away_score
         db_match.is_played = result.is_played
+        _apply_match_to_standings(db, db_match, 1)
         status_msg = "FINALIZADO" if result.is_played else "REABIERTO"
         db.add(AuditLog(match_id=match_id, user_id=user_id, action="STATUS", details=f"{status_msg} ({result.home_score}-{result.away_score})"))
+        _publish_match(db, match_id, "score")
         db.commit(); db.refresh(db_match)
+        data_versions.bump_match_data(db_match.category_id)
     return db_match
 
 # --- Auditoría ---
-def get_audit_logs(db: Session, limit: int = 100):
-    return db.query(AuditLog).options(joinedload(AuditLog.user)).order_by(AuditLog.timestamp.desc()).limit(limit).all()
+AUDIT_EXPORT_BATCH_SIZE = 1000
+
+def _audit_log_query(match_id: int = None, user_id: int = None, action: str = None, date_from: datetime = None, date_to: datetime = None):
+    # Una sola query con usuario y clubes del partido (outer joins), en vez de cargar match/equipos/clubes fila por fila
+    home, away = aliased(Team), aliased(Team)
+    home_club, away_club = aliased(Club), aliased(Club)
+    stmt = select(AuditLog.id, AuditLog.timestamp, AuditLog.action, AuditLog.details, AuditLog.match_id, AuditLog.user_id,
+                  User.username, home_club.name.label("home_name"), away_club.name.label("away_name")) \
+        .outerjoin(User, AuditLog.user_id == User.id).outerjoin(Match, AuditLog.match_id == Match.id) \
+        .outerjoin(home, Match.home_team_id == home.id).outerjoin(home_club, home.club_id == home_club.id) \
+        .outerjoin(away, Match.away_team_id == away.id).outerjoin(away_club, away.club_id == away_club.id)
+    if match_id is not None: stmt = stmt.where(AuditLog.match_id == match_id)
+    if user_id is not None: stmt = stmt.where(AuditLog.user_id == user_id)
+    if action: stmt = stmt.where(AuditLog.action == action)
+    if date_from: stmt = stmt.where(AuditLog.timestamp >= date_from)
+    if date_to: stmt = stmt.where(AuditLog.timestamp <= date_to)
+    return stmt
+
+def get_audit_logs(db: Session, limit: int = 100, after: tuple = None, **filters):
+    # Paginación por keyset sobre (timestamp, id) descendente: after es el (timestamp, id) de la última fila de la
+    # página anterior y cada página cuesta lo mismo sin importar cuán atrás esté (usa ix_audit_logs_timestamp_id)
+    stmt = _audit_log_query(**filters)
+    if after:
+        stmt = stmt.where(tuple_(AuditLog.timestamp, AuditLog.id) < tuple_(literal(after[0], AuditLog.timestamp.type), literal(after[1], AuditLog.id.type)))
+    rows = db.execute(stmt.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(limit)).all()
+    return [{"id": r.id, "action": r.action, "details": r.details, "timestamp": r.timestamp, "match_id": r.match_id, "user_id": r.user_id,
+             "user_name": r.username or "Sistema", "match_info": f"{r.home_name} vs {r.away_name}" if r.home_name and r.away_name else "N/A"} for r in rows]
+
+def iter_audit_logs(db: Session, batch_size: int = AUDIT_EXPORT_BATCH_SIZE, **filters):
+    # Todas las filas que cumplen los filtros, de a batch_size por página de keyset (para exportar sin cargar todo)
+    after = None
+    while rows := get_audit_logs(db, batch_size, after, **filters):
+        yield from rows
+        if len(rows) < batch_size: return
+        after = (rows[-1]["timestamp"], rows[-1]["id"])
 
 def get_match_audit_logs(db: Session, match_id: int):
     return db.query(AuditLog).options(joinedload(AuditLog.user)).filter(AuditLog.match_id == match_id).order_by(AuditLog.timestamp.desc()).all()
@@ -104,128 +189,412 @@ def get_match_audit_logs(db: Session, match_id: int):
 def get_match_events(db: Session, match_id: int):
     return db.query(MatchEvent).options(joinedload(MatchEvent.player)).filter(MatchEvent.match_id == match_id).all()
 
-def create_match_event(db: Session, event: schemas.MatchEventCreate, user_id: int = None):
-    db_event = MatchEvent(**event.model_dump())
+def _add_match_event(db: Session, event: schemas.MatchEventCreate, user_id: int = None, client_key: str = None):
+    # Todo el trabajo de registrar un evento (marcador, standings, player_stats, auditoría) sin hacer commit
+    version = next_change_version(db)
+    db_event = MatchEvent(**event.model_dump(), client_key=client_key, version=version)
+    _apply_event_to_player_stats(db, db_event, 1)
     db.add(db_event)
     if event.event_type == "GOAL":
         match = db.query(Match).filter(Match.id == event.match_id).first()
         player = db.query(Player).filter(Player.id == event.player_id).first()
         if match and player:
+            _apply_match_to_standings(db, match, -1)
             if player.team_id == match.home_team_id: match.home_score += 1
             else: match.away_score += 1
+            match.version = version
+            _apply_match_to_standings(db, match, 1)
     player_name = db.query(Player.name).filter(Player.id == event.player_id).scalar() or "Jugador"
     db.add(AuditLog(match_id=event.match_id, user_id=user_id, action="EVENT", details=f"{event.event_type} - {player_name} (Min {event.minute})"))
+    db.flush()
+    _publish_match(db, db_event.match_id, "event", event={"id": db_event.id, "player_id": db_event.player_id, "player_name": player_name, "event_type": db_event.event_type, "minute": db_event.minute})
+    return db_event, player_name
+
+def _after_match_event(db: Session, db_event: MatchEvent):
+    category_id = db.query(Match.category_id).filter(Match.id == db_event.match_id).scalar()
+    data_versions.bump_match_data(category_id)
+
+def create_match_event(db: Session, event: schemas.MatchEventCreate, user_id: int = None):
+    db_event, _ = _add_match_event(db, event, user_id)
     db.commit(); db.refresh(db_event)
+    _after_match_event(db, db_event)
     return db_event
 
+def create_match_events_batch(db: Session, items: list, user_id: int = None):
+    # items: [(client_key, MatchEventCreate)]. Devuelve {client_key: (event_id, duplicado)}; una clave ya
+    # registrada (reintento del cliente) no vuelve a crear el evento. Todo el lote va en una transacción;
+    # si falla, se reintenta evento por evento para que uno inválido no tumbe a los demás (event_id=None).
+    existing = lambda keys: dict(db.query(MatchEvent.client_key, MatchEvent.id).filter(MatchEvent.client_key.in_(keys)).all())
+    results = {k: (eid, True) for k, eid in existing([k for k, _ in items]).items()}
+    pending = list({k: e for k, e in items if k not in results}.items())
+    added = []
+    try:
+        added = [(key, *_add_match_event(db, event, user_id, client_key=key)) for key, event in pending]
+        db.commit()
+    except Exception:
+        db.rollback(); added = []
+        for key, event in pending:
+            try:
+                row = (key, *_add_match_event(db, event, user_id, client_key=key))
+                db.commit(); added.append(row)
+            except Exception:
+                db.rollback()
+                # Otra conexión pudo registrar la misma clave en paralelo
+                eid = existing([key]).get(key)
+                results[key] = (eid, eid is not None)
+    for key, db_event, player_name in added:
+        results[key] = (db_event.id, False)
+        _after_match_event(db, db_event)
+    return results
+
 def delete_match_event(db: Session, event_id: int, user_id: int = None):
     db_event = db.query(MatchEvent).filter(MatchEvent.id == event_id).first()
     if not db_event: return False
+    version = next_change_version(db)
+    # Upsert: si el id ya tenía marca de borrado (base anterior a 0010, que reutilizaba ids en SQLite) se actualiza
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(DeletedMatchEvent).values(event_id=event_id, match_id=db_event.match_id, version=version)
+    db.execute(stmt.on_conflict_do_update(index_elements=[DeletedMatchEvent.event_id], set_={"match_id": stmt.excluded.match_id, "version": stmt.excluded.version}))
     if db_event.event_type == "GOAL":
         match = db.query(Match).filter(Match.id == db_event.match_id).first()
         player = db.query(Player).filter(Player.id == db_event.player_id).first()
         if match and player:
+            _apply_match_to_standings(db, match, -1)
             if player.team_id == match.home_team_id: match.home_score = max(0, match.home_score - 1)
             else: match.away_score = max(0, match.away_score - 1)
+            match.version = version
+            _apply_match_to_standings(db, match, 1)
+    _apply_event_to_player_stats(db, db_event, -1)
+    category_id = db.query(Match.category_id).filter(Match.id == db_event.match_id).scalar()
     db.add(AuditLog(match_id=db_event.match_id, user_id=user_id, action="DELETE_EVENT", details=f"ELIMINADO: {db_event.event_type}"))
+    _publish_match(db, db_event.match_id, "event_deleted", event_id=event_id)
     db.delete(db_event)
     db.commit()
+    data_versions.bump_match_data(category_id)
     return True
 
+# --- Versiones de cambio (?since=) ---
+def _touch_player_events(db: Session, *criteria):
+    # Los eventos llevan nombre, número y equipo del jugador: si cambian, los eventos toman versión nueva y
+    # vuelven en el próximo ?since=. Solo se pide versión si hay eventos afectados.
+    if not db.query(MatchEvent.id).filter(*criteria).first(): return
+    version = next_change_version(db)
+    db.query(MatchEvent).filter(*criteria).update({"version": version}, synchronize_session=False)
+
+def next_change_version(db: Session):
+    # Siguiente valor del contador, dentro de la transacción de la escritura: la fila queda bloqueada hasta el
+    # commit, así una versión menor nunca se confirma después de una mayor y ningún delta se la saltea
+    version = db.execute(update(ChangeCounter).where(ChangeCounter.name == "matches").values(value=ChangeCounter.value + 1)
+                         .returning(ChangeCounter.value)).scalar()
+    if version is None:
+        # Base creada con create_all sin pasar por la migración 0007
+        db.add(ChangeCounter(name="matches", value=1)); db.flush()
+        version = 1
+    return version
+
+def get_change_version(db: Session):
+    return db.query(ChangeCounter.value).filter(ChangeCounter.name == "matches").scalar() or 0
+
+def sync_change_version(db: Session):
+    # Deja el contador en el máximo de las versiones guardadas (después de copiar filas con su versión)
+    top = max(db.query(func.coalesce(func.max(m.version), 0)).scalar() for m in (Match, MatchEvent, DeletedMatchEvent))
+    if not db.query(ChangeCounter).filter(ChangeCounter.name == "matches").update({ChangeCounter.value: top}):
+        db.add(ChangeCounter(name="matches", value=top))
+    db.commit()
+    return top
+
+def get_match_changes(db: Session, category_id: int, series: str = None, since: int = None, limit: int = None, **filters):
+    # Sin since: los partidos de la categoría (filtros y página de get_match_rows). Con since: solo los partidos, eventos y
+    # eventos borrados con versión mayor. La versión se lee antes que las filas, así lo que se confirme en medio vuelve
+    # en el próximo delta.
+    version = get_change_version(db)
+    matches = get_match_rows(db, category_id, series, since=since, limit=limit, **filters)
+    if since is None: return {"version": version, "matches": matches}
+    match_ids = select(Match.id).where(Match.category_id == category_id, *_match_criteria(**filters))
+    if series and db.query(Category.parent_category).filter(Category.id == category_id).scalar() == "Adultos":
+        match_ids = match_ids.join(Team, Match.home_team_id == Team.id).join(Club, Team.club_id == Club.id).where(Club.league_series == series)
+    events = _event_rows(db, MatchEvent.match_id.in_(match_ids), MatchEvent.version > since)
+    deleted = db.query(DeletedMatchEvent.event_id).filter(DeletedMatchEvent.match_id.in_(match_ids), DeletedMatchEvent.version > since) \
+        .order_by(DeletedMatchEvent.version).all()
+    return {"version": version, "matches": matches, "events": events, "deleted_event_ids": [e for (e,) in deleted]}
+
+# --- Feed en vivo ---
+def _catalog_changed(db: Session):
+    # Clubes, equipos, jugadores o fechas, antes del commit: aviso a los demás workers en la misma transacción y
+    # nueva versión local cuando confirma
+    live_bus.notify(db, "catalog", {})
+    after_commit(db, data_versions.bump_catalog)
+
+def _publish_match(db: Session, match_id: int, kind: str, **extra):
+    # Se llama antes del commit, con los cambios ya aplicados al partido; sin conexiones abiertas no hace ninguna query
+    if not live_bus.has_subscribers(): return
+    match = db.query(Match).filter(Match.id == match_id).first()
+    if not match: return
+    # La serie solo filtra en categorías adultas, igual que en get_matches_by_category
+    series = db.query(Club.league_series).select_from(Team).join(Club, Team.club_id == Club.id).join(Category, Team.category_id == Category.id) \
+        .filter(Team.id == match.home_team_id, Category.parent_category == "Adultos").scalar()
+    live_bus.publish(db, kind, {"match_id": match.id, "category_id": match.category_id, "series": series, "home_score": match.home_score, "away_score": match.away_score, "is_played": match.is_played, **extra})
+
+# --- Estadísticas de jugadores ---
+PLAYER_STAT_FIELDS = {"GOAL": "goals", "YELLOW_CARD": "yellow_cards", "RED_CARD": "red_cards"}
+
+def _count_event(event_type: str):
+    return func.coalesce(func.sum(case((MatchEvent.event_type == event_type, 1), else_=0)), 0)
+
+def _player_stats_for(db: Session, player_id: int):
+    stats = db.query(PlayerStats).filter(PlayerStats.player_id == player_id).with_for_update().first()
+    if stats: return stats
+    stats = PlayerStats(player_id=player_id, goals=0, yellow_cards=0, red_cards=0, appearances=0)
+    db.add(stats); db.flush()
+    return stats
+
+def _apply_event_to_player_stats(db: Session, event: MatchEvent, sign: int):
+    # Se llama antes de insertar (sign=1) o de borrar (sign=-1) el evento, en la misma transacción
+    if not event.player_id: return
+    stats = _player_stats_for(db, event.player_id)
+    field = PLAYER_STAT_FIELDS.get(event.event_type)
+    if field: setattr(stats, field, getattr(stats, field) + sign)
+    # Una presencia por partido: solo cambia con el primer evento del jugador en el partido o al borrar el último
+    others = db.query(MatchEvent.id).filter(MatchEvent.match_id == event.match_id, MatchEvent.player_id == event.player_id, MatchEvent.id != event.id).first()
+    if not others: stats.appearances += sign
+
+def rebuild_player_stats(db: Session):
+    rows = db.query(MatchEvent.player_id, _count_event("GOAL").label("goals"), _count_event("YELLOW_CARD").label("yellow_cards"), _count_event("RED_CARD").label("red_cards"), func.count(func.distinct(MatchEvent.match_id)).label("appearances")) \
+        .filter(MatchEvent.player_id != None).group_by(MatchEvent.player_id).all()
+    db.query(PlayerStats).delete()
+    db.add_all([PlayerStats(player_id=x.player_id, goals=x.goals, yellow_cards=x.yellow_cards, red_cards=x.red_cards, appearances=x.appearances) for x in rows])
+    db.commit()
+    return len(rows)
+
 # --- Consultas ---
 def get_match_days(db: Session):
     return db.query(MatchDay).order_by(MatchDay.start_date).all()
 
 def get_clubs(db: Session):
-    return db.query(Club).options(joinedload(Club.teams).joinedload(Team.category)).all()
+    teams = joinedload(Club.teams)
+    return db.query(Club).options(teams.joinedload(Team.category), teams.joinedload(Team.club)).all()
+
+def get_categories(db: Session):
+    return db.query(Category).all()
 
 def get_venues(db: Session):
     return db.query(Venue).all()
 
 def get_teams_by_category(db: Session, category_id: int):
-    return db.query(Team).options(joinedload(Team.club)).filter(Team.category_id == category_id).all()
+    return db.query(Team).options(joinedload(Team.club), joinedload(Team.category)).filter(Team.category_id == category_id).all()
+
+def _match_criteria(match_day_id: int = None, date_from=None, date_to=None, is_played: bool = None, after: tuple = None):
+    # Filtros de /matches/{category_id}; date_from/date_to son fechas (date_to incluye todo ese día). after es el
+    # (match_date, id) de la última fila de la página anterior, en el orden MATCH_ORDER (partidos sin fecha al final).
+    criteria = []
+    if match_day_id is not None: criteria.append(Match.match_day_id == match_day_id)
+    if date_from: criteria.append(Match.match_date >= datetime.combine(date_from, datetime.min.time()))
+    if date_to: criteria.append(Match.match_date < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    if is_played is not None: criteria.append(Match.is_played == is_played)
+    if after:
+        after_date, after_id = after
+        if after_date is None: criteria.append(and_(Match.match_date.is_(None), Match.id > after_id))
+        else: criteria.append(or_(tuple_(Match.match_date, Match.id) > tuple_(literal(after_date, Match.match_date.type), literal(after_id, Match.id.type)),
+                                  Match.match_date.is_(None)))
+    return criteria
+
+MATCH_ORDER = (Match.match_date.asc().nulls_last(), Match.id)
 
-def get_matches_by_category(db: Session, category_id: int, series: str = None):
+def get_matches_by_category(db: Session, category_id: int, series: str = None, limit: int = None, **filters):
     cat = db.query(Category).filter(Category.id == category_id).first()
     query = db.query(Match).options(
         joinedload(Match.home_team).joinedload(Team.club), 
         joinedload(Match.away_team).joinedload(Team.club), 
+        joinedload(Match.home_team).joinedload(Team.category),
+        joinedload(Match.away_team).joinedload(Team.category),
         joinedload(Match.venue)
-    ).filter(Match.category_id == category_id)
+    ).filter(Match.category_id == category_id, *_match_criteria(**filters))
     if series and cat and cat.parent_category == "Adultos":
         query = query.join(Team, Match.home_team_id == Team.id).join(Club).filter(Club.league_series == series)
-    return query.order_by(Match.match_date).all()
+    return query.order_by(*MATCH_ORDER).limit(limit).all()
 
-def get_match_players(db: Session, match_id: int):
-    match = db.query(Match).filter(Match.id == match_id).first()
+# Lecturas por columnas para las rutas más pedidas: arman directamente los dicts que devolverían schemas.Club,
+# schemas.Match y schemas.MatchEvent (mismos campos, mismo orden), sin objetos ORM ni model_validate por objeto.
+# Las rutas los codifican a JSON una sola vez y guardan los bytes en response_cache.
+CLUB_COLUMNS = (Club.id, Club.name, Club.logo_url, Club.league_series)
+
+def _category_rows(db: Session):
+    return {r.id: {"name": r.name, "parent_category": r.parent_category, "points_win": r.points_win, "points_draw": r.points_draw,
+                   "points_loss": r.points_loss, "id": r.id}
+            for r in db.execute(select(Category.id, Category.name, Category.parent_category, Category.points_win, Category.points_draw, Category.points_loss))}
+
+def _team_row(team_id, club_id, category_id, club, categories):
+    if team_id is None: return None
+    return {"club_id": club_id, "category_id": category_id, "id": team_id, "category": categories.get(category_id), "club": club}
+
+def get_club_rows(db: Session):
+    categories = _category_rows(db)
+    bases = {r.id: dict(r._mapping) for r in db.execute(select(*CLUB_COLUMNS).order_by(Club.id))}
+    clubs = {club_id: {**base, "teams": []} for club_id, base in bases.items()}
+    for t in db.execute(select(Team.id, Team.club_id, Team.category_id).order_by(Team.id)):
+        if t.club_id in clubs: clubs[t.club_id]["teams"].append(_team_row(t.id, t.club_id, t.category_id, bases[t.club_id], categories))
+    return list(clubs.values())
+
+def get_match_rows(db: Session, category_id: int, series: str = None, since: int = None, limit: int = None, **filters):
+    # Mismos filtros que get_matches_by_category (la serie solo aplica a categorías adultas); since: solo versión mayor
+    categories = _category_rows(db)
+    home, away, home_club, away_club = aliased(Team), aliased(Team), aliased(Club), aliased(Club)
+    club_cols = lambda club, prefix: [c.label(f"{prefix}_{c.key}") for c in (club.id, club.name, club.logo_url, club.league_series)]
+    stmt = select(Match.category_id, Match.match_day_id, Match.home_team_id, Match.away_team_id, Match.venue_id, Match.match_date, Match.id,
+                  Match.home_score, Match.away_score, Match.is_played, home.id.label("home_id"), home.club_id.label("home_club_id"),
+                  home.category_id.label("home_category_id"), away.id.label("away_id"), away.club_id.label("away_club_id"),
+                  away.category_id.label("away_category_id"), *club_cols(home_club, "hc"), *club_cols(away_club, "ac"),
+                  Venue.id.label("venue_row_id"), Venue.name.label("venue_name"), Venue.location.label("venue_location")) \
+        .outerjoin(home, Match.home_team_id == home.id).outerjoin(home_club, home.club_id == home_club.id) \
+        .outerjoin(away, Match.away_team_id == away.id).outerjoin(away_club, away.club_id == away_club.id) \
+        .outerjoin(Venue, Match.venue_id == Venue.id).where(Match.category_id == category_id, *_match_criteria(**filters))
+    if since is not None: stmt = stmt.where(Match.version > since)
+    if series and (categories.get(category_id) or {}).get("parent_category") == "Adultos": stmt = stmt.where(home_club.league_series == series)
+    club = lambda r, p: None if r[f"{p}_id"] is None else {"id": r[f"{p}_id"], "name": r[f"{p}_name"], "logo_url": r[f"{p}_logo_url"], "league_series": r[f"{p}_league_series"]}
+    rows = []
+    for r in db.execute(stmt.order_by(*MATCH_ORDER).limit(limit)).mappings():
+        rows.append({"category_id": r["category_id"], "match_day_id": r["match_day_id"], "home_team_id": r["home_team_id"], "away_team_id": r["away_team_id"],
+                     "venue_id": r["venue_id"], "match_date": r["match_date"], "id": r["id"], "home_score": r["home_score"], "away_score": r["away_score"],
+                     "is_played": r["is_played"], "home_team": _team_row(r["home_id"], r["home_club_id"], r["home_category_id"], club(r, "hc"), categories),
+                     "away_team": _team_row(r["away_id"], r["away_club_id"], r["away_category_id"], club(r, "ac"), categories),
+                     "venue": None if r["venue_row_id"] is None else {"id": r["venue_row_id"], "name": r["venue_name"], "location": r["venue_location"]}})
+    return rows
+
+def lite_matches(rows):
+    # Representación "lite" de get_match_rows: cada partido con IDs y los clubes y recintos una sola vez, en tablas por ID
+    clubs, venues, matches = {}, {}, []
+    for m in rows:
+        home, away = m["home_team"] or {}, m["away_team"] or {}
+        for club in (home.get("club"), away.get("club")):
+            if club: clubs[club["id"]] = club
+        if m["venue"]: venues[m["venue"]["id"]] = m["venue"]
+        matches.append({"id": m["id"], "match_day_id": m["match_day_id"], "match_date": m["match_date"], "home_team_id": m["home_team_id"],
+                        "away_team_id": m["away_team_id"], "home_club_id": home.get("club_id"), "away_club_id": away.get("club_id"),
+                        "venue_id": m["venue_id"], "home_score": m["home_score"], "away_score": m["away_score"], "is_played": m["is_played"]})
+    return {"matches": matches, "clubs": clubs, "venues": venues}
+
+def _event_rows(db: Session, *criteria):
+    stmt = select(MatchEvent.match_id, MatchEvent.player_id, MatchEvent.event_type, MatchEvent.minute, MatchEvent.id, Player.id.label("p_id"),
+                  Player.name, Player.dni, Player.number, Player.birth_date, Player.team_id) \
+        .outerjoin(Player, MatchEvent.player_id == Player.id).where(*criteria).order_by(MatchEvent.version, MatchEvent.id)
+    return [{"match_id": r.match_id, "player_id": r.player_id, "event_type": r.event_type, "minute": r.minute, "id": r.id,
+             "player": None if r.p_id is None else {"name": r.name, "dni": r.dni, "number": r.number, "birth_date": r.birth_date, "team_id": r.team_id, "id": r.p_id}}
+            for r in db.execute(stmt)]
+
+def get_match_players(db: Session, match_id: int, team_id: int = None, after: int = None, limit: int = None):
+    # Planteles de los dos equipos del partido (o solo team_id, si es uno de ellos), por id y paginados por keyset
+    match = db.query(Match.home_team_id, Match.away_team_id).filter(Match.id == match_id).first()
     if not match: return []
-    return db.query(Player).filter(or_(Player.team_id == match.home_team_id, Player.team_id == match.away_team_id)).all()
+    teams = [t for t in match if t is not None and (team_id is None or t == team_id)]
+    query = db.query(Player).filter(Player.team_id.in_(teams))
+    if after is not None: query = query.filter(Player.id > after)
+    return query.order_by(Player.id).limit(limit).all()
+
+# --- Tabla de posiciones ---
+def _team_results_subquery():
+    # Una fila por equipo y partido jugado (local UNION visita), con goles a favor y en contra
+    played = or_(Match.is_played == True, Match.home_score > 0, Match.away_score > 0)
+    home = select(Match.id.label("match_id"), Match.home_team_id.label("team_id"), Match.home_score.label("gf"), Match.away_score.label("gc")).where(played)
+    away = select(Match.id.label("match_id"), Match.away_team_id.label("team_id"), Match.away_score.label("gf"), Match.home_score.label("gc")).where(played)
+    return union_all(home, away).subquery("team_results")
+
+def _standings_columns(r):
+    # Agregados pj/pg/pe/pp/gf/gc/pts sobre team_results, con los puntos de la categoría aplicados en SQL
+    def count_if(cond): return func.coalesce(func.sum(case((cond, 1), else_=0)), 0)
+    pts = case((r.c.gf > r.c.gc, Category.points_win), (r.c.gf == r.c.gc, Category.points_draw), (r.c.gf < r.c.gc, Category.points_loss), else_=0)
+    return [
+        func.count(r.c.match_id).label("pj"),
+        count_if(r.c.gf > r.c.gc).label("pg"),
+        count_if(r.c.gf == r.c.gc).label("pe"),
+        count_if(r.c.gf < r.c.gc).label("pp"),
+        func.coalesce(func.sum(r.c.gf), 0).label("gf"),
+        func.coalesce(func.sum(r.c.gc), 0).label("gc"),
+        func.coalesce(func.sum(pts), 0).label("pts"),
+    ]
+
+def _standing_totals():
+    # Lectura de la tabla materializada; los equipos sin fila aún cuentan como 0
+    return [func.coalesce(func.sum(getattr(Standing, c)), 0).label(c) for c in ("pj", "pg", "pe", "pp", "gf", "gc", "pts")]
+
+def _standing_for(db: Session, team_id: int):
+    standing = db.query(Standing).filter(Standing.team_id == team_id).with_for_update().first()
+    if standing: return standing
+    team = db.query(Team).filter(Team.id == team_id).first()
+    if not team: return None
+    standing = Standing(team_id=team.id, category_id=team.category_id, club_id=team.club_id, pj=0, pg=0, pe=0, pp=0, gf=0, gc=0, pts=0)
+    db.add(standing); db.flush()
+    return standing
+
+def _apply_match_to_standings(db: Session, match: Match, sign: int):
+    # Suma (sign=1) o resta (sign=-1) el aporte del marcador actual del partido; se llama antes y después de cada cambio
+    if not (match.is_played or match.home_score > 0 or match.away_score > 0): return
+    for team_id, gf, gc in ((match.home_team_id, match.home_score, match.away_score), (match.away_team_id, match.away_score, match.home_score)):
+        standing = _standing_for(db, team_id) if team_id else None
+        if not standing or not standing.category: continue
+        cat = standing.category
+        standing.pj += sign; standing.gf += sign * gf; standing.gc += sign * gc
+        if gf > gc: standing.pg += sign; standing.pts += sign * cat.points_win
+        elif gf == gc: standing.pe += sign; standing.pts += sign * cat.points_draw
+        else: standing.pp += sign; standing.pts += sign * cat.points_loss
+
+def rebuild_standings(db: Session):
+    r = _team_results_subquery()
+    rows = db.query(Team.id, Team.category_id, Team.club_id, *_standings_columns(r)) \
+        .select_from(Team).join(Category, Team.category_id == Category.id).outerjoin(r, r.c.team_id == Team.id) \
+        .group_by(Team.id, Team.category_id, Team.club_id).all()
+    db.query(Standing).delete()
+    db.add_all([Standing(team_id=x.id, category_id=x.category_id, club_id=x.club_id, pj=x.pj, pg=x.pg, pe=x.pe, pp=x.pp, gf=x.gf, gc=x.gc, pts=x.pts) for x in rows])
+    db.commit()
+    return len(rows)
 
 def get_leaderboard(db: Session, category_id: int, series: str = "HONOR"):
-    cat = db.query(Category).filter(Category.id == category_id).first()
-    if not cat: return []
-    query = db.query(Team).join(Club).filter(Team.category_id == category_id)
-    if cat.parent_category == "Adultos":
-        query = query.filter(Club.league_series == series)
-    teams = query.all()
-    leaderboard = []
-    for team in teams:
-        stats = {"club_id": team.club.id, "club_name": team.club.name, "logo_url": team.club.logo_url, "pj": 0, "pg": 0, "pe": 0, "pp": 0, "gf": 0, "gc": 0, "dg": 0, "pts": 0}
-        matches = db.query(Match).filter(or_(Match.is_played == True, Match.home_score > 0, Match.away_score > 0), or_(Match.home_team_id == team.id, Match.away_team_id == team.id)).all()
-        for m in matches:
-            stats["pj"] += 1
-            is_home = m.home_team_id == team.id
-            gf = m.home_score if is_home else m.away_score
-            gc = m.away_score if is_home else m.home_score
-            stats["gf"] += gf; stats["gc"] += gc
-            if gf > gc: stats["pg"] += 1; stats["pts"] += cat.points_win
-            elif gf == gc: stats["pe"] += 1; stats["pts"] += cat.points_draw
-            else: stats["pp"] += 1
-        stats["dg"] = stats["gf"] - stats["gc"]
-        leaderboard.append(stats)
+    rows = db.query(Club.id, Club.name, Club.logo_url, *_standing_totals()) \
+        .select_from(Team).join(Club, Team.club_id == Club.id).join(Category, Team.category_id == Category.id) \
+        .outerjoin(Standing, Standing.team_id == Team.id) \
+        .filter(Team.category_id == category_id, or_(func.coalesce(Category.parent_category, "") != "Adultos", Club.league_series == series)) \
+        .group_by(Team.id, Club.id, Club.name, Club.logo_url).order_by(Team.id).all()
+    leaderboard = [{"club_id": x.id, "club_name": x.name, "logo_url": x.logo_url, "pj": x.pj, "pg": x.pg, "pe": x.pe, "pp": x.pp, "gf": x.gf, "gc": x.gc, "dg": x.gf - x.gc, "pts": x.pts} for x in rows]
     return sorted(leaderboard, key=lambda x: (x["pts"], x["dg"]), reverse=True)
 
 def get_aggregated_adultos_leaderboard(db: Session, series: str = "HONOR"):
-    adult_cats = db.query(Category).filter(Category.parent_category == "Adultos").all()
-    cat_ids = [c.id for c in adult_cats]
-    clubs = db.query(Club).filter(Club.league_series == series).all()
-    leaderboard = []
-    for club in clubs:
-        stats = {"club_id": club.id, "club_name": club.name, "logo_url": club.logo_url, "pts": 0, "dg": 0, "pj": 0, "pg": 0, "pe": 0, "pp": 0, "gf": 0, "gc": 0}
-        teams = db.query(Team).filter(Team.club_id == club.id, Team.category_id.in_(cat_ids)).all()
-        for team in teams:
-            try:
-                cat = next(c for c in adult_cats if c.id == team.category_id)
-                matches = db.query(Match).filter(or_(Match.is_played == True, Match.home_score > 0, Match.away_score > 0), or_(Match.home_team_id == team.id, Match.away_team_id == team.id)).all()
-                for m in matches:
-                    stats["pj"] += 1
-                    is_home = m.home_team_id == team.id
-                    gf = m.home_score if is_home else m.away_score
-                    gc = m.away_score if is_home else m.home_score
-                    stats["gf"] += gf; stats["gc"] += gc
-                    if gf > gc: stats["pg"] += 1; stats["pts"] += cat.points_win
-                    elif gf == gc: stats["pe"] += 1; stats["pts"] += cat.points_draw
-                    else: stats["pp"] += 1
-            except: continue
-        stats["dg"] = stats["gf"] - stats["gc"]
-        leaderboard.append(stats)
+    adult_cat_ids = select(Category.id).where(Category.parent_category == "Adultos")
+    rows = db.query(Club.id, Club.name, Club.logo_url, *_standing_totals()) \
+        .select_from(Club).outerjoin(Team, and_(Team.club_id == Club.id, Team.category_id.in_(adult_cat_ids))) \
+        .outerjoin(Standing, Standing.team_id == Team.id) \
+        .filter(Club.league_series == series).group_by(Club.id, Club.name, Club.logo_url).order_by(Club.id).all()
+    leaderboard = [{"club_id": x.id, "club_name": x.name, "logo_url": x.logo_url, "pts": x.pts, "dg": x.gf - x.gc, "pj": x.pj, "pg": x.pg, "pe": x.pe, "pp": x.pp, "gf": x.gf, "gc": x.gc} for x in rows]
     return sorted(leaderboard, key=lambda x: (x["pts"], x["dg"]), reverse=True)
 
+def get_category_snapshot(db: Session, category_id: any, series: str = "HONOR", **filters):
+    # Lo que muestra el dashboard público de una categoría (fixture, tabla y goleadores) leído con una sola sesión.
+    # Tabla y goleadores salen de standings/player_stats, que ya están materializados, así que no hace falta
+    # recorrer los eventos; "adultos" no tiene fixture propio y usa la tabla agregada.
+    if str(category_id) == "adultos":
+        return {"matches": [], "standings": get_aggregated_adultos_leaderboard(db, series), "top_scorers": get_top_scorers(db, "adultos", series)}
+    return {"matches": get_match_rows(db, int(category_id), series, **filters), "standings": get_leaderboard(db, int(category_id), series),
+            "top_scorers": get_top_scorers(db, category_id, series)}
+
 def get_club_full_details(db: Session, club_id: int):
     club = db.query(Club).filter(Club.id == club_id).first()
     if not club: return None
     categories_data = []
     teams = db.query(Team).options(joinedload(Team.category), joinedload(Team.players)).filter(Team.club_id == club_id).all()
+    team_ids = [t.id for t in teams]
+    # Todos los partidos del club, los nombres de los rivales y las estadísticas de los jugadores en 3 queries
+    all_matches = db.query(Match).filter(or_(Match.home_team_id.in_(team_ids), Match.away_team_id.in_(team_ids))).order_by(Match.match_date.desc()).all()
+    opponent_ids = {m.home_team_id for m in all_matches} | {m.away_team_id for m in all_matches}
+    club_names = dict(db.query(Team.id, Club.name).join(Club, Team.club_id == Club.id).filter(Team.id.in_(opponent_ids)).all())
+    player_stats = {ps.player_id: ps for ps in db.query(PlayerStats).join(Player, PlayerStats.player_id == Player.id).filter(Player.team_id.in_(team_ids)).all()}
     for team in teams:
         if not team.category: continue
         stats = {"pj": 0, "pg": 0, "pe": 0, "pp": 0, "gf": 0, "gc": 0, "pts": 0}
-        all_matches = db.query(Match).filter(or_(Match.home_team_id == team.id, Match.away_team_id == team.id)).order_by(Match.match_date.desc()).all()
         past = []; upcoming = []
         for m in all_matches:
+            if team.id not in (m.home_team_id, m.away_team_id): continue
             try:
                 is_home = m.home_team_id == team.id
-                opponent = db.query(Team).options(joinedload(Team.club)).filter(Team.id == (m.away_team_id if is_home else m.home_team_id)).first()
-                match_data = {"id": m.id, "opponent_name": opponent.club.name if opponent else "Rival", "home_score": m.home_score, "away_score": m.away_score, "match_date": m.match_date}
+                opponent_name = club_names.get(m.away_team_id if is_home else m.home_team_id)
+                match_data = {"id": m.id, "opponent_name": opponent_name or "Rival", "home_score": m.home_score, "away_score": m.away_score, "match_date": m.match_date}
                 if m.is_played or m.home_score > 0 or m.away_score > 0:
                     stats["pj"] += 1
                     gf = m.home_score if is_home else m.away_score
@@ -237,40 +606,123 @@ def get_club_full_details(db: Session, club_id: int):
                     past.append(match_data)
                 else: upcoming.append(match_data)
             except: continue
-        players = [{"id": p.id, "name": p.name, "number": p.number, "goals": db.query(MatchEvent).filter(MatchEvent.player_id == p.id, MatchEvent.event_type == "GOAL").count(), "yellow_cards": db.query(MatchEvent).filter(MatchEvent.player_id == p.id, MatchEvent.event_type == "YELLOW_CARD").count(), "red_cards": db.query(MatchEvent).filter(MatchEvent.player_id == p.id, MatchEvent.event_type == "RED_CARD").count()} for p in team.players]
+        players = []
+        for p in team.players:
+            ps = player_stats.get(p.id)
+            players.append({"id": p.id, "name": p.name, "number": p.number, "goals": ps.goals if ps else 0, "yellow_cards": ps.yellow_cards if ps else 0, "red_cards": ps.red_cards if ps else 0})
         categories_data.append({"category_name": team.category.name, "stats": stats, "players": players, "past_matches": past, "upcoming_matches": upcoming})
     return {"id": club.id, "name": club.name, "logo_url": club.logo_url, "league_series": club.league_series, "categories": categories_data}
 
-def bulk_create_players_from_excel(db: Session, team_id: int, df):
+def _rut_check_digit_ok(dni):
+    # Dígito verificador (módulo 11) calculado por columnas: un paso por posición del RUT, no por fila
+    body = dni.str[:-1]; dv = dni.str[-1]
+    valid = body.str.fullmatch(r"\d{6,8}").fillna(False)
+    padded = body.where(valid, "0").str.zfill(8)
+    total = sum(padded.str[7 - i].astype(int) * (2 + i % 6) for i in range(8))
+    expected = (11 - total % 11).map({11: "0", 10: "K"}).fillna((11 - total % 11).astype(str))
+    return valid & (dv == expected)
+
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_MAX_ERRORS = 200  # en la importación por liga solo se guardan los primeros; error_count lleva el total
+
+def _roster_rows(df, first_row: int = 2, seen: set = None, team_key=None):
+    # Normalización vectorizada: fila de Excel (encabezado = fila 1), nombre y RUT sin puntos/guiones/espacios.
+    # Devuelve (filas válidas, [(fila, error)]); "seen" acumula los RUT ya vistos en bloques anteriores del archivo
+    # y team_key(df) resuelve el team_id de cada fila en la importación por liga.
     df.columns = [str(c).strip().lower() for c in df.columns]
-    created = 0; updated = 0; errors = []
     col_nombre = next((c for c in df.columns if c in ['nombre', 'jugador']), None)
     col_rut = next((c for c in df.columns if c in ['rut', 'dni']), None)
-    if not col_nombre or not col_rut: return 0, 0, ["Excel inválido."]
-    for index, row in df.iterrows():
-        try:
-            name = str(row.get(col_nombre, '')).strip(); dni = str(row.get(col_rut, '')).strip()
-            if not name or not dni: continue
-            dni_clean = dni.replace('.', '').replace('-', '').upper()
-            existing = db.query(Player).filter(Player.dni == dni_clean).first()
-            if existing: existing.name = name; existing.team_id = team_id; updated += 1
-            else: db.add(Player(team_id=team_id, name=name, dni=dni_clean)); created += 1
-            db.commit()
-        except: db.rollback(); continue
+    if not col_nombre or not col_rut: return None, [(0, "Excel inválido.")]
+    rows = pd.DataFrame({"fila": range(first_row, len(df) + first_row),
+                         "name": df[col_nombre].fillna("").astype(str).str.strip(),
+                         "dni": df[col_rut].fillna("").astype(str).str.strip().str.replace(r"\.0$", "", regex=True).str.replace(r"[.\-\s]", "", regex=True).str.upper()}, index=df.index)
+    if team_key is not None: rows["team_id"] = team_key(df)
+    rows = rows[(rows["name"] != "") | (rows["dni"] != "")]
+    errors = []
+    def reject(mask, message):
+        nonlocal rows
+        errors.extend((f, f"Fila {f}: {message} ({d or n})") for f, n, d in rows.loc[mask, ["fila", "name", "dni"]].itertuples(index=False))
+        rows = rows[~mask]
+    reject(rows["name"] == "", "falta el nombre")
+    reject(rows["dni"] == "", "falta el RUT")
+    reject(~_rut_check_digit_ok(rows["dni"]), "RUT inválido")
+    if team_key is not None: reject(rows["team_id"].isna(), "club o categoría no encontrados")
+    reject(rows["dni"].duplicated() | rows["dni"].isin(seen or ()), "RUT repetido en el archivo")
+    if seen is not None: seen.update(rows["dni"])
+    return rows, errors
+
+def _upsert_players(db: Session, rows, team_id: int = None):
+    # Un SELECT ... IN por bloque para saber cuáles existen y un INSERT ... ON CONFLICT por bloque, sin commit
+    dnis = rows["dni"].tolist()
+    existing = set()
+    for i in range(0, len(dnis), IMPORT_CHUNK_SIZE):
+        existing.update(d for (d,) in db.query(Player.dni).filter(Player.dni.in_(dnis[i:i + IMPORT_CHUNK_SIZE])).all())
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    team_ids = [team_id] * len(rows) if team_id is not None else rows["team_id"].astype(int).tolist()
+    records = [{"team_id": t, "name": n, "dni": d} for t, n, d in zip(team_ids, rows["name"], rows["dni"])]
+    for i in range(0, len(records), IMPORT_CHUNK_SIZE):
+        stmt = insert(Player).values(records[i:i + IMPORT_CHUNK_SIZE])
+        db.execute(stmt.on_conflict_do_update(index_elements=[Player.dni], set_={"name": stmt.excluded.name, "team_id": stmt.excluded.team_id}))
+    if existing:
+        existing = list(existing)
+        for i in range(0, len(existing), IMPORT_CHUNK_SIZE):
+            _touch_player_events(db, MatchEvent.player_id.in_(select(Player.id).where(Player.dni.in_(existing[i:i + IMPORT_CHUNK_SIZE]))))
+    return len(records) - len(existing), len(existing)
+
+def bulk_create_players_from_excel(db: Session, team_id: int, df):
+    rows, errors = _roster_rows(df)
+    errors = [message for _, message in sorted(errors)]
+    if rows is None or rows.empty: return 0, 0, errors
+    try:
+        created, updated = _upsert_players(db, rows, team_id)
+        _catalog_changed(db)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        return 0, 0, errors + [f"Error al guardar: {e}"]
     return created, updated, errors
 
+def import_league_roster(db: Session, chunks, on_progress=None):
+    # Importación de toda la liga: cada fila trae club y categoría. "chunks" entrega DataFrames de a un bloque
+    # (ver roster_import.iter_roster_chunks) y cada bloque se guarda en su propia transacción.
+    teams = {f"{club.strip().casefold()}|{cat.strip().casefold()}": team_id for team_id, club, cat in
+             db.query(Team.id, Club.name, Category.name).join(Club, Team.club_id == Club.id).join(Category, Team.category_id == Category.id).all()}
+    def team_key(df):
+        col_club = next((c for c in df.columns if c in ['club']), None)
+        col_cat = next((c for c in df.columns if c in ['categoria', 'categoría', 'category']), None)
+        if not col_club or not col_cat: raise ValueError("El archivo debe tener columnas 'club' y 'categoria'.")
+        key = df[col_club].fillna("").astype(str).str.strip().str.casefold() + "|" + df[col_cat].fillna("").astype(str).str.strip().str.casefold()
+        return key.map(teams)
+    seen = set(); first_row = 2
+    totals = {"rows": 0, "created": 0, "updated": 0, "error_count": 0, "errors": []}
+    for chunk in chunks:
+        rows, errors = _roster_rows(chunk, first_row, seen, team_key)
+        first_row += len(chunk); totals["rows"] += len(chunk)
+        if rows is None: raise ValueError("El archivo debe tener columnas 'nombre' y 'rut'.")
+        if not rows.empty:
+            try:
+                created, updated = _upsert_players(db, rows)
+                _catalog_changed(db)
+                db.commit()
+                totals["created"] += created; totals["updated"] += updated
+            except Exception as e:
+                db.rollback()
+                errors.append((int(rows["fila"].iloc[0]), f"Filas {rows['fila'].iloc[0]}-{rows['fila'].iloc[-1]}: error al guardar ({e})"))
+        totals["error_count"] += len(errors)
+        totals["errors"] = (totals["errors"] + [message for _, message in sorted(errors)])[:IMPORT_MAX_ERRORS]
+        if on_progress: on_progress(totals)
+    return totals
+
 def get_top_scorers(db: Session, category_id: any, series: str = "HONOR"):
-    query = db.query(Player.id, Player.name.label("player_name"), Club.name.label("club_name"), Club.logo_url.label("club_logo"), func.count(MatchEvent.id).label("total_goals")).join(MatchEvent, Player.id == MatchEvent.player_id).join(Team, Player.team_id == Team.id).join(Club, Team.club_id == Club.id).filter(MatchEvent.event_type == "GOAL")
+    query = db.query(Player.id, Player.name.label("player_name"), Club.name.label("club_name"), Club.logo_url.label("club_logo"), PlayerStats.goals.label("total_goals")) \
+        .join(PlayerStats, Player.id == PlayerStats.player_id).join(Team, Player.team_id == Team.id).join(Club, Team.club_id == Club.id).join(Category, Team.category_id == Category.id) \
+        .filter(PlayerStats.goals > 0)
     if str(category_id) == "adultos":
-        cat_ids = [c.id for c in db.query(Category).filter(Category.parent_category == "Adultos").all()]
-        query = query.filter(Team.category_id.in_(cat_ids)).filter(Club.league_series == series)
+        query = query.filter(Category.parent_category == "Adultos", Club.league_series == series)
     else:
-        try:
-            cat = db.query(Category).filter(Category.id == int(category_id)).first()
-            query = query.filter(Team.category_id == int(category_id))
-            if cat and cat.parent_category == "Adultos": query = query.filter(Club.league_series == series)
+        try: query = query.filter(Team.category_id == int(category_id), or_(func.coalesce(Category.parent_category, "") != "Adultos", Club.league_series == series))
         except: return []
-    results = query.group_by(Player.id, Player.name, Club.name, Club.logo_url).order_by(desc("total_goals")).limit(20).all()
+    results = query.order_by(desc(PlayerStats.goals), Player.id).limit(20).all()
     return [{"player_id": r.id, "player_name": r.player_name, "club_name": r.club_name, "club_logo": r.club_logo, "goals": r.total_goals} for r in results]
 
 def get_team_players(db: Session, team_id: int):
@@ -282,5 +734,7 @@ def update_player(db: Session, player_id: int, player_data: schemas.PlayerUpdate
         if player_data.name: db_player.name = player_data.name
         if player_data.dni: db_player.dni = player_data.dni.replace('.', '').replace('-', '').upper()
         if player_data.number is not None: db_player.number = player_data.number
+        if db.is_modified(db_player): _touch_player_events(db, MatchEvent.player_id == player_id)
+        _catalog_changed(db)
         db.commit(); db.refresh(db_player)
     return db_player
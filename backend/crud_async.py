@@ -0,0 +1,33 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+import crud
+
+# Versiones async de las lecturas públicas de crud.py para el motor asíncrono (ASYNC_DB=1). Cada una corre la
+# misma consulta que la síncrona con AsyncSession.run_sync: el ORM trabaja en un greenlet y las esperas de red
+# son awaits sobre asyncpg/aiosqlite, así una lectura no ocupa un hilo del threadpool mientras espera a la base.
+# Las consultas cargan por adelantado (joinedload) todo lo que serializan las rutas: fuera de run_sync no hay lazy load.
+
+def _async(fn):
+    async def read(db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(fn, *args, **kwargs)
+    read.__name__ = fn.__name__
+    read.sync = fn
+    return read
+
+get_clubs = _async(crud.get_clubs)
+get_club_rows = _async(crud.get_club_rows)
+get_club_full_details = _async(crud.get_club_full_details)
+get_categories = _async(crud.get_categories)
+get_venues = _async(crud.get_venues)
+get_match_days = _async(crud.get_match_days)
+get_teams_by_category = _async(crud.get_teams_by_category)
+get_team_players = _async(crud.get_team_players)
+get_matches_by_category = _async(crud.get_matches_by_category)
+get_match_rows = _async(crud.get_match_rows)
+get_match_changes = _async(crud.get_match_changes)
+get_match_players = _async(crud.get_match_players)
+get_match_events = _async(crud.get_match_events)
+get_match_audit_logs = _async(crud.get_match_audit_logs)
+get_top_scorers = _async(crud.get_top_scorers)
+get_leaderboard = _async(crud.get_leaderboard)
+get_aggregated_adultos_leaderboard = _async(crud.get_aggregated_adultos_leaderboard)
+get_category_snapshot = _async(crud.get_category_snapshot)
@@ -1,7 +1,11 @@
 import os
-from sqlalchemy import create_engine
+import time
+import uuid
+import threading
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
 
 # Obtener URL de la base de datos
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./renca_fc.db")
@@ -12,14 +16,62 @@ if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
 elif SQLALCHEMY_DATABASE_URL.startswith("postgresql://"):
     SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgresql://", "postgresql+psycopg2://", 1)
 
-# Configuraciones adicionales según el motor
-engine_args = {}
-if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+# Pool de conexiones (los valores por defecto son los de SQLAlchemy). Con PgBouncer en modo transacción hay que
+# tener en cuenta su límite: workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) conexiones de cliente como máximo.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+# pre-ping: un SELECT 1 en cada checkout (descarta conexiones cortadas por Supabase/PgBouncer antes de usarlas);
+# con 0 se confía en DB_POOL_RECYCLE y una conexión muerta falla una vez y se invalida
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# PgBouncer en modo transacción no conserva sentencias preparadas entre transacciones: se desactivan en asyncpg.
+# psycopg2 no prepara sentencias en el servidor. LISTEN/NOTIFY (live.py) y el advisory lock de las migraciones
+# necesitan una conexión de sesión, así que en ese caso DATABASE_URL debería apuntar al puerto directo o de sesión.
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "0") == "1"
+
+class PoolWaits:
+    # Tiempo que cada checkout espera por una conexión (libre o recién abierta); QueuePool no lo expone
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0; self.waited = 0; self.timeouts = 0; self.total_wait = 0.0; self.max_wait = 0.0
+
+    def record(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.checkouts += 1; self.total_wait += seconds; self.max_wait = max(self.max_wait, seconds)
+            if seconds > 0.001: self.waited += 1
+            if timed_out: self.timeouts += 1
+
+    def stats(self):
+        with self._lock:
+            return {"checkouts": self.checkouts, "waited": self.waited, "timeouts": self.timeouts, "max_wait_ms": round(self.max_wait * 1000, 2),
+                    "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0, "total_wait_ms": round(self.total_wait * 1000, 2)}
+
+class _TimedPool:
+    def _do_get(self):
+        start = time.perf_counter()
+        try: conn = super()._do_get()
+        except exc.TimeoutError:
+            self.waits.record(time.perf_counter() - start, timed_out=True); raise
+        self.waits.record(time.perf_counter() - start)
+        return conn
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    waits = PoolWaits()
+
+class TimedAsyncQueuePool(_TimedPool, AsyncAdaptedQueuePool):
+    waits = PoolWaits()
+
+engine_args = {"poolclass": TimedQueuePool, "pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT}
+if SQLALCHEMY_DATABASE_URL in ("sqlite://", "sqlite:///:memory:"):
+    # Una base en memoria vive en una sola conexión: se deja el pool que elige SQLAlchemy
+    engine_args = {"connect_args": {"check_same_thread": False}}
+elif SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
     engine_args["connect_args"] = {"check_same_thread": False}
 else:
     # Para PostgreSQL en la nube, es vital el pool de conexiones
-    engine_args["pool_pre_ping"] = True
-    engine_args["pool_recycle"] = 3600
+    engine_args["pool_pre_ping"] = DB_POOL_PRE_PING
+    engine_args["pool_recycle"] = DB_POOL_RECYCLE
 
 try:
     engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_args)
@@ -28,4 +80,44 @@ except Exception as e:
     print(f"ERROR CRÍTICO AL CREAR EL ENGINE: {str(e)}")
     raise e
 
+# Motor asíncrono opcional (asyncpg / aiosqlite) para las lecturas públicas; ver crud_async.py
+ASYNC_DB = os.getenv("ASYNC_DB", "0") == "1"
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DB:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgresql+psycopg2://", "postgresql+asyncpg://", 1).replace("sqlite://", "sqlite+aiosqlite://", 1)
+    async_args = dict(engine_args, poolclass=TimedAsyncQueuePool, connect_args={})
+    if DB_PGBOUNCER and ASYNC_DATABASE_URL.startswith("postgresql+asyncpg"):
+        async_args["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0,
+                                      "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__"}
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **async_args)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+def _pool_stats(pool):
+    # overflow() es negativo mientras el pool no llegó a pool_size; aquí solo interesan las conexiones extra en uso
+    if not hasattr(pool, "waits"): return {"pool": type(pool).__name__}
+    return {"size": pool.size(), "checked_out": pool.checkedout(), "checked_in": pool.checkedin(), "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow, "timeout_seconds": pool.timeout(), **pool.waits.stats()}
+
+def pool_stats():
+    stats = {"settings": {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT, "pool_recycle": DB_POOL_RECYCLE,
+                          "pre_ping": DB_POOL_PRE_PING, "pgbouncer": DB_PGBOUNCER}, "sync": _pool_stats(engine.pool)}
+    if async_engine: stats["async"] = _pool_stats(async_engine.pool)
+    return stats
+
+def after_commit(db, fn):
+    # fn corre cuando db confirma la transacción en curso (invalidaciones y avisos en memoria); un rollback la descarta
+    if not db.in_transaction(): db.begin()  # sin SQL previo todavía no hay transacción que confirmar o deshacer
+    db.info.setdefault("after_commit", []).append(fn)
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session):
+    for fn in session.info.pop("after_commit", []): fn()
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_after_commit(session, transaction):
+    # Rollback o close: lo pendiente se descarta al terminar la transacción de afuera (no un savepoint)
+    if transaction.parent is None: session.info.pop("after_commit", None)
+
 Base = declarative_base()
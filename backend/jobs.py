@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import uuid
+import traceback
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from concurrent.futures import ThreadPoolExecutor
+from database import SessionLocal
+from models import Job
+
+# Cada job ocupa una conexión del pool mientras corre; con el pool por defecto (DB_POOL_SIZE=5 + DB_MAX_OVERFLOW=10) dos jobs dejan espacio de sobra a las rutas
+JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "2"))
+JOB_PROGRESS_INTERVAL_SECONDS = float(os.getenv("JOB_PROGRESS_INTERVAL_SECONDS", "1"))
+# Cada worker renueva heartbeat_at de sus jobs PENDING/RUNNING; al arrancar, un worker solo da por interrumpidos
+# los que llevan más de JOB_LEASE_SECONDS sin renovar (los de otros workers vivos siguen su curso)
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+class JobRunner:
+    # Cola de trabajos en proceso: un ThreadPoolExecutor acotado ejecuta los handlers y el estado, el avance,
+    # el resultado y los errores quedan en la tabla jobs, así el panel de admin puede reconectarse y consultar.
+    def __init__(self, max_workers: int = JOB_MAX_WORKERS):
+        self.max_workers = max_workers
+        self.handlers = {}
+        self._executor = None
+        self._lock = threading.Lock()
+        self._active = set()
+        self._stop = threading.Event()
+
+    def handler(self, kind: str):
+        # Registra un handler: fn(db, params, progress) -> dict con el resultado
+        def register(fn):
+            self.handlers[kind] = fn
+            return fn
+        return register
+
+    def start(self):
+        # Los jobs PENDING/RUNNING cuyo worker dejó de renovar el heartbeat (proceso caído o reiniciado) ya no van a terminar
+        self._ensure_started()
+        stale = datetime.utcnow() - timedelta(seconds=JOB_LEASE_SECONDS)
+        db = SessionLocal()
+        try:
+            db.query(Job).filter(Job.status.in_(["PENDING", "RUNNING"]), or_(Job.heartbeat_at == None, Job.heartbeat_at < stale)) \
+                .update({"status": "FAILED", "error": "Interrumpido por reinicio del servidor", "finished_at": datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+        finally: db.close()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor: self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._stop.set()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._executor: return
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+            self._stop = threading.Event()
+            threading.Thread(target=self._heartbeat, args=(self._stop,), name="job-heartbeat", daemon=True).start()
+
+    def _heartbeat(self, stop: threading.Event):
+        # Una UPDATE corta por intervalo para todos los jobs de este worker
+        while not stop.wait(JOB_HEARTBEAT_SECONDS):
+            with self._lock: active = list(self._active)
+            if not active: continue
+            db = SessionLocal()
+            try:
+                db.query(Job).filter(Job.id.in_(active), Job.status.in_(["PENDING", "RUNNING"])).update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+                db.commit()
+            except Exception: traceback.print_exc()
+            finally: db.close()
+
+    def submit(self, kind: str, params: dict = None, user_id: int = None):
+        if kind not in self.handlers: raise ValueError(f"Tipo de job desconocido: {kind}")
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            job = Job(id=uuid.uuid4().hex, kind=kind, status="PENDING", params=json.dumps(params or {}), user_id=user_id, created_at=now, heartbeat_at=now)
+            db.add(job); db.commit(); db.refresh(job)
+            data = serialize_job(job)
+        finally: db.close()
+        self._ensure_started()
+        with self._lock:
+            self._active.add(data["id"])
+            self._executor.submit(self._run, data["id"])
+        return data
+
+    def _run(self, job_id: str):
+        try:
+            # kind y params se copian antes del commit y la sesión se cierra antes del handler: mientras corre,
+            # el job ocupa solo la conexión de su sesión de trabajo
+            db = SessionLocal()
+            try:
+                job = db.query(Job).filter(Job.id == job_id).first()
+                kind, params = job.kind, json.loads(job.params or "{}")
+                job.status = "RUNNING"; job.started_at = job.heartbeat_at = datetime.utcnow()
+                db.commit()
+            finally: db.close()
+            last = [0.0]
+            def progress(data: dict, force: bool = False):
+                # Se guarda como mucho una vez por JOB_PROGRESS_INTERVAL_SECONDS, en una sesión aparte
+                if not force and time.monotonic() - last[0] < JOB_PROGRESS_INTERVAL_SECONDS: return
+                last[0] = time.monotonic()
+                self._update(job_id, progress=json.dumps(data, default=str))
+            work = SessionLocal()
+            try: result = self.handlers[kind](work, params, progress)
+            except Exception: work.rollback(); raise
+            finally: work.close()
+            self._update(job_id, status="DONE", result=json.dumps(result or {}, default=str), finished_at=datetime.utcnow())
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job_id, status="FAILED", error=f"{type(e).__name__}: {e}", finished_at=datetime.utcnow())
+        finally:
+            with self._lock: self._active.discard(job_id)
+
+    def _update(self, job_id: str, **fields):
+        db = SessionLocal()
+        try:
+            db.query(Job).filter(Job.id == job_id).update(fields, synchronize_session=False)
+            db.commit()
+        finally: db.close()
+
+def serialize_job(job: Job):
+    load = lambda v: json.loads(v) if v else None
+    return {"id": job.id, "kind": job.kind, "status": job.status, "params": load(job.params), "progress": load(job.progress), "result": load(job.result),
+            "error": job.error, "user_id": job.user_id, "created_at": job.created_at, "started_at": job.started_at, "finished_at": job.finished_at,
+            "heartbeat_at": job.heartbeat_at}
+
+def get_job(db, job_id: str):
+    job = db.query(Job).filter(Job.id == job_id).first()
+    return serialize_job(job) if job else None
+
+def list_jobs(db, limit: int = 50):
+    return [serialize_job(j) for j in db.query(Job).order_by(Job.created_at.desc()).limit(limit).all()]
+
+job_runner = JobRunner()
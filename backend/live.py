@@ -0,0 +1,153 @@
+import os
+import json
+import uuid
+import asyncio
+import itertools
+import threading
+from sqlalchemy import text
+from database import after_commit
+
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "64"))
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+LIVE_CHANNEL = os.getenv("LIVE_CHANNEL", "renca_live")
+LIVE_RECONNECT_SECONDS = float(os.getenv("LIVE_RECONNECT_SECONDS", "5"))
+
+class LiveSubscriber:
+    # Una conexión SSE: filtros opcionales y una cola acotada que vive en el event loop del servidor
+    def __init__(self, loop, category_id: int = None, series: str = None, match_id: int = None):
+        self.loop = loop
+        self.category_id = category_id; self.series = series; self.match_id = match_id
+        self.queue = asyncio.Queue(maxsize=LIVE_QUEUE_SIZE)
+        self.resyncs = 0
+
+    def wants(self, msg: dict):
+        if self.category_id is not None and msg.get("category_id") != self.category_id: return False
+        if self.series and msg.get("series") not in (None, self.series): return False
+        if self.match_id is not None and msg.get("match_id") != self.match_id: return False
+        return True
+
+    def push(self, item):
+        # Corre en el loop. Un cliente lento que llena su cola no frena a los demás: se vacía
+        # y se le pide un "resync" para que vuelva a pedir los datos completos.
+        if self.queue.full():
+            while not self.queue.empty(): self.queue.get_nowait()
+            self.queue.put_nowait((item[0], "resync", "{}"))
+            self.resyncs += 1
+            return
+        self.queue.put_nowait(item)
+
+class LiveBus:
+    # Pub/sub en memoria para el feed en vivo. crud.py publica dentro de la transacción de cada escritura (desde el
+    # threadpool); al confirmarse, cada suscriptor recibe el mensaje en su propio event loop vía call_soon_threadsafe.
+    # Con Postgres, además se hace NOTIFY para que los demás workers repartan a sus propios suscriptores.
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.origin = uuid.uuid4().hex[:12]
+        self.engine = None
+        self.notified = 0; self.received = 0
+
+    def attach(self, engine):
+        # Activa el NOTIFY entre workers; con SQLite (u otro motor) el bus queda solo en proceso
+        if engine.dialect.name == "postgresql": self.engine = engine
+
+    def notify(self, db, kind: str, data: dict):
+        # Aviso a los otros workers, sin repartir localmente. pg_notify va en la transacción de db y en su conexión:
+        # Postgres lo entrega justo cuando se confirman los datos y lo descarta si la transacción se deshace.
+        if not self.engine: return
+        payload = json.dumps({"origin": self.origin, "kind": kind, "data": data}, default=str)
+        db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": LIVE_CHANNEL, "payload": payload})
+        after_commit(db, self._count_notified)
+
+    def _count_notified(self):
+        self.notified += 1
+
+    def subscribe(self, loop, **filters):
+        sub = LiveSubscriber(loop, **filters)
+        with self._lock: self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: LiveSubscriber):
+        with self._lock: self._subscribers.discard(sub)
+
+    def has_subscribers(self):
+        # Con NOTIFY activo siempre hay que publicar: puede haber suscriptores en otro worker
+        if self.engine: return True
+        with self._lock: return bool(self._subscribers)
+
+    def publish(self, db, kind: str, data: dict):
+        # Antes del commit de db: NOTIFY en su transacción y reparto local cuando confirma
+        self.notify(db, kind, data)
+        after_commit(db, lambda: self.deliver(kind, data))
+
+    def deliver(self, kind: str, data: dict):
+        with self._lock:
+            subs = list(self._subscribers)
+            self.published += 1
+        if not subs: return
+        item = (next(self._ids), kind, json.dumps(data, default=str))
+        for sub in subs:
+            if not sub.wants(data): continue
+            try: sub.loop.call_soon_threadsafe(sub.push, item)
+            except RuntimeError: self.unsubscribe(sub)  # loop cerrado
+
+    async def stream(self, **filters):
+        # Generador SSE: mensajes con id/event/data y un comentario de heartbeat si no hay actividad
+        sub = self.subscribe(asyncio.get_running_loop(), **filters)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try: event_id, kind, payload = await asyncio.wait_for(sub.queue.get(), LIVE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"id: {event_id}\nevent: {kind}\ndata: {payload}\n\n"
+        finally:
+            self.unsubscribe(sub)
+
+    async def listen(self, on_message):
+        # LISTEN en una conexión psycopg2 dedicada, integrada al event loop con add_reader. Cada aviso de otro
+        # worker llega a on_message(kind, data); tras una reconexión se envía ("resync", {}) porque pudieron
+        # perderse avisos mientras la conexión estaba caída.
+        import psycopg2
+        loop = asyncio.get_running_loop()
+        dsn = self.engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        first = True
+        while True:
+            conn = None; queue = asyncio.Queue()
+            try:
+                conn = psycopg2.connect(dsn)
+                conn.autocommit = True
+                conn.cursor().execute(f"LISTEN {LIVE_CHANNEL}")
+                def ready():
+                    try: conn.poll()
+                    except Exception as e: queue.put_nowait(e); return
+                    while conn.notifies: queue.put_nowait(conn.notifies.pop(0).payload)
+                loop.add_reader(conn.fileno(), ready)
+                if not first: on_message("resync", {})
+                first = False
+                while True:
+                    payload = await queue.get()
+                    if isinstance(payload, Exception): raise payload
+                    msg = json.loads(payload)
+                    if msg.get("origin") == self.origin: continue
+                    self.received += 1
+                    on_message(msg["kind"], msg["data"])
+            except asyncio.CancelledError: raise
+            except Exception as e:
+                print(f"LISTEN {LIVE_CHANNEL} desconectado: {e}")
+            finally:
+                if conn is not None:
+                    try: loop.remove_reader(conn.fileno())
+                    except Exception: pass
+                    conn.close()
+            await asyncio.sleep(LIVE_RECONNECT_SECONDS)
+
+    def stats(self):
+        with self._lock:
+            return {"subscribers": len(self._subscribers), "published": self.published, "resyncs": sum(s.resyncs for s in self._subscribers),
+                    "backend": "postgres" if self.engine else "memory", "notified": self.notified, "received": self.received}
+
+live_bus = LiveBus()
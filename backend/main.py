@@ -1,28 +1,66 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, status
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Request, Response, WebSocket, WebSocketDisconnect, Query, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from jose import JWTError, jwt
-import bcrypt
-from datetime import datetime, timedelta
+from pydantic_core import to_json
+from datetime import date, datetime, timedelta
 import traceback
-import models, schemas, crud
-from database import SessionLocal, engine
+import models, schemas, crud, crud_async
+from security import get_password_hash, verify_password, needs_rehash
+from database import SessionLocal, engine, async_engine, AsyncSessionLocal, pool_stats, after_commit
+from cache import response_cache, data_versions, user_cache
+from live import live_bus
+from compression import CompressionMiddleware, Payload, negotiate, COMPRESS_MIN_BYTES
+from migrate import upgrade_database
+from roster_import import spool_upload, iter_roster_chunks
+from jobs import job_runner, get_job, list_jobs
+import update_logos, migrate_local_to_cloud
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional, Union
 import pandas as pd
-import io
 import os
+import io
+import csv
+import json
+import base64
+import asyncio
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 
 SECRET_KEY = os.getenv("SECRET_KEY", "renca-fc-secret-key-super-secure")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "1") == "1"
+# Admin inicial: si la base no tiene ningún admin al arrancar, se crea (o se promueve) este usuario
+INITIAL_ADMIN_USERNAME = os.getenv("INITIAL_ADMIN_USERNAME")
+INITIAL_ADMIN_PASSWORD = os.getenv("INITIAL_ADMIN_PASSWORD")
+WS_BATCH_SIZE = int(os.getenv("WS_BATCH_SIZE", "20"))
+WS_BATCH_WINDOW_SECONDS = float(os.getenv("WS_BATCH_WINDOW_MS", "50")) / 1000
+WS_AUTH_TIMEOUT_SECONDS = float(os.getenv("WS_AUTH_TIMEOUT_SECONDS", "10"))
+BCRYPT_MAX_WORKERS = int(os.getenv("BCRYPT_MAX_WORKERS", "2"))
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+bcrypt_executor = ThreadPoolExecutor(max_workers=BCRYPT_MAX_WORKERS, thread_name_prefix="bcrypt")
 
-models.Base.metadata.create_all(bind=engine)
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    # El esquema lo manejan las migraciones de Alembic (antes: create_all al importar + repair_db.py)
+    if AUTO_MIGRATE: await run_in_threadpool(upgrade_database)
+    await run_in_threadpool(bootstrap_admin)
+    # Con Postgres, cada worker escucha los cambios de los demás (LISTEN/NOTIFY); con SQLite el bus es local
+    live_bus.attach(engine)
+    listener = asyncio.create_task(live_bus.listen(apply_remote_change)) if live_bus.engine else None
+    await run_in_threadpool(job_runner.start)
+    yield
+    job_runner.shutdown()
+    if listener: listener.cancel()
+    if async_engine: await async_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -30,8 +68,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Data-Version"],
 )
 
+# br/gzip según Accept-Encoding para respuestas de COMPRESS_MIN_BYTES o más
+app.add_middleware(CompressionMiddleware)
+
 @app.middleware("http")
 async def catch_exceptions_middleware(request, call_next):
     try:
@@ -46,83 +88,295 @@ def get_db():
     try: yield db
     finally: db.close()
 
-def get_password_hash(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+def bootstrap_admin():
+    # Sin esto una base nueva no tiene admin y nadie puede dar el rol (ver también create_admin.py)
+    if not (INITIAL_ADMIN_USERNAME and INITIAL_ADMIN_PASSWORD): return
+    db = SessionLocal()
+    try:
+        if crud.has_admin(db): return
+        crud.grant_admin(db, INITIAL_ADMIN_USERNAME, get_password_hash(INITIAL_ADMIN_PASSWORD))
+    except IntegrityError: db.rollback()  # otro worker lo creó al mismo tiempo
+    finally: db.close()
+
+async def run_bcrypt(fn, *args):
+    # bcrypt ocupa CPU ~0.25 s por llamada con cost 12: fuera del loop y en un pool propio, así un pico de logins
+    # no bloquea el loop ni se come los hilos del threadpool de las rutas síncronas
+    return await asyncio.get_running_loop().run_in_executor(bcrypt_executor, fn, *args)
+
+def token_claims(token: str):
+    try: return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError: return None
+
+def load_user(claims: dict):
+    # Copia suelta (sin sesión) con lo que usan las rutas; los tokens anteriores solo traen "sub"
+    db = SessionLocal()
+    try:
+        if "uid" in claims: user = db.query(models.User).filter(models.User.id == claims["uid"]).first()
+        else: user = crud.get_user_by_username(db, username=claims.get("sub"))
+        return models.User(id=user.id, username=user.username, role=user.role) if user else None
+    finally: db.close()
 
-def verify_password(plain, hashed):
-    try: return bcrypt.checkpw(plain.encode('utf-8'), hashed.encode('utf-8'))
-    except: return False
+async def user_from_token(token: str):
+    # El JWT trae id y rol; la fila se confirma una vez por AUTH_CACHE_TTL_SECONDS (user_cache) y no en cada request
+    claims = token_claims(token)
+    if not claims: return None
+    key = ("uid", claims["uid"]) if "uid" in claims else ("sub", claims.get("sub"))
+    return await user_cache.aget_or_load(key, lambda: run_in_threadpool(load_user, claims))
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme)):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if not username: raise HTTPException(status_code=401)
-        user = crud.get_user_by_username(db, username=username)
+        user = await user_from_token(token)
         if not user: raise HTTPException(status_code=401)
         return user
     except: raise HTTPException(status_code=401)
 
+def is_admin(user: models.User):
+    return user.role == "admin"
+
+async def get_admin_user(current_user: models.User = Depends(get_current_user)):
+    if not is_admin(current_user): raise HTTPException(status_code=403)
+    return current_user
+
 @app.post("/token")
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.get_user_by_username(db, username=form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await run_in_threadpool(crud.get_user_by_username, db, form_data.username)
+    if not user or not await run_bcrypt(verify_password, form_data.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
-    return {"access_token": jwt.encode({"sub": user.username, "exp": datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)}, SECRET_KEY, algorithm=ALGORITHM), "token_type": "bearer"}
+    if needs_rehash(user.hashed_password):
+        hashed = await run_bcrypt(get_password_hash, form_data.password)
+        await run_in_threadpool(crud.update_user_password_hash, db, user, hashed)
+    claims = {"sub": user.username, "uid": user.id, "role": user.role, "exp": datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)}
+    return {"access_token": jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM), "token_type": "bearer"}
+
+# --- Caché de lecturas públicas ---
+def invalidate_match_data(category_id: int = None, scorers: bool = False):
+    # Resultado o evento de un partido: cambian partidos, tablas y detalle de clubes (y goleadores si fue un evento)
+    if category_id is None: response_cache.invalidate("matches"); response_cache.invalidate("leaderboard")
+    else: response_cache.invalidate("matches", category_id); response_cache.invalidate("leaderboard", category_id)
+    response_cache.invalidate("leaderboard_adultos"); response_cache.invalidate("club_details")
+    if scorers:
+        if category_id is None: response_cache.invalidate("top_scorers")
+        else: response_cache.invalidate("top_scorers", str(category_id))
+        response_cache.invalidate("top_scorers", "adultos")
+    if category_id is None: response_cache.invalidate("snapshot")
+    else: response_cache.invalidate("snapshot", str(category_id))
+    response_cache.invalidate("snapshot", "adultos")
+
+def invalidate_club_data():
+    # Nombre, logo o serie de un club aparecen anidados en casi todas las respuestas públicas
+    for name in ("clubs", "club_details", "matches", "leaderboard", "leaderboard_adultos", "top_scorers", "snapshot"): response_cache.invalidate(name)
+
+def invalidate_player_data():
+    response_cache.invalidate("club_details"); response_cache.invalidate("top_scorers"); response_cache.invalidate("snapshot")
+
+# --- ETag / If-None-Match ---
+def not_modified(request: Request, response: Response, *scopes):
+    # Devuelve un 304 si el cliente ya tiene la versión actual; si no, deja el ETag puesto en la respuesta.
+    # Se llama antes de tocar la BD, así un 304 no abre conexión ni pasa por el response_model. La versión queda en
+    # request.state para load_cached(): la entrada de caché que se responde es la de esa misma versión.
+    # El ETag sale de esa misma versión, no de una leída aparte: nunca acompaña a un cuerpo cargado antes.
+    stamp = request.state.data_stamp = data_versions.stamp(*scopes)
+    tag = data_versions.etag(f"{request.url.path}?{request.url.query}", stamp)
+    headers = {"ETag": tag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match")
+    # Comparación débil (RFC 9110): se ignora el prefijo W/ de ambos lados
+    if if_none_match and (if_none_match.strip() == "*" or tag[2:] in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+async def load_cached(request: Request, key: tuple, loader):
+    # response_cache con la versión que tomó not_modified antes de la carga: si una escritura confirma mientras
+    # corre loader, la entrada queda con la versión anterior y la próxima lectura la descarta y vuelve a cargar
+    return await response_cache.aget_or_load(key, loader, request.state.data_stamp)
+
+def category_scope(category_id):
+    # "adultos" agrupa varias categorías, así que depende de cualquier partido
+    try: return ("category", int(category_id))
+    except (TypeError, ValueError): return "matches"
+
+async def validated(schema, rows):
+    # Lo que se guarda en response_cache son modelos ya validados, no objetos ORM atados a una sesión cerrada
+    return [schema.model_validate(r) for r in await rows]
+
+async def encoded(rows):
+    # Filas ya con la forma del schema (crud.get_*_rows) codificadas una vez con el encoder de pydantic-core
+    return Payload(to_json(await rows))
+
+def json_bytes(payload: Payload, request: Request, response: Response):
+    # JSON ya codificado (response_cache guarda los bytes): no pasa por el encoder de FastAPI. Las rutas que lo usan
+    # declaran response_class=Response y el schema solo en responses (documentación), sin response_model.
+    # Los headers puestos en response (ETag, X-Data-Version) se copian porque se devuelve otro Response; la versión
+    # comprimida sale de la caché, así CompressionMiddleware no vuelve a comprimir en cada request.
+    headers = {**response.headers, "Vary": "Accept-Encoding"}
+    encoding = negotiate(request.headers.get("accept-encoding", "")) if len(payload.body) >= COMPRESS_MIN_BYTES else None
+    if not encoding: return Response(content=payload.body, media_type="application/json", headers=headers)
+    return Response(content=payload.encoded(encoding), media_type="application/json", headers={**headers, "Content-Encoding": encoding})
+
+def check_view(view: str):
+    if view not in ("full", "lite"): raise HTTPException(status_code=400, detail="view debe ser full o lite")
+
+def apply_remote_change(kind: str, data: dict):
+    # Cambio hecho por otro worker: mismas invalidaciones que haría la ruta de escritura y reparto a los suscriptores locales
+    if kind == "catalog":
+        data_versions.bump_catalog(); response_cache.clear()
+    elif kind == "users":
+        user_cache.clear()
+    elif kind == "resync":
+        data_versions.bump_match_data(); response_cache.clear(); live_bus.deliver("resync", {})
+    else:
+        data_versions.bump_match_data(data.get("category_id"))
+        invalidate_match_data(data.get("category_id"), scorers=kind != "match_created")
+        if kind != "match_created": live_bus.deliver(kind, data)
+
+@app.get("/cache/stats")
+def read_cache_stats(current_user: models.User = Depends(get_current_user)):
+    return response_cache.stats()
+
+@app.get("/db/pool-stats")
+def read_pool_stats(current_user: models.User = Depends(get_admin_user)):
+    return pool_stats()
 
 # --- Públicas ---
-@app.get("/clubs", response_model=List[schemas.Club])
-def read_clubs(db: Session = Depends(get_db)):
-    return crud.get_clubs(db)
+async def db_read(fn, *args, **kwargs):
+    # Lecturas públicas (funciones de crud_async): con ASYNC_DB=1 en el loop con una AsyncSession; si no, la
+    # versión síncrona de crud en el threadpool, como corrían antes las rutas def
+    if AsyncSessionLocal:
+        async with AsyncSessionLocal() as db: return await fn(db, *args, **kwargs)
+    def run():
+        db = SessionLocal()
+        try: return fn.sync(db, *args, **kwargs)
+        finally: db.close()
+    return await run_in_threadpool(run)
+
+@app.get("/clubs", response_class=Response, responses={200: {"model": List[schemas.Club]}})
+async def read_clubs(request: Request, response: Response):
+    if cached := not_modified(request, response, "catalog"): return cached
+    return json_bytes(await load_cached(request, ("clubs",), lambda: encoded(db_read(crud_async.get_club_rows))), request, response)
 
 @app.get("/clubs/{club_id}/details", response_model=schemas.ClubFullDetail)
-def read_club_details(club_id: int, db: Session = Depends(get_db)):
-    return crud.get_club_full_details(db, club_id)
+async def read_club_details(club_id: int, request: Request, response: Response):
+    if cached := not_modified(request, response, "catalog", "matches"): return cached
+    return await load_cached(request, ("club_details", club_id), lambda: db_read(crud_async.get_club_full_details, club_id))
 
 @app.get("/categories", response_model=List[schemas.Category])
-def read_categories(db: Session = Depends(get_db)):
-    return db.query(models.Category).all()
+async def read_categories(request: Request, response: Response):
+    if cached := not_modified(request, response, "catalog"): return cached
+    return await load_cached(request, ("categories",), lambda: validated(schemas.Category, db_read(crud_async.get_categories)))
 
 @app.get("/teams/{category_id}", response_model=List[schemas.Team])
-def read_teams(category_id: int, db: Session = Depends(get_db)):
-    return crud.get_teams_by_category(db, category_id)
-
-@app.get("/matches/{category_id}", response_model=List[schemas.Match])
-def read_matches(category_id: int, series: str = None, db: Session = Depends(get_db)):
-    return crud.get_matches_by_category(db, category_id, series)
+async def read_teams(category_id: int):
+    return await db_read(crud_async.get_teams_by_category, category_id)
+
+MATCH_PAGE_MAX = 500
+PLAYER_PAGE_MAX = 500
+
+def match_filters(match_day_id: int = None, date_from: date = Query(None, alias="from"), date_to: date = Query(None, alias="to"), is_played: bool = None):
+    # Filtros de /matches/{category_id} y /snapshot/{category_id}; solo los que vienen en la query
+    filters = {"match_day_id": match_day_id, "date_from": date_from, "date_to": date_to, "is_played": is_played}
+    return {k: v for k, v in filters.items() if v is not None}
+
+@app.get("/matches/{category_id}", response_class=Response,
+         responses={200: {"model": Union[List[schemas.Match], schemas.MatchChanges], "description": "view=full; con view=lite, IDs y tablas clubs/venues"}})
+async def read_matches(category_id: int, request: Request, response: Response, series: str = None, since: Optional[int] = None, view: str = "full",
+                       limit: int = None, cursor: str = None, filters: dict = Depends(match_filters)):
+    # Sin since: la lista (por fecha e id, los sin fecha al final), con la versión actual en X-Data-Version. Con
+    # since=<versión>: solo partidos, eventos e IDs de eventos borrados posteriores, para clientes con copia local.
+    # match_day_id, from, to e is_played filtran en ambos modos; limit/cursor paginan la lista por keyset
+    # y X-Next-Cursor trae el cursor de la página siguiente.
+    # view=lite: {"matches": [...IDs...], "clubs": {id: club}, "venues": {id: recinto}} en vez de objetos anidados.
+    check_view(view)
+    if since is not None and (limit or cursor): raise HTTPException(status_code=400, detail="since no se pagina")
+    page = max(1, min(limit, MATCH_PAGE_MAX)) if limit else None
+    after = decode_cursor(cursor, datetime.fromisoformat, int) if cursor else None
+    if cached := not_modified(request, response, "catalog", category_scope(category_id)): return cached
+    async def load():
+        data = await db_read(crud_async.get_match_changes, category_id, series, since, page + 1 if page else None, after=after, **filters)
+        next_cursor = None
+        if page and len(data["matches"]) > page:
+            data["matches"] = data["matches"][:page]
+            next_cursor = encode_cursor(data["matches"][-1]["match_date"], data["matches"][-1]["id"])
+        if since is None: payload = crud.lite_matches(data["matches"]) if view == "lite" else data["matches"]
+        else: payload = {**data, **crud.lite_matches(data["matches"])} if view == "lite" else data
+        return data["version"], next_cursor, Payload(to_json(payload))
+    key = ("matches", category_id, series, since, view, tuple(sorted(filters.items())), page, cursor)
+    version, next_cursor, payload = await load_cached(request, key, load)
+    response.headers["X-Data-Version"] = str(version)
+    if next_cursor: response.headers["X-Next-Cursor"] = next_cursor
+    return json_bytes(payload, request, response)
 
 @app.get("/matches/{match_id}/players", response_model=List[schemas.Player])
-def read_match_players(match_id: int, db: Session = Depends(get_db)):
-    return crud.get_match_players(db, match_id)
+async def read_match_players(match_id: int, response: Response, team_id: int = None, limit: int = None, cursor: str = None):
+    # Sin limit: los dos planteles completos. team_id deja solo uno de ellos; limit/cursor paginan por id (X-Next-Cursor)
+    page = max(1, min(limit, PLAYER_PAGE_MAX)) if limit else None
+    after = decode_cursor(cursor, int)[0] if cursor else None
+    players = await db_read(crud_async.get_match_players, match_id, team_id, after, page + 1 if page else None)
+    if page and len(players) > page:
+        players = players[:page]
+        response.headers["X-Next-Cursor"] = encode_cursor(players[-1].id)
+    return players
 
 @app.get("/matches/{match_id}/events", response_model=List[schemas.MatchEvent])
-def read_match_events(match_id: int, db: Session = Depends(get_db)):
-    return crud.get_match_events(db, match_id)
+async def read_match_events(match_id: int):
+    return await db_read(crud_async.get_match_events, match_id)
 
 @app.get("/matches/{match_id}/audit")
-def read_match_audit(match_id: int, db: Session = Depends(get_db)):
-    logs = crud.get_match_audit_logs(db, match_id)
+async def read_match_audit(match_id: int):
+    logs = await db_read(crud_async.get_match_audit_logs, match_id)
     return [{"id": l.id, "timestamp": l.timestamp, "user": {"username": l.user.username if l.user else "Sistema"}, "action": l.action, "details": l.details} for l in logs]
 
 @app.get("/top-scorers/{category_id}")
-def read_top_scorers(category_id: str, series: str = "HONOR", db: Session = Depends(get_db)):
-    return crud.get_top_scorers(db, category_id, series)
+async def read_top_scorers(category_id: str, request: Request, response: Response, series: str = "HONOR"):
+    if cached := not_modified(request, response, "catalog", category_scope(category_id)): return cached
+    return await load_cached(request, ("top_scorers", category_id, series), lambda: db_read(crud_async.get_top_scorers, category_id, series))
 
 @app.get("/leaderboard/{category_id}")
-def get_leaderboard(category_id: int, series: str = "HONOR", db: Session = Depends(get_db)):
-    return crud.get_leaderboard(db, category_id, series)
+async def get_leaderboard(category_id: int, request: Request, response: Response, series: str = "HONOR"):
+    if cached := not_modified(request, response, "catalog", category_scope(category_id)): return cached
+    return await load_cached(request, ("leaderboard", category_id, series), lambda: db_read(crud_async.get_leaderboard, category_id, series))
 
 @app.get("/leaderboard/aggregated/adultos")
-def get_adultos_leaderboard(series: str = "HONOR", db: Session = Depends(get_db)):
-    return crud.get_aggregated_adultos_leaderboard(db, series)
+async def get_adultos_leaderboard(request: Request, response: Response, series: str = "HONOR"):
+    if cached := not_modified(request, response, "catalog", "matches"): return cached
+    return await load_cached(request, ("leaderboard_adultos", series), lambda: db_read(crud_async.get_aggregated_adultos_leaderboard, series))
+
+@app.get("/snapshot/{category_id}", response_class=Response,
+         responses={200: {"model": schemas.CategorySnapshot, "description": "view=full; con view=lite, IDs y tablas clubs/venues"}})
+async def read_category_snapshot(category_id: str, request: Request, response: Response, series: str = "HONOR", view: str = "full",
+                                 filters: dict = Depends(match_filters)):
+    # Partidos, tabla y goleadores en una respuesta: una sesión de BD, una entrada de caché y un ETag para las tres.
+    # version cambia con cualquier escritura que afecte a la categoría (la misma que va en el ETag). Los filtros de
+    # /matches/{category_id} (p.ej. from para la fecha en curso) solo acotan los partidos.
+    # view=lite: partidos con IDs más las tablas clubs y venues (como en /matches/{category_id}?view=lite).
+    if category_id != "adultos" and not category_id.isdigit(): raise HTTPException(status_code=400, detail="Categoría inválida")
+    check_view(view)
+    if cached := not_modified(request, response, "catalog", category_scope(category_id)): return cached
+    version = request.state.data_stamp  # tomada antes de leer las filas: es la versión de la entrada de caché
+    async def load():
+        data = await db_read(crud_async.get_category_snapshot, category_id, series, **filters)
+        if view == "lite": data = {**data, **crud.lite_matches(data["matches"])}
+        return Payload(to_json({"category_id": category_id, "series": series, "version": version, **data}))
+    return json_bytes(await load_cached(request, ("snapshot", category_id, series, view, tuple(sorted(filters.items()))), load), request, response)
 
 @app.get("/venues", response_model=List[schemas.Venue])
-def read_venues(db: Session = Depends(get_db)):
-    return crud.get_venues(db)
+async def read_venues(request: Request, response: Response):
+    if cached := not_modified(request, response, "catalog"): return cached
+    return await load_cached(request, ("venues",), lambda: validated(schemas.Venue, db_read(crud_async.get_venues)))
 
 @app.get("/match-days", response_model=List[schemas.MatchDay])
-def read_match_days(db: Session = Depends(get_db)):
-    return crud.get_match_days(db)
+async def read_match_days(request: Request, response: Response):
+    if cached := not_modified(request, response, "catalog"): return cached
+    return await load_cached(request, ("match_days",), lambda: validated(schemas.MatchDay, db_read(crud_async.get_match_days)))
+
+# --- Feed en vivo (SSE) ---
+@app.get("/live/stream")
+async def live_stream(category_id: int = None, series: str = None, match_id: int = None):
+    stream = live_bus.stream(category_id=category_id, series=series, match_id=match_id)
+    return StreamingResponse(stream, media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/live/stats")
+def read_live_stats(current_user: models.User = Depends(get_current_user)):
+    return live_bus.stats()
 
 # --- Privadas ---
 @app.get("/users", response_model=List[schemas.User])
@@ -130,90 +384,306 @@ def list_users(db: Session = Depends(get_db), current_user: models.User = Depend
     return crud.get_users(db)
 
 @app.get("/teams/{team_id}/players", response_model=List[schemas.Player])
-def read_team_players(team_id: int, db: Session = Depends(get_db)):
-    return crud.get_team_players(db, team_id)
+async def read_team_players(team_id: int):
+    return await db_read(crud_async.get_team_players, team_id)
 
 @app.post("/users", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    if current_user.username != "admin_renca": raise HTTPException(status_code=403)
-    return crud.create_user(db, user, get_password_hash(user.password))
+async def create_user(user: schemas.UserCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_admin_user)):
+    if user.role not in (None, "admin", "operator"): raise HTTPException(status_code=400, detail="Rol inválido (admin u operator)")
+    hashed = await run_bcrypt(get_password_hash, user.password)
+    return await run_in_threadpool(crud.create_user, db, user, hashed)
 
 @app.delete("/users/{user_id}")
-def delete_user(user_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    if current_user.username != "admin_renca": raise HTTPException(status_code=403)
+def delete_user(user_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_admin_user)):
     if crud.delete_user(db, user_id): return {"ok": True}
     raise HTTPException(status_code=400)
 
 @app.post("/clubs", response_model=schemas.Club)
 def create_club(club: schemas.ClubCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return crud.create_club(db, club)
+    db_club = crud.create_club(db, club)
+    response_cache.invalidate("clubs"); response_cache.invalidate("leaderboard_adultos"); response_cache.invalidate("snapshot", "adultos")
+    return db_club
 
 @app.put("/clubs/{club_id}", response_model=schemas.Club)
 def update_club(club_id: int, club: schemas.ClubCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return crud.update_club(db, club_id, club)
+    db_club = crud.update_club(db, club_id, club)
+    invalidate_club_data()
+    return db_club
 
 @app.post("/teams", response_model=schemas.Team)
 def create_team(team: schemas.TeamCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return crud.create_team(db, team)
+    db_team = crud.create_team(db, team)
+    response_cache.invalidate("clubs"); response_cache.invalidate("club_details", team.club_id)
+    response_cache.invalidate("leaderboard", team.category_id); response_cache.invalidate("leaderboard_adultos")
+    response_cache.invalidate("snapshot", str(team.category_id)); response_cache.invalidate("snapshot", "adultos")
+    return db_team
 
 @app.post("/players", response_model=schemas.Player)
 def create_player(player: schemas.PlayerCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     p = crud.create_player(db, player)
     if not p: raise HTTPException(status_code=400, detail="Error al crear jugador")
+    invalidate_player_data()
     return p
 
 @app.post("/matches", response_model=schemas.Match)
 def create_match(match: schemas.MatchCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return crud.create_match(db, match)
+    db_match = crud.create_match(db, match)
+    response_cache.invalidate("matches", match.category_id); response_cache.invalidate("club_details"); response_cache.invalidate("snapshot", str(match.category_id))
+    return db_match
 
 @app.put("/matches/{match_id}/result", response_model=schemas.Match)
 def update_result(match_id: int, result: schemas.MatchUpdateResult, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     m = db.query(models.Match).filter(models.Match.id == match_id).first()
-    if m and m.is_played and current_user.username != "admin_renca": raise HTTPException(status_code=403)
-    return crud.update_match_result(db, match_id, result, user_id=current_user.id)
+    if m and m.is_played and not is_admin(current_user): raise HTTPException(status_code=403)
+    db_match = crud.update_match_result(db, match_id, result, user_id=current_user.id)
+    if db_match: invalidate_match_data(db_match.category_id)
+    return db_match
 
 @app.post("/match-events", response_model=schemas.MatchEvent)
 def create_event(event: schemas.MatchEventCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     m = db.query(models.Match).filter(models.Match.id == event.match_id).first()
-    if m and m.is_played and current_user.username != "admin_renca": raise HTTPException(status_code=403)
-    return crud.create_match_event(db, event, user_id=current_user.id)
+    if m and m.is_played and not is_admin(current_user): raise HTTPException(status_code=403)
+    db_event = crud.create_match_event(db, event, user_id=current_user.id)
+    invalidate_match_data(m.category_id if m else None, scorers=True)
+    return db_event
 
 @app.delete("/match-events/{event_id}")
 def delete_event(event_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     e = db.query(models.MatchEvent).filter(models.MatchEvent.id == event_id).first()
     if e:
         m = db.query(models.Match).filter(models.Match.id == e.match_id).first()
-        if m and m.is_played and current_user.username != "admin_renca": raise HTTPException(status_code=403)
-    if crud.delete_match_event(db, event_id, user_id=current_user.id): return {"ok": True}
+        if m and m.is_played and not is_admin(current_user): raise HTTPException(status_code=403)
+    if crud.delete_match_event(db, event_id, user_id=current_user.id):
+        invalidate_match_data(m.category_id if m else None, scorers=True)
+        return {"ok": True}
     raise HTTPException(status_code=404)
 
 @app.post("/match-days", response_model=schemas.MatchDay)
 def create_day(day: schemas.MatchDayCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return crud.create_match_day(db, day)
+    db_day = crud.create_match_day(db, day)
+    response_cache.invalidate("match_days")
+    return db_day
 
 @app.delete("/match-days/{id}")
 def delete_day(id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    if crud.delete_match_day(db, id): return {"ok": True}
+    if crud.delete_match_day(db, id):
+        response_cache.invalidate("match_days")
+        return {"ok": True}
     raise HTTPException(status_code=404)
 
+# --- Control de partido (WebSocket) ---
+def apply_control_batch(user: models.User, messages: list):
+    # Aplica un lote de mensajes del planillero en una sesión propia, en el orden en que llegaron, y devuelve un ack
+    # por mensaje (por "key"). Los eventos seguidos se registran juntos; un borrado o un error corta el grupo, así
+    # un borrado seguido de una nueva carga del mismo gol queda en ese orden.
+    db = SessionLocal()
+    try:
+        ops = []
+        for msg in messages:
+            key = msg.get("key")
+            if not key: ops.append((None, "error", "Falta key")); continue
+            if msg.get("type") == "event":
+                try: ops.append((key, "event", schemas.MatchEventCreate(**{f: msg.get(f) for f in ("match_id", "player_id", "event_type", "minute")})))
+                except Exception: ops.append((key, "error", "Evento inválido"))
+            elif msg.get("type") == "delete": ops.append((key, "delete", msg.get("event_id")))
+            else: ops.append((key, "error", "Tipo desconocido"))
+        # Estado de todos los partidos involucrados en una query, para el mismo control de permisos de las rutas HTTP
+        deleted_matches = dict(db.query(models.MatchEvent.id, models.MatchEvent.match_id).filter(models.MatchEvent.id.in_([v for _, op, v in ops if op == "delete"])).all())
+        match_ids = {v.match_id for _, op, v in ops if op == "event"} | set(deleted_matches.values())
+        matches = {m.id: m for m in db.query(models.Match.id, models.Match.category_id, models.Match.is_played).filter(models.Match.id.in_(match_ids)).all()}
+        def locked(match_id): return match_id in matches and matches[match_id].is_played and not is_admin(user)
+        acks = []; touched = set(); group = []
+        def flush():
+            by_key = dict(group)
+            for key, (event_id, duplicate) in crud.create_match_events_batch(db, group, user_id=user.id).items():
+                if event_id is None: acks.append({"type": "error", "key": key, "detail": "No se pudo registrar"}); continue
+                acks.append({"type": "ack", "key": key, "event_id": event_id, "duplicate": duplicate})
+                if not duplicate: touched.add(by_key[key].match_id)
+            group.clear()
+        for key, op, value in ops:
+            if op == "event" and value.match_id in matches and not locked(value.match_id): group.append((key, value)); continue
+            if group: flush()
+            if op == "error": acks.append({"type": "error", "key": key, "detail": value})
+            elif op == "event": acks.append({"type": "error", "key": key, "detail": "Partido cerrado" if value.match_id in matches else "Partido no encontrado"})
+            else:
+                match_id = deleted_matches.get(value)
+                if match_id is not None and locked(match_id): acks.append({"type": "error", "key": key, "detail": "Partido cerrado"}); continue
+                # Borrar un evento que ya no existe también es un ack: el reintento de un borrado es idempotente
+                if crud.delete_match_event(db, value, user_id=user.id): touched.add(match_id)
+                acks.append({"type": "ack", "key": key, "event_id": value})
+        if group: flush()
+        for category_id in {matches[m].category_id for m in touched if m in matches}: invalidate_match_data(category_id, scorers=True)
+        return acks
+    finally: db.close()
+
+@app.websocket("/ws/match-control")
+async def match_control_ws(websocket: WebSocket):
+    # Se autentica una vez con el primer mensaje, {"type": "auth", "token": ...} (en la URL el JWT quedaría en los
+    # logs de acceso); luego recibe eventos con "key" generada por el cliente y los aplica en lotes de hasta
+    # WS_BATCH_SIZE mensajes que lleguen dentro de WS_BATCH_WINDOW_MS.
+    await websocket.accept()
+    try: hello = await asyncio.wait_for(websocket.receive_json(), WS_AUTH_TIMEOUT_SECONDS)
+    except Exception: hello = None
+    token = hello.get("token") if isinstance(hello, dict) and hello.get("type") == "auth" else None
+    user = await user_from_token(token) if isinstance(token, str) else None
+    if not user: await websocket.close(code=status.WS_1008_POLICY_VIOLATION); return
+    await websocket.send_json({"type": "ready", "user": user.username})
+    inbox = asyncio.Queue()
+    async def reader():
+        try:
+            while True: await inbox.put(await websocket.receive_json())
+        except Exception: await inbox.put(None)
+    reader_task = asyncio.create_task(reader())
+    loop = asyncio.get_running_loop()
+    try:
+        closed = False
+        while not closed:
+            msg = await inbox.get()
+            if msg is None: break
+            batch = [msg]; deadline = loop.time() + WS_BATCH_WINDOW_SECONDS
+            while len(batch) < WS_BATCH_SIZE and (timeout := deadline - loop.time()) > 0:
+                try: msg = await asyncio.wait_for(inbox.get(), timeout)
+                except asyncio.TimeoutError: break
+                if msg is None: closed = True; break
+                batch.append(msg)
+            pings = [m for m in batch if isinstance(m, dict) and m.get("type") == "ping"]
+            batch = [m for m in batch if isinstance(m, dict) and m.get("type") != "ping"]
+            for _ in pings: await websocket.send_json({"type": "pong"})
+            if batch:
+                for ack in await run_in_threadpool(apply_control_batch, user, batch): await websocket.send_json(ack)
+    except WebSocketDisconnect: pass
+    finally: reader_task.cancel()
+
+AUDIT_PAGE_MAX = 1000
+
+def encode_cursor(*key):
+    return base64.urlsafe_b64encode(json.dumps([k.isoformat() if isinstance(k, datetime) else k for k in key]).encode()).decode()
+
+def decode_cursor(cursor: str, *types):
+    # Cada valor del cursor pasa por su tipo; None queda tal cual (partidos sin fecha)
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(key) != len(types): raise ValueError(cursor)
+        return tuple(None if v is None else t(v) for t, v in zip(types, key))
+    except Exception: raise HTTPException(status_code=400, detail="Cursor inválido")
+
 @app.get("/audit-logs")
-def read_audit_logs(limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    logs = crud.get_audit_logs(db, limit)
-    res = []
-    for l in logs:
-        info = "N/A"
+def read_audit_logs(response: Response, limit: int = 100, cursor: str = None, match_id: int = None, user_id: int = None, action: str = None,
+                    date_from: datetime = None, date_to: datetime = None, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    # La respuesta sigue siendo la lista; si hay más páginas, X-Next-Cursor trae el cursor para pedir la siguiente
+    limit = max(1, min(limit, AUDIT_PAGE_MAX))
+    logs = crud.get_audit_logs(db, limit + 1, decode_cursor(cursor, datetime.fromisoformat, int) if cursor else None, match_id=match_id, user_id=user_id, action=action, date_from=date_from, date_to=date_to)
+    if len(logs) > limit:
+        logs = logs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(logs[-1]["timestamp"], logs[-1]["id"])
+    return logs
+
+AUDIT_EXPORT_COLUMNS = ["id", "timestamp", "user_id", "user_name", "match_id", "match_info", "action", "details"]
+
+@app.get("/audit-logs/export")
+def export_audit_logs(format: str = "ndjson", match_id: int = None, user_id: int = None, action: str = None, date_from: datetime = None, date_to: datetime = None,
+                      current_user: models.User = Depends(get_current_user)):
+    # Exportación en streaming (NDJSON o CSV) con los mismos filtros: se recorre por páginas de keyset en una sesión
+    # propia que vive lo que dura la descarga, así la memoria no depende del tamaño de la bitácora
+    if format not in ("ndjson", "csv"): raise HTTPException(status_code=400, detail="Formato inválido (ndjson o csv)")
+    filters = {"match_id": match_id, "user_id": user_id, "action": action, "date_from": date_from, "date_to": date_to}
+    def rows():
+        db = SessionLocal()
         try:
-            if l.match: info = f"{l.match.home_team.club.name} vs {l.match.away_team.club.name}"
-        except: pass
-        res.append({"id": l.id, "action": l.action, "details": l.details, "timestamp": l.timestamp, "user_name": l.user.username if l.user else "Sistema", "match_info": info})
-    return res
+            if format == "csv":
+                buf = io.StringIO(); writer = csv.writer(buf)
+                writer.writerow(AUDIT_EXPORT_COLUMNS)
+                for i, log in enumerate(crud.iter_audit_logs(db, **filters), 1):
+                    writer.writerow([log[c] for c in AUDIT_EXPORT_COLUMNS])
+                    if i % crud.AUDIT_EXPORT_BATCH_SIZE == 0: yield buf.getvalue(); buf.seek(0); buf.truncate()
+                yield buf.getvalue()
+            else:
+                for log in crud.iter_audit_logs(db, **filters): yield json.dumps(log, default=str, ensure_ascii=False) + "\n"
+        finally: db.close()
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(rows(), media_type=media_type, headers={"Content-Disposition": f'attachment; filename="audit_logs.{format}"'})
 
 @app.post("/players/upload")
-async def upload_players(team_id: int, file: UploadFile = File(...), db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    df = pd.read_excel(io.BytesIO(await file.read()))
-    created, updated, errors = crud.bulk_create_players_from_excel(db, team_id, df)
+async def upload_players(team_id: int, file: UploadFile = File(...), current_user: models.User = Depends(get_current_user)):
+    # Planilla de un equipo. Leerla con pandas y guardarla frenaría el event loop (SSE, WebSocket, lecturas):
+    # se procesa como job en segundo plano y el resultado (created/updated/errors) se consulta en /jobs/{id}
+    path = await spool_upload(file, ".xlsx")
+    return await run_in_threadpool(job_runner.submit, "roster_import", {"path": path, "team_id": team_id, "filename": file.filename}, current_user.id)
+
+@app.post("/players/upload/league")
+async def upload_league_players(file: UploadFile = File(...), current_user: models.User = Depends(get_current_user)):
+    # Planilla o CSV de toda la liga (columnas nombre, rut, club, categoria). Se procesa como job en segundo
+    # plano; el avance se consulta en /jobs/{id}
+    path = await spool_upload(file, ".csv" if (file.filename or "").lower().endswith(".csv") else ".xlsx")
+    return await run_in_threadpool(job_runner.submit, "league_import", {"path": path, "filename": file.filename}, current_user.id)
+
+# --- Jobs en segundo plano ---
+def invalidate_all_data(db: Session):
+    # Recálculos y cambios masivos: todo lo público puede haber cambiado, en este worker y en los demás. El aviso va
+    # en la transacción de db (antes del commit que confirma el cambio) y la invalidación local corre al confirmar.
+    live_bus.notify(db, "catalog", {})
+    after_commit(db, lambda: (data_versions.bump_match_data(), response_cache.clear()))
+
+@job_runner.handler("league_import")
+def league_import_job(db: Session, params: dict, progress):
+    try: totals = crud.import_league_roster(db, iter_roster_chunks(params["path"]), on_progress=progress)
+    finally: os.remove(params["path"])
+    invalidate_player_data()
+    return totals
+
+@job_runner.handler("roster_import")
+def roster_import_job(db: Session, params: dict, progress):
+    try: df = pd.read_excel(params["path"])
+    finally: os.remove(params["path"])
+    created, updated, errors = crud.bulk_create_players_from_excel(db, params["team_id"], df)
+    invalidate_player_data()
     return {"created": created, "updated": updated, "errors": errors}
 
+@job_runner.handler("rebuild_standings")
+def rebuild_standings_job(db: Session, params: dict, progress):
+    invalidate_all_data(db)
+    teams = crud.rebuild_standings(db)
+    return {"teams": teams}
+
+@job_runner.handler("rebuild_player_stats")
+def rebuild_player_stats_job(db: Session, params: dict, progress):
+    invalidate_all_data(db)
+    players = crud.rebuild_player_stats(db)
+    return {"players": players}
+
+@job_runner.handler("update_logos")
+def update_logos_job(db: Session, params: dict, progress):
+    update_logos.update_club_logos()
+    invalidate_all_data(db); db.commit()
+    return {}
+
+@job_runner.handler("migrate_local_to_cloud")
+def migrate_local_to_cloud_job(db: Session, params: dict, progress):
+    report = migrate_local_to_cloud.migrate(params.get("source", "renca_fc.db"), on_progress=progress)
+    invalidate_all_data(db); db.commit()
+    return report
+
+@job_runner.handler("migrate_database")
+def migrate_database_job(db: Session, params: dict, progress):
+    upgrade_database()
+    return {}
+
+@app.post("/jobs")
+def submit_job(job: schemas.JobCreate, current_user: models.User = Depends(get_admin_user)):
+    # Las importaciones necesitan un archivo subido: se crean desde /players/upload y /players/upload/league
+    if job.kind not in job_runner.handlers or job.kind in ("roster_import", "league_import"): raise HTTPException(status_code=400, detail="Tipo de job inválido")
+    return job_runner.submit(job.kind, job.params, current_user.id)
+
+@app.get("/jobs")
+def read_jobs(limit: int = 50, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    return list_jobs(db, limit)
+
+@app.get("/jobs/{job_id}")
+def read_job(job_id: str, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    job = get_job(db, job_id)
+    if not job: raise HTTPException(status_code=404)
+    return job
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,14 @@
+import os
+from alembic import command
+from alembic.config import Config
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+def upgrade_database(revision: str = "head"):
+    # Aplica las migraciones pendientes de migrations/ sobre DATABASE_URL (reemplaza create_all y repair_db.py)
+    command.upgrade(Config(ALEMBIC_INI), revision)
+
+if __name__ == "__main__":
+    print("--- Aplicando migraciones ---")
+    upgrade_database()
+    print("Base de datos al día.")
@@ -1,122 +1,177 @@
-import sqlite3
+import io
 import os
-from sqlalchemy.orm import Session
-from database import SessionLocal
-from models import Player, Club, Category, Venue, Team
+import sys
+import time
+import hashlib
+import argparse
+from sqlalchemy import create_engine, inspect, select, insert, text
+from database import SessionLocal, engine
+from models import User, Club, Category, Venue, MatchDay, Team, Player, Match, MatchEvent, AuditLog, SyncMap
+import crud
 
-# Nombres de estadios por defecto (Solo campos que existen en el modelo)
-DEFAULT_VENUES = [
-    {"name": "Estadio Municipal de Renca", "address": "Domingo Santa María 3929"},
-    {"name": "Cancha La Catalana", "address": "Calle La Catalana s/n"}
-]
-
-def migrate():
-    print("--- Iniciando Migración a la Nube ---")
-    
-    # 1. Conexión a la Nube (Postgres)
-    db_cloud = SessionLocal()
-    
-    # --- PARTE 1: CREAR ESTADIOS ---
-    print("\n1. Verificando Estadios...")
-    for v_data in DEFAULT_VENUES:
-        exists = db_cloud.query(Venue).filter(Venue.name == v_data["name"]).first()
-        if not exists:
-            venue = Venue(**v_data)
-            db_cloud.add(venue)
-            print(f"   [+] Estadio creado: {venue.name}")
-        else:
-            print(f"   [v] Estadio ya existe: {v_data['name']}")
-    db_cloud.commit()
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "2000"))
 
-    # --- PARTE 2: MIGRAR JUGADORES ---
-    if not os.path.exists("renca_fc.db"):
-        print("\n[ERROR] No encuentro el archivo local 'renca_fc.db'.")
-        return
-
-    print("\n2. Leyendo base de datos local (renca_fc.db)...")
-    conn_local = sqlite3.connect("renca_fc.db")
-    cursor = conn_local.cursor()
-    
-    # Obtener jugadores locales con match de Club y Categoría
-    try:
-        cursor.execute("""
-            SELECT p.dni, p.name, p.birth_date, c.name as club_name, cat.name as cat_name
-            FROM players p
-            JOIN teams t ON p.team_id = t.id
-            JOIN clubs c ON t.club_id = c.id
-            JOIN categories cat ON t.category_id = cat.id
-        """)
-        local_players = cursor.fetchall()
-    except sqlite3.OperationalError:
-        # Por si la estructura local es diferente (p.ej. sin tabla teams intermedia en local)
-        cursor.execute("""
-            SELECT p.dni, p.name, p.birth_date, c.name as club_name, cat.name as cat_name
-            FROM players p
-            JOIN clubs c ON p.club_id = c.id
-            JOIN categories cat ON p.category_id = cat.id
-        """)
-        local_players = cursor.fetchall()
-
-    print(f"   -> Se encontraron {len(local_players)} jugadores en local.")
+# (entidad, modelo, clave natural, FKs -> entidad) en orden de dependencias. La clave natural permite reutilizar
+# filas que ya existen en la nube (p.ej. creadas por seed.py); sin clave natural siempre se inserta.
+ENTITIES = [
+    ("users", User, ("username",), {}),
+    ("clubs", Club, ("name",), {}),
+    ("categories", Category, ("name",), {}),
+    ("venues", Venue, ("name",), {}),
+    ("match_days", MatchDay, ("name", "start_date"), {}),
+    ("teams", Team, ("club_id", "category_id"), {"club_id": "clubs", "category_id": "categories"}),
+    ("players", Player, ("dni",), {"team_id": "teams"}),
+    ("matches", Match, ("category_id", "match_day_id", "home_team_id", "away_team_id"),
+     {"category_id": "categories", "match_day_id": "match_days", "home_team_id": "teams", "away_team_id": "teams", "venue_id": "venues"}),
+    ("match_events", MatchEvent, None, {"match_id": "matches", "player_id": "players"}),
+    ("audit_logs", AuditLog, None, {"match_id": "matches", "user_id": "users"}),
+]
 
-    # Cachear IDs de la nube (Teams es la clave aquí)
-    # Necesitamos el ID del TEAM (Club + Categoría) en la nube
-    teams_cloud = {}
-    for t in db_cloud.query(Team).join(Club).join(Category).all():
-        key = (t.club.name, t.category.name)
-        teams_cloud[key] = t.id
-    
-    # Cachear DNI (RUT) existentes en la nube
-    existing_dnis = {p.dni for p in db_cloud.query(Player.dni).all() if p.dni}
+def _copy_value(value):
+    # Formato text de COPY: \N es NULL y se escapan barra, tabulación y saltos de línea
+    if value is None: return "\\N"
+    if isinstance(value, bool): return "t" if value else "f"
+    if hasattr(value, "isoformat"): return value.isoformat()
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
 
-    count_migrated = 0
-    count_skipped = 0
-    count_error = 0
+def _copy(db, table_name, columns, values):
+    buf = io.StringIO()
+    for row in values: buf.write("\t".join(_copy_value(v) for v in row) + "\n")
+    buf.seek(0)
+    # Cursor crudo de la conexión de la sesión: el COPY queda en la misma transacción que el resto del lote
+    cursor = db.connection().connection.cursor()
+    try: cursor.copy_expert(f"COPY {table_name} ({', '.join(columns)}) FROM STDIN", buf)
+    finally: cursor.close()
 
-    print("\n3. Subiendo jugadores a Supabase...")
-    for row in local_players:
-        dni, name, birth_date, club_name, cat_name = row
-        
-        if dni and dni in existing_dnis:
-            count_skipped += 1
-            continue
+def _copy_rows(db, table, columns, rows):
+    # En Postgres los IDs se reservan de la secuencia y las filas entran con COPY
+    seq = db.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table.name}).scalar()
+    ids = db.execute(text("SELECT nextval(:s) FROM generate_series(1, :n)"), {"s": seq, "n": len(rows)}).scalars().all()
+    _copy(db, table.name, ["id"] + columns, ([new_id] + [row[c] for c in columns] for new_id, row in zip(ids, rows)))
+    return ids
 
-        # Buscar el Team ID correspondiente en la nube
-        team_id = teams_cloud.get((club_name, cat_name))
+def _insert_rows(db, table, columns, rows):
+    # Resto de motores: executemany con RETURNING en el orden de los parámetros
+    stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+    return db.execute(stmt, [{c: row[c] for c in columns} for row in rows]).scalars().all()
 
-        if team_id:
-            # Convertir fecha si es necesario
-            from datetime import datetime
-            b_date = None
-            if birth_date:
-                try:
-                    b_date = datetime.fromisoformat(birth_date)
-                except:
-                    b_date = None
+def _row_digest(row, columns):
+    # md5 de una fila como entero; la suma módulo 2^128 no depende del orden y se acumula de a lote
+    return int.from_bytes(hashlib.md5("\x1f".join("" if row[c] is None else str(row[c]) for c in columns).encode()).digest(), "big")
 
-            new_player = Player(
-                dni=dni,
-                name=name,
-                birth_date=b_date,
-                team_id=team_id
-            )
-            db_cloud.add(new_player)
-            count_migrated += 1
-        else:
-            count_error += 1
-            
-        if count_migrated % 50 == 0:
-            db_cloud.commit()
+def migrate(source_path: str = "renca_fc.db", batch_size: int = SYNC_BATCH_SIZE, rebuild: bool = True, on_progress=None):
+    # Copia todas las entidades del SQLite local a DATABASE_URL. Cada lote se confirma junto con sus filas de
+    # sync_map (ID local -> ID nube), que es a la vez el mapeo de FKs y el checkpoint: si se corta, al volver a
+    # correr se saltan las filas ya mapeadas, y una segunda corrida completa no inserta nada.
+    if not os.path.exists(source_path): raise FileNotFoundError(f"No encuentro la base local '{source_path}'")
+    source = create_engine(f"sqlite:///{source_path}")
+    source_key = os.path.abspath(source_path)
+    source_tables = set(inspect(source).get_table_names())
+    use_copy = engine.dialect.name == "postgresql"
+    db = SessionLocal()
+    maps, report = {}, {}
+    try:
+        for entity, model, natural_key, fks in ENTITIES:
+            table = model.__table__
+            if entity not in source_tables:
+                report[entity] = {"source": 0, "inserted": 0, "reused": 0, "seconds": 0.0, "rows_per_second": 0.0}; continue
+            # Solo las columnas que existen en ambos lados (la base local puede ser de una versión anterior)
+            source_cols = {c["name"] for c in inspect(source).get_columns(entity)}
+            columns = [c.name for c in table.columns if c.name != "id" and c.name in source_cols]
+            mapping = maps[entity] = dict(db.query(SyncMap.source_id, SyncMap.target_id).filter(SyncMap.source == source_key, SyncMap.entity == entity).all())
+            existing = {}
+            if natural_key:
+                existing = {tuple(r[1:]): r[0] for r in db.execute(select(table.c.id, *[table.c[c] for c in natural_key]))}
+            started = time.perf_counter()
+            inserted = reused = total = 0
+            with source.connect() as src:
+                result = src.execute(select(table.c.id, *[table.c[c] for c in columns]).order_by(table.c.id)).mappings()
+                while batch := result.fetchmany(batch_size):
+                    total += len(batch)
+                    pending, links = [], []
+                    for row in batch:
+                        if row["id"] in mapping: continue
+                        row = dict(row)
+                        for col, ref in fks.items():
+                            if col in row and row[col] is not None: row[col] = maps[ref].get(row[col])
+                        key = tuple(row[c] for c in natural_key) if natural_key else None
+                        if key and key[0] is not None and key in existing:
+                            links.append((row["id"], existing[key])); reused += 1
+                        else:
+                            pending.append(row)
+                    if pending:
+                        ids = (_copy_rows if use_copy else _insert_rows)(db, table, columns, pending)
+                        for row, new_id in zip(pending, ids):
+                            links.append((row["id"], new_id))
+                            if natural_key: existing[tuple(row[c] for c in natural_key)] = new_id
+                        inserted += len(pending)
+                    if links:
+                        if use_copy: _copy(db, "sync_map", ["source", "entity", "source_id", "target_id"], ((source_key, entity, s, t) for s, t in links))
+                        else: db.execute(insert(SyncMap.__table__), [{"source": source_key, "entity": entity, "source_id": s, "target_id": t} for s, t in links])
+                        db.commit()
+                        mapping.update(links)
+                    if on_progress: on_progress({"entity": entity, "rows": total, "inserted": inserted, "reused": reused})
+            seconds = time.perf_counter() - started
+            report[entity] = {"source": total, "inserted": inserted, "reused": reused, "seconds": round(seconds, 3),
+                              "rows_per_second": round(total / seconds, 1) if seconds else 0.0}
+            print(f"   {entity:<13} {total:>8} filas  {inserted:>8} nuevas  {reused:>6} reutilizadas  {report[entity]['rows_per_second']:>10.0f} filas/s")
+        verify(db, source, maps, report, batch_size)
+        # Las filas llegan con su versión de cambio; el contador sigue desde la mayor
+        report["change_version"] = crud.sync_change_version(db)
+        if rebuild:
+            # Tabla de posiciones y estadísticas son derivadas: se recalculan en destino en vez de copiarse
+            report["rebuilt"] = {"standings": crud.rebuild_standings(db), "player_stats": crud.rebuild_player_stats(db)}
+        return report
+    finally:
+        db.close()
+        source.dispose()
 
-    db_cloud.commit()
-    conn_local.close()
-    db_cloud.close()
-    
-    print("\n--- Resumen ---")
-    print(f"Migrados: {count_migrated}")
-    print(f"Omitidos (Ya existían): {count_skipped}")
-    print(f"Errores (Team no encontrado): {count_error}")
-    print("--------------------------------")
+def verify(db, source, maps, report, batch_size: int = SYNC_BATCH_SIZE):
+    # Conteos: cada fila local debe tener su ID en la nube. Checksums: el contenido de las filas locales (con las FKs
+    # traducidas) contra el de las filas de la nube a las que apuntan. Una diferencia indica filas que ya existían en
+    # la nube con otros datos (se reutilizan por clave natural y no se sobrescriben). La base local se recorre por
+    # keyset de a batch_size filas y de la nube se traen solo las filas de cada lote: la memoria no depende del
+    # tamaño de las tablas (audit_logs incluida).
+    source_tables = set(inspect(source).get_table_names())
+    for entity, model, _, fks in ENTITIES:
+        if entity not in source_tables: continue
+        table = model.__table__
+        source_cols = {c["name"] for c in inspect(source).get_columns(entity)}
+        columns = [c.name for c in table.columns if c.name != "id" and c.name in source_cols]
+        mapping = maps[entity]
+        local_count = mapped = local_sum = cloud_sum = 0
+        last_id = None
+        with source.connect() as src:
+            while True:
+                stmt = select(table.c.id, *[table.c[c] for c in columns]).order_by(table.c.id).limit(batch_size)
+                if last_id is not None: stmt = stmt.where(table.c.id > last_id)
+                local_rows = [dict(r) for r in src.execute(stmt).mappings()]
+                if not local_rows: break
+                last_id = local_rows[-1]["id"]
+                for row in local_rows:
+                    for col, ref in fks.items():
+                        if row.get(col) is not None: row[col] = maps[ref].get(row[col])
+                # Varias filas locales pueden apuntar a la misma de la nube (duplicados por clave natural)
+                targets = {mapping[r["id"]] for r in local_rows if r["id"] in mapping}
+                by_id = {r["id"]: dict(r) for r in db.execute(select(table.c.id, *[table.c[c] for c in columns]).where(table.c.id.in_(targets))).mappings()} if targets else {}
+                for row in local_rows:
+                    local_count += 1; local_sum = (local_sum + _row_digest(row, columns)) % 2**128
+                    cloud = by_id.get(mapping.get(row["id"]))
+                    if cloud is not None: mapped += 1; cloud_sum = (cloud_sum + _row_digest(cloud, columns)) % 2**128
+        local_sum, cloud_sum = f"{local_sum:032x}", f"{cloud_sum:032x}"
+        report[entity].update({"mapped": mapped, "count_ok": mapped == local_count,
+                               "checksum_local": local_sum, "checksum_cloud": cloud_sum, "checksum_ok": local_sum == cloud_sum})
+        status = "OK" if report[entity]["count_ok"] and report[entity]["checksum_ok"] else "DIFERENCIAS"
+        print(f"   {entity:<13} {local_count:>8} local  {mapped:>8} nube  md5 {local_sum[:8]} / {cloud_sum[:8]}  {status}")
 
 if __name__ == "__main__":
-    migrate()
+    parser = argparse.ArgumentParser(description="Copia la base SQLite local a DATABASE_URL (reanudable e idempotente)")
+    parser.add_argument("source", nargs="?", default="renca_fc.db")
+    parser.add_argument("--batch-size", type=int, default=SYNC_BATCH_SIZE)
+    parser.add_argument("--no-rebuild", action="store_true", help="No recalcular posiciones y estadísticas al terminar")
+    args = parser.parse_args()
+    print(f"--- Migrando {args.source} a la nube ---")
+    report = migrate(args.source, args.batch_size, rebuild=not args.no_rebuild)
+    ok = all(r.get("count_ok", True) and r.get("checksum_ok", True) for k, r in report.items() if k not in ("rebuilt", "change_version"))
+    print("Migración verificada." if ok else "Migración con diferencias (ver tabla).")
+    sys.exit(0 if ok else 1)
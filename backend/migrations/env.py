@@ -0,0 +1,29 @@
+from alembic import context
+from sqlalchemy import text
+from database import engine
+import models
+
+target_metadata = models.Base.metadata
+
+def run_migrations_offline():
+    context.configure(url=engine.url.render_as_string(hide_password=False), target_metadata=target_metadata, literal_binds=True, render_as_batch=engine.dialect.name == "sqlite")
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        # Con varios workers arrancando a la vez, solo uno migra; los demás esperan el lock y encuentran todo al día
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_lock(7261)"))
+            connection.commit()
+        try:
+            context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=connection.dialect.name == "sqlite")
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            if connection.dialect.name == "postgresql":
+                connection.execute(text("SELECT pg_advisory_unlock(7261)"))
+                connection.commit()
+
+if context.is_offline_mode(): run_migrations_offline()
+else: run_migrations_online()
@@ -0,0 +1,111 @@
+"""Esquema base (el que creaban create_all en main.py y los ALTER de repair_db.py)
+
+Crea solo lo que falta, así sirve tanto para una base nueva como para las bases
+existentes de Supabase y SQLite, que ya tienen las tablas.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _id():
+    return sa.Column("id", sa.Integer(), primary_key=True)
+
+
+TABLES = {
+    "users": lambda: [_id(), sa.Column("username", sa.String()), sa.Column("hashed_password", sa.String())],
+    "clubs": lambda: [_id(), sa.Column("name", sa.String()), sa.Column("logo_url", sa.String(), nullable=True), sa.Column("league_series", sa.String())],
+    "categories": lambda: [_id(), sa.Column("name", sa.String(), unique=True), sa.Column("parent_category", sa.String(), nullable=True),
+                           sa.Column("points_win", sa.Integer()), sa.Column("points_draw", sa.Integer()), sa.Column("points_loss", sa.Integer())],
+    "venues": lambda: [_id(), sa.Column("name", sa.String(), unique=True), sa.Column("location", sa.String(), nullable=True)],
+    "match_days": lambda: [_id(), sa.Column("name", sa.String()), sa.Column("start_date", sa.Date()), sa.Column("end_date", sa.Date())],
+    "teams": lambda: [_id(), sa.Column("club_id", sa.Integer(), sa.ForeignKey("clubs.id")), sa.Column("category_id", sa.Integer(), sa.ForeignKey("categories.id"))],
+    "players": lambda: [_id(), sa.Column("team_id", sa.Integer(), sa.ForeignKey("teams.id")), sa.Column("name", sa.String()), sa.Column("dni", sa.String()),
+                        sa.Column("number", sa.Integer(), nullable=True), sa.Column("birth_date", sa.Date(), nullable=True)],
+    "matches": lambda: [_id(), sa.Column("category_id", sa.Integer(), sa.ForeignKey("categories.id")), sa.Column("match_day_id", sa.Integer(), sa.ForeignKey("match_days.id")),
+                        sa.Column("home_team_id", sa.Integer(), sa.ForeignKey("teams.id")), sa.Column("away_team_id", sa.Integer(), sa.ForeignKey("teams.id")),
+                        sa.Column("venue_id", sa.Integer(), sa.ForeignKey("venues.id")), sa.Column("match_date", sa.DateTime()),
+                        sa.Column("home_score", sa.Integer()), sa.Column("away_score", sa.Integer()), sa.Column("is_played", sa.Boolean())],
+    "match_events": lambda: [_id(), sa.Column("match_id", sa.Integer(), sa.ForeignKey("matches.id")), sa.Column("player_id", sa.Integer(), sa.ForeignKey("players.id")),
+                             sa.Column("event_type", sa.String()), sa.Column("minute", sa.Integer()), sa.Column("client_key", sa.String(), nullable=True)],
+    "standings": lambda: [_id(), sa.Column("team_id", sa.Integer(), sa.ForeignKey("teams.id")), sa.Column("category_id", sa.Integer(), sa.ForeignKey("categories.id")),
+                          sa.Column("club_id", sa.Integer(), sa.ForeignKey("clubs.id"))] + [sa.Column(c, sa.Integer()) for c in ("pj", "pg", "pe", "pp", "gf", "gc", "pts")],
+    "player_stats": lambda: [_id(), sa.Column("player_id", sa.Integer(), sa.ForeignKey("players.id"))] + [sa.Column(c, sa.Integer()) for c in ("goals", "yellow_cards", "red_cards", "appearances")],
+    "audit_logs": lambda: [_id(), sa.Column("match_id", sa.Integer(), sa.ForeignKey("matches.id"), nullable=True), sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+                           sa.Column("action", sa.String()), sa.Column("details", sa.Text()), sa.Column("timestamp", sa.DateTime())],
+}
+
+# (tabla, columnas, único) de los índices que ya declaraba models.py con index=True
+INDEXES = [(t, ["id"], False) for t in TABLES] + [
+    ("users", ["username"], True), ("clubs", ["name"], True), ("players", ["dni"], True),
+    ("match_events", ["client_key"], True), ("standings", ["team_id"], True), ("standings", ["category_id"], False), ("standings", ["club_id"], False),
+    ("player_stats", ["player_id"], True), ("player_stats", ["goals"], False),
+]
+
+# Columnas que repair_db.py agregaba con ALTER TABLE a bases creadas con versiones anteriores
+LEGACY_COLUMNS = [
+    ("matches", sa.Column("match_day_id", sa.Integer(), sa.ForeignKey("match_days.id"))),
+    ("venues", sa.Column("location", sa.String(), nullable=True)),
+    ("match_events", sa.Column("minute", sa.Integer(), server_default="0")),
+    ("match_events", sa.Column("client_key", sa.String(), nullable=True)),
+    ("clubs", sa.Column("league_series", sa.String(), server_default="HONOR")),
+    ("categories", sa.Column("parent_category", sa.String(), nullable=True)),
+    ("categories", sa.Column("points_win", sa.Integer(), server_default="3")),
+    ("categories", sa.Column("points_draw", sa.Integer(), server_default="1")),
+    ("categories", sa.Column("points_loss", sa.Integer(), server_default="0")),
+]
+
+# standings es derivada: si se crea sobre una base con partidos, se llena acá (mismo cálculo que
+# crud.rebuild_standings), porque las escrituras solo le suman y restan el aporte de cada cambio
+FILL_STANDINGS = """
+INSERT INTO standings (team_id, category_id, club_id, pj, pg, pe, pp, gf, gc, pts)
+SELECT t.id, t.category_id, t.club_id, COUNT(r.team_id),
+       COALESCE(SUM(CASE WHEN r.gf > r.gc THEN 1 ELSE 0 END), 0),
+       COALESCE(SUM(CASE WHEN r.gf = r.gc THEN 1 ELSE 0 END), 0),
+       COALESCE(SUM(CASE WHEN r.gf < r.gc THEN 1 ELSE 0 END), 0),
+       COALESCE(SUM(r.gf), 0), COALESCE(SUM(r.gc), 0),
+       COALESCE(SUM(CASE WHEN r.gf > r.gc THEN c.points_win WHEN r.gf = r.gc THEN c.points_draw WHEN r.gf < r.gc THEN c.points_loss ELSE 0 END), 0)
+FROM teams t JOIN categories c ON c.id = t.category_id
+LEFT JOIN (SELECT home_team_id AS team_id, home_score AS gf, away_score AS gc FROM matches WHERE is_played OR home_score > 0 OR away_score > 0
+           UNION ALL
+           SELECT away_team_id, away_score, home_score FROM matches WHERE is_played OR home_score > 0 OR away_score > 0) r ON r.team_id = t.id
+GROUP BY t.id, t.category_id, t.club_id
+"""
+
+# player_stats, igual que crud.rebuild_player_stats (una presencia = un partido con algún evento del jugador)
+FILL_PLAYER_STATS = """
+INSERT INTO player_stats (player_id, goals, yellow_cards, red_cards, appearances)
+SELECT player_id, SUM(CASE WHEN event_type = 'GOAL' THEN 1 ELSE 0 END), SUM(CASE WHEN event_type = 'YELLOW_CARD' THEN 1 ELSE 0 END),
+       SUM(CASE WHEN event_type = 'RED_CARD' THEN 1 ELSE 0 END), COUNT(DISTINCT match_id)
+FROM match_events WHERE player_id IN (SELECT id FROM players)
+GROUP BY player_id
+"""
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = set(inspector.get_table_names())
+    for table, columns in TABLES.items():
+        if table not in existing: op.create_table(table, *columns())
+    for table, column in LEGACY_COLUMNS:
+        if table in existing and column.name not in {c["name"] for c in inspector.get_columns(table)}:
+            with op.batch_alter_table(table) as batch: batch.add_column(column)
+    for table, columns, unique in INDEXES:
+        name = f"ix_{table}_{'_'.join(columns)}"
+        if table not in existing or name not in {i["name"] for i in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns, unique=unique)
+    if "standings" not in existing and "matches" in existing: op.execute(FILL_STANDINGS)
+    if "player_stats" not in existing and "match_events" in existing: op.execute(FILL_PLAYER_STATS)
+
+
+def downgrade():
+    # Esta revisión adopta bases existentes con sus datos: bajarla borraría las tablas de producción
+    raise NotImplementedError("0001_baseline no se puede revertir (adopta las tablas existentes con sus datos)")
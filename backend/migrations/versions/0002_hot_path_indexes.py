@@ -0,0 +1,54 @@
+"""Índices de las consultas frecuentes y unicidad de equipos y partidos
+
+Revision ID: 0002_hot_path_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_hot_path_indexes"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_teams_category_id", "teams", ["category_id"]),
+    ("ix_players_team_id", "players", ["team_id"]),
+    ("ix_matches_category_date", "matches", ["category_id", "match_date"]),
+    ("ix_matches_home_team_id", "matches", ["home_team_id"]),
+    ("ix_matches_away_team_id", "matches", ["away_team_id"]),
+    ("ix_match_events_match_id", "match_events", ["match_id"]),
+    ("ix_match_events_player_type", "match_events", ["player_id", "event_type"]),
+    ("ix_audit_logs_match_timestamp", "audit_logs", ["match_id", "timestamp"]),
+    ("ix_audit_logs_timestamp", "audit_logs", ["timestamp"]),
+]
+
+UNIQUE = [
+    ("ux_teams_club_category", "teams", ["club_id", "category_id"]),
+    ("ux_matches_fixture", "matches", ["category_id", "match_day_id", "home_team_id", "away_team_id"]),
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    # Los índices únicos fallarían con un error poco claro si ya hay duplicados; se listan antes de crearlos. Las
+    # filas con algún NULL en la clave (p.ej. partidos sin fecha) no chocan en el índice, así que no cuentan.
+    for name, table, columns in UNIQUE:
+        cols = ", ".join(columns)
+        not_null = " AND ".join(f"{c} IS NOT NULL" for c in columns)
+        dups = bind.execute(sa.text(f"SELECT {cols}, COUNT(*) FROM {table} WHERE {not_null} GROUP BY {cols} HAVING COUNT(*) > 1")).fetchall()
+        if dups:
+            raise RuntimeError(f"No se puede crear {name}: hay {len(dups)} grupos duplicados en {table} ({cols}), p.ej. {list(dups[0])}. Eliminar los duplicados y volver a migrar.")
+    # Una base creada con create_all y los modelos actuales ya los tiene
+    inspector = sa.inspect(bind)
+    existing = {i["name"] for table in {t for _, t, _ in INDEXES + UNIQUE} for i in inspector.get_indexes(table)}
+    for name, table, columns in INDEXES:
+        if name not in existing: op.create_index(name, table, columns)
+    for name, table, columns in UNIQUE:
+        if name not in existing: op.create_index(name, table, columns, unique=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES + UNIQUE):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,28 @@
+"""Tabla sync_map: mapeo de IDs y checkpoint de la migración local -> nube
+
+Revision ID: 0004_sync_map
+Revises: 0003_jobs
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_sync_map"
+down_revision = "0003_jobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table("sync_map"): return
+    op.create_table(
+        "sync_map",
+        sa.Column("source", sa.String(), primary_key=True),
+        sa.Column("entity", sa.String(), primary_key=True),
+        sa.Column("source_id", sa.Integer(), primary_key=True),
+        sa.Column("target_id", sa.Integer()),
+    )
+
+
+def downgrade():
+    op.drop_table("sync_map")
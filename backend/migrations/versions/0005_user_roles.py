@@ -0,0 +1,25 @@
+"""Rol de usuario (admin / operator); el super administrador existente pasa a admin
+
+Revision ID: 0005_user_roles
+Revises: 0004_sync_map
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_user_roles"
+down_revision = "0004_sync_map"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "role" not in {c["name"] for c in sa.inspect(op.get_bind()).get_columns("users")}:
+        with op.batch_alter_table("users") as batch: batch.add_column(sa.Column("role", sa.String(), server_default="operator"))
+    # Hasta ahora el admin era el usuario con este nombre (comparado en cada ruta). En una base nueva el primer admin
+    # sale de INITIAL_ADMIN_USERNAME/INITIAL_ADMIN_PASSWORD al arrancar o de create_admin.py
+    op.execute("UPDATE users SET role = 'admin' WHERE username = 'admin_renca'")
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch: batch.drop_column("role")
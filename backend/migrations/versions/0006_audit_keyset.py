@@ -0,0 +1,28 @@
+"""Índices de la paginación por keyset de /audit-logs: (timestamp, id) y (user_id, timestamp)
+
+ix_audit_logs_timestamp queda cubierto por ix_audit_logs_timestamp_id y se elimina.
+
+Revision ID: 0006_audit_keyset
+Revises: 0005_user_roles
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_audit_keyset"
+down_revision = "0005_user_roles"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = {i["name"] for i in sa.inspect(op.get_bind()).get_indexes("audit_logs")}
+    if "ix_audit_logs_timestamp_id" not in existing: op.create_index("ix_audit_logs_timestamp_id", "audit_logs", ["timestamp", "id"])
+    if "ix_audit_logs_user_timestamp" not in existing: op.create_index("ix_audit_logs_user_timestamp", "audit_logs", ["user_id", "timestamp"])
+    if "ix_audit_logs_timestamp" in existing: op.drop_index("ix_audit_logs_timestamp", table_name="audit_logs")
+
+
+def downgrade():
+    op.create_index("ix_audit_logs_timestamp", "audit_logs", ["timestamp"])
+    op.drop_index("ix_audit_logs_user_timestamp", table_name="audit_logs")
+    op.drop_index("ix_audit_logs_timestamp_id", table_name="audit_logs")
@@ -0,0 +1,59 @@
+"""Versión de cambio en partidos y eventos, eventos borrados y contador para /matches/{id}?since=
+
+Las filas existentes quedan con versión 0: un cliente parte de la lista completa y su X-Data-Version.
+
+Revision ID: 0007_change_versions
+Revises: 0006_audit_keyset
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_change_versions"
+down_revision = "0006_audit_keyset"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_matches_category_version", "matches", ["category_id", "version"]),
+    ("ix_match_events_match_version", "match_events", ["match_id", "version"]),
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table in ("matches", "match_events"):
+        if "version" not in {c["name"] for c in inspector.get_columns(table)}:
+            with op.batch_alter_table(table) as batch:
+                batch.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="0"))
+    existing = {i["name"] for table in ("matches", "match_events") for i in inspector.get_indexes(table)}
+    for name, table, columns in INDEXES:
+        if name not in existing: op.create_index(name, table, columns)
+    if not inspector.has_table("deleted_match_events"):
+        op.create_table(
+            "deleted_match_events",
+            sa.Column("event_id", sa.Integer(), primary_key=True),
+            sa.Column("match_id", sa.Integer(), sa.ForeignKey("matches.id")),
+            sa.Column("version", sa.Integer(), nullable=False),
+        )
+        op.create_index("ix_deleted_match_events_match_version", "deleted_match_events", ["match_id", "version"])
+    if not inspector.has_table("change_counter"):
+        op.create_table(
+            "change_counter",
+            sa.Column("name", sa.String(), primary_key=True),
+            sa.Column("value", sa.Integer(), nullable=False),
+        )
+    if bind.execute(sa.text("SELECT COUNT(*) FROM change_counter WHERE name = 'matches'")).scalar() == 0:
+        bind.execute(sa.text("INSERT INTO change_counter (name, value) VALUES ('matches', 0)"))
+
+
+def downgrade():
+    op.drop_table("change_counter")
+    op.drop_index("ix_deleted_match_events_match_version", table_name="deleted_match_events")
+    op.drop_table("deleted_match_events")
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    for table in ("match_events", "matches"):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("version")
@@ -0,0 +1,31 @@
+"""Índices de los filtros de /matches/{category_id}: por fecha (jornada) y por jugado, ordenados por match_date
+
+Rango de fechas y keyset usan ix_matches_category_date, que ya existe.
+
+Revision ID: 0008_match_filters
+Revises: 0007_change_versions
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_match_filters"
+down_revision = "0007_change_versions"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_matches_category_day", ["category_id", "match_day_id", "match_date"]),
+    ("ix_matches_category_played", ["category_id", "is_played", "match_date"]),
+]
+
+
+def upgrade():
+    existing = {i["name"] for i in sa.inspect(op.get_bind()).get_indexes("matches")}
+    for name, columns in INDEXES:
+        if name not in existing: op.create_index(name, "matches", columns)
+
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name="matches")
@@ -0,0 +1,26 @@
+"""heartbeat_at en jobs: al arrancar, un worker solo da por interrumpidos los jobs sin heartbeat reciente
+
+Los jobs PENDING/RUNNING que ya existen quedan sin heartbeat y se marcan FAILED en el próximo arranque, como antes.
+
+Revision ID: 0009_job_heartbeat
+Revises: 0008_match_filters
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009_job_heartbeat"
+down_revision = "0008_match_filters"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "heartbeat_at" not in {c["name"] for c in sa.inspect(op.get_bind()).get_columns("jobs")}:
+        with op.batch_alter_table("jobs") as batch:
+            batch.add_column(sa.Column("heartbeat_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("jobs") as batch:
+        batch.drop_column("heartbeat_at")
@@ -0,0 +1,39 @@
+"""match_events con AUTOINCREMENT en SQLite: un id borrado no vuelve a usarse
+
+Sin AUTOINCREMENT, SQLite entrega de nuevo el mayor id después de borrarlo: el evento nuevo quedaba con el id de una
+fila de deleted_match_events (los clientes de ?since= lo daban por borrado y un segundo borrado fallaba). La
+secuencia parte del mayor id visto, también de los ya borrados, y se quitan las marcas de borrado de ids que hoy
+están vivos por esa reutilización. En Postgres los ids salen de una secuencia y no se reutilizan: no cambia nada.
+
+Revision ID: 0010_match_events_autoincrement
+Revises: 0009_job_heartbeat
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010_match_events_autoincrement"
+down_revision = "0009_job_heartbeat"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite": return
+    # Una base creada con create_all y los modelos actuales ya la tiene
+    ddl = bind.execute(sa.text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'match_events'")).scalar()
+    if "AUTOINCREMENT" not in ddl.upper():
+        with op.batch_alter_table("match_events", recreate="always", table_kwargs={"sqlite_autoincrement": True}):
+            pass
+    op.execute("DELETE FROM deleted_match_events WHERE event_id IN (SELECT id FROM match_events)")
+    top = "MAX((SELECT COALESCE(MAX(id), 0) FROM match_events), (SELECT COALESCE(MAX(event_id), 0) FROM deleted_match_events))"
+    op.execute(f"UPDATE sqlite_sequence SET seq = MAX(seq, {top}) WHERE name = 'match_events'")
+    op.execute(f"INSERT INTO sqlite_sequence (name, seq) SELECT 'match_events', {top} WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'match_events')")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite": return
+    with op.batch_alter_table("match_events", recreate="always", table_kwargs={"sqlite_autoincrement": False}):
+        pass
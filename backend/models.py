@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Date, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Date, Text, Index
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -8,6 +8,7 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
     hashed_password = Column(String)
+    role = Column(String, default="operator", server_default="operator")
     audit_logs = relationship("AuditLog", back_populates="user")
 
 class Club(Base):
@@ -36,6 +37,10 @@ class Team(Base):
     club = relationship("Club", back_populates="teams")
     category = relationship("Category", back_populates="teams")
     players = relationship("Player", back_populates="team")
+    __table_args__ = (
+        Index("ux_teams_club_category", "club_id", "category_id", unique=True),
+        Index("ix_teams_category_id", "category_id"),
+    )
 
 class Player(Base):
     __tablename__ = "players"
@@ -46,6 +51,7 @@ class Player(Base):
     number = Column(Integer, nullable=True)
     birth_date = Column(Date, nullable=True)
     team = relationship("Team", back_populates="players")
+    __table_args__ = (Index("ix_players_team_id", "team_id"),)
 
 class Venue(Base):
     __tablename__ = "venues"
@@ -72,12 +78,22 @@ class Match(Base):
     home_score = Column(Integer, default=0)
     away_score = Column(Integer, default=0)
     is_played = Column(Boolean, default=False)
+    version = Column(Integer, default=0, server_default="0", nullable=False)  # ChangeCounter al último cambio (?since=)
     
     home_team = relationship("Team", foreign_keys=[home_team_id])
     away_team = relationship("Team", foreign_keys=[away_team_id])
     venue = relationship("Venue")
     audit_logs = relationship("AuditLog", back_populates="match")
     match_events = relationship("MatchEvent", back_populates="match")
+    __table_args__ = (
+        Index("ix_matches_category_date", "category_id", "match_date"),
+        Index("ix_matches_home_team_id", "home_team_id"),
+        Index("ix_matches_away_team_id", "away_team_id"),
+        Index("ux_matches_fixture", "category_id", "match_day_id", "home_team_id", "away_team_id", unique=True),
+        Index("ix_matches_category_version", "category_id", "version"),
+        Index("ix_matches_category_day", "category_id", "match_day_id", "match_date"),
+        Index("ix_matches_category_played", "category_id", "is_played", "match_date"),
+    )
 
 class MatchEvent(Base):
     __tablename__ = "match_events"
@@ -86,8 +102,58 @@ class MatchEvent(Base):
     player_id = Column(Integer, ForeignKey("players.id"))
     event_type = Column(String)
     minute = Column(Integer, default=0)
+    client_key = Column(String, unique=True, index=True, nullable=True)  # clave de idempotencia del cliente (WebSocket)
+    version = Column(Integer, default=0, server_default="0", nullable=False)
     match = relationship("Match", back_populates="match_events")
     player = relationship("Player")
+    __table_args__ = (
+        Index("ix_match_events_match_id", "match_id"),
+        Index("ix_match_events_player_type", "player_id", "event_type"),
+        Index("ix_match_events_match_version", "match_id", "version"),
+        # En SQLite, sin AUTOINCREMENT se reutiliza el mayor id tras borrarlo y chocaría con su fila en deleted_match_events
+        {"sqlite_autoincrement": True},
+    )
+
+class DeletedMatchEvent(Base):
+    # Eventos borrados, para que ?since= pueda informar los IDs a los clientes que guardan una copia local
+    __tablename__ = "deleted_match_events"
+    event_id = Column(Integer, primary_key=True)
+    match_id = Column(Integer, ForeignKey("matches.id"))
+    version = Column(Integer, nullable=False)
+    __table_args__ = (Index("ix_deleted_match_events_match_version", "match_id", "version"),)
+
+class ChangeCounter(Base):
+    # Contador monotónico de cambios de partidos y eventos. Cada escritura toma el siguiente valor con un UPDATE
+    # que bloquea la fila hasta el commit, así las versiones quedan confirmadas en orden.
+    __tablename__ = "change_counter"
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+class Standing(Base):
+    __tablename__ = "standings"
+    id = Column(Integer, primary_key=True, index=True)
+    team_id = Column(Integer, ForeignKey("teams.id"), unique=True, index=True)
+    category_id = Column(Integer, ForeignKey("categories.id"), index=True)
+    club_id = Column(Integer, ForeignKey("clubs.id"), index=True)
+    pj = Column(Integer, default=0)
+    pg = Column(Integer, default=0)
+    pe = Column(Integer, default=0)
+    pp = Column(Integer, default=0)
+    gf = Column(Integer, default=0)
+    gc = Column(Integer, default=0)
+    pts = Column(Integer, default=0)
+    team = relationship("Team")
+    category = relationship("Category")
+
+class PlayerStats(Base):
+    __tablename__ = "player_stats"
+    id = Column(Integer, primary_key=True, index=True)
+    player_id = Column(Integer, ForeignKey("players.id"), unique=True, index=True)
+    goals = Column(Integer, default=0, index=True)
+    yellow_cards = Column(Integer, default=0)
+    red_cards = Column(Integer, default=0)
+    appearances = Column(Integer, default=0)
+    player = relationship("Player")
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
@@ -99,3 +165,35 @@ class AuditLog(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     user = relationship("User", back_populates="audit_logs")
     match = relationship("Match", back_populates="audit_logs")
+    __table_args__ = (
+        Index("ix_audit_logs_match_timestamp", "match_id", "timestamp"),
+        Index("ix_audit_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_audit_logs_user_timestamp", "user_id", "timestamp"),
+    )
+
+class Job(Base):
+    __tablename__ = "jobs"
+    id = Column(String, primary_key=True)
+    kind = Column(String)
+    status = Column(String, default="PENDING")
+    params = Column(Text, nullable=True)
+    progress = Column(Text, nullable=True)
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)  # lo renueva el worker que tiene el job (jobs.JOB_LEASE_SECONDS)
+    __table_args__ = (
+        Index("ix_jobs_created_at", "created_at"),
+        Index("ix_jobs_status", "status"),
+    )
+
+class SyncMap(Base):
+    # Mapeo de IDs de migrate_local_to_cloud.py (origen -> destino); también sirve de checkpoint para retomar
+    __tablename__ = "sync_map"
+    source = Column(String, primary_key=True)
+    entity = Column(String, primary_key=True)
+    source_id = Column(Integer, primary_key=True)
+    target_id = Column(Integer)
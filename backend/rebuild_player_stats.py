@@ -0,0 +1,20 @@
+from database import SessionLocal
+from migrate import upgrade_database
+import crud
+
+def rebuild():
+    # Crea la tabla player_stats si no existe (migraciones) y la recalcula completa desde match_events
+    upgrade_database()
+    db = SessionLocal()
+    print("--- Recalculando estadísticas de jugadores (player_stats) ---")
+    try:
+        count = crud.rebuild_player_stats(db)
+        print(f"¡Listo! {count} jugadores con eventos recalculados.")
+    except Exception as e:
+        db.rollback()
+        print(f"Error recalculando player_stats: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild()
@@ -0,0 +1,20 @@
+from database import SessionLocal
+from migrate import upgrade_database
+import crud
+
+def rebuild():
+    # Crea la tabla standings si no existe (migraciones) y la recalcula completa desde matches
+    upgrade_database()
+    db = SessionLocal()
+    print("--- Recalculando tabla de posiciones (standings) ---")
+    try:
+        count = crud.rebuild_standings(db)
+        print(f"¡Listo! {count} equipos recalculados.")
+    except Exception as e:
+        db.rollback()
+        print(f"Error recalculando standings: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild()
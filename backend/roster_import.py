@@ -0,0 +1,35 @@
+import os
+import tempfile
+import pandas as pd
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+async def spool_upload(file, suffix: str):
+    # Copia el archivo subido a disco de a 1 MB, sin tenerlo entero en memoria
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(fd, "wb") as out:
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES): out.write(chunk)
+    return path
+
+def iter_roster_chunks(path: str, batch_size: int = IMPORT_BATCH_SIZE):
+    # DataFrames de a batch_size filas: CSV con read_csv(chunksize) y Excel con openpyxl en modo read-only,
+    # así la memoria no depende del tamaño del archivo
+    if path.lower().endswith(".csv"):
+        with open(path, encoding="utf-8-sig") as f:
+            yield from pd.read_csv(f, chunksize=batch_size, dtype=str, sep=None, engine="python")
+        return
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None: return
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                yield pd.DataFrame(batch, columns=header, dtype=object); batch = []
+        if batch: yield pd.DataFrame(batch, columns=header, dtype=object)
+    finally:
+        wb.close()
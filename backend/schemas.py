@@ -16,9 +16,11 @@ class UserBase(BaseModel):
 
 class UserCreate(UserBase):
     password: Optional[str] = None
+    role: Optional[str] = None  # "admin" u "operator" (por defecto)
 
 class User(UserBase):
     id: Optional[int] = None
+    role: Optional[str] = None
     model_config = ConfigDict(from_attributes=True)
 
 # 3. Club Base (Para evitar referencias circulares)
@@ -145,6 +147,13 @@ class MatchEvent(MatchEventBase):
     player: Optional[Player] = None
     model_config = ConfigDict(from_attributes=True)
 
+class MatchChanges(BaseModel):
+    # /matches/{category_id}?since=: lo que cambió después de esa versión
+    version: int
+    matches: List[Match] = []
+    events: List[MatchEvent] = []
+    deleted_event_ids: List[int] = []
+
 # 11. Auditoría
 class AuditLog(BaseModel):
     id: Optional[int] = None
@@ -169,3 +178,17 @@ class ClubFullDetail(BaseModel):
     logo_url: Optional[str] = None
     league_series: Optional[str] = None
     categories: List[ClubCategoryDetail] = []
+
+# 13. Jobs en segundo plano
+class JobCreate(BaseModel):
+    kind: str
+    params: Optional[dict] = None
+
+# 14. Snapshot de categoría (partidos + tabla + goleadores)
+class CategorySnapshot(BaseModel):
+    category_id: str
+    series: Optional[str] = None
+    version: str
+    matches: List[Match] = []
+    standings: List[dict] = []
+    top_scorers: List[dict] = []
@@ -0,0 +1,20 @@
+import os
+import bcrypt
+
+# Hash y verificación de contraseñas (bcrypt). Módulo aparte para que create_admin.py no tenga que importar main
+# (engines, cachés, bus en vivo, runner de jobs). main.run_bcrypt los corre fuera del event loop.
+
+# Costo de bcrypt (log2 de las iteraciones); al cambiarlo, cada usuario se rehashea en su siguiente login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+def get_password_hash(password):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+def verify_password(plain, hashed):
+    try: return bcrypt.checkpw(plain.encode('utf-8'), hashed.encode('utf-8'))
+    except: return False
+
+def needs_rehash(hashed):
+    # "$2b$12$..." -> 12; un hash que no se puede leer también se regenera
+    try: return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (AttributeError, IndexError, ValueError): return True
@@ -1,9 +1,10 @@
-from database import SessionLocal, engine
-from models import Base, Category, Club, Team
+from database import SessionLocal
+from models import Category, Club, Team
+from migrate import upgrade_database
 
 def seed_data():
     # Crear tablas si no existen
-    Base.metadata.create_all(bind=engine)
+    upgrade_database()
     
     db = SessionLocal()
     
@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+# Base SQLite propia en el directorio temporal (database.py lee DATABASE_URL al importarse); seed() solo borra esas
+TEST_DIR = tempfile.mkdtemp(prefix="renca_fc_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'renca_fc.db')}"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from fastapi.testclient import TestClient
+from database import SessionLocal, engine
+from models import User
+from bench_data import seed
+import main
+
+@pytest.fixture(scope="session", autouse=True)
+def league():
+    seed(n_clubs=8, rounds=6)
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture(scope="session")
+def client(league):
+    with TestClient(main.app) as client:
+        yield client
+
+@pytest.fixture(scope="session")
+def admin(league):
+    db = SessionLocal()
+    if not db.query(User).filter(User.username == "tests_admin").first(): db.add(User(username="tests_admin", hashed_password="x", role="admin")); db.commit()
+    db.close()
+    token = main.jwt.encode({"sub": "tests_admin", "role": "admin", "exp": datetime.utcnow() + timedelta(hours=1)}, main.SECRET_KEY, algorithm=main.ALGORITHM)
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def count_queries():
+    # Cuenta las sentencias que llegan a la base mientras dura el test
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    yield statements
+    event.remove(engine, "before_cursor_execute", listener)
@@ -0,0 +1,21 @@
+import os
+import sys
+import subprocess
+import security
+from models import User
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_create_admin_does_not_load_the_app():
+    code = "import sys, create_admin; print(sorted(m for m in ('main', 'jobs', 'fastapi') if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, capture_output=True, text=True)
+    assert result.returncode == 0 and result.stdout.strip() == "[]", result.stderr
+
+def test_login_rehashes_on_cost_change(client, db, monkeypatch):
+    db.add(User(username="tests_login", hashed_password=security.get_password_hash("clave"), role="operator")); db.commit()
+    assert client.post("/token", data={"username": "tests_login", "password": "otra"}).status_code == 401
+    monkeypatch.setattr(security, "BCRYPT_ROUNDS", security.BCRYPT_ROUNDS + 1)
+    assert client.post("/token", data={"username": "tests_login", "password": "clave"}).status_code == 200
+    db.expire_all()
+    hashed = db.query(User.hashed_password).filter(User.username == "tests_login").scalar()
+    assert hashed.startswith(f"$2b${security.BCRYPT_ROUNDS:02d}$") and security.verify_password("clave", hashed)
@@ -0,0 +1,16 @@
+import pytest
+import crud
+from models import Club
+from bench_data import CLUB_DETAILS_MAX_QUERIES, legacy_get_club_full_details
+
+@pytest.mark.parametrize("club_id", [1, 2, 5, 0])
+def test_club_details_match_legacy(db, club_id):
+    assert crud.get_club_full_details(db, club_id) == legacy_get_club_full_details(db, club_id)
+
+def test_club_details_query_count(db, count_queries):
+    # Cota fija, sin importar cuántas categorías y jugadores tenga el club
+    club_id = db.query(Club.id).first()[0]
+    db.expire_all()
+    count_queries.clear()
+    crud.get_club_full_details(db, club_id)
+    assert 0 < len(count_queries) <= CLUB_DETAILS_MAX_QUERIES
@@ -0,0 +1,53 @@
+import crud
+import schemas
+from database import SessionLocal
+from models import Match, MatchEvent, Player
+
+CATEGORY_ID = 1
+
+def category_events(db):
+    return {e for (e,) in db.query(MatchEvent.id).join(Match).filter(Match.category_id == CATEGORY_ID)}
+
+def test_local_copy_plus_delta_equals_full_list(client, admin, db):
+    # Lista completa, luego ?since=<versión> tras un resultado, un gol, una tarjeta y un borrado
+    full = client.get(f"/matches/{CATEGORY_ID}")
+    version = int(full.headers["x-data-version"])
+    local = {m["id"]: m for m in full.json()}
+    local_events = category_events(db)
+    assert client.get(f"/matches/{CATEGORY_ID}?since={version}").json()["matches"] == []
+    matches = full.json()
+    home = db.query(Player.id).filter(Player.team_id == matches[1]["home_team_id"]).first()[0]
+    removed = db.query(MatchEvent.id).filter(MatchEvent.match_id.in_([m["id"] for m in matches[3:]])).first()[0]
+    client.put(f"/matches/{matches[0]['id']}/result", json={"home_score": 3, "away_score": 1, "is_played": True}, headers=admin)
+    client.post("/match-events", json={"match_id": matches[1]["id"], "player_id": home, "event_type": "GOAL", "minute": 10}, headers=admin)
+    client.post("/match-events", json={"match_id": matches[1]["id"], "player_id": home, "event_type": "YELLOW_CARD", "minute": 20}, headers=admin)
+    assert client.delete(f"/match-events/{removed}", headers=admin).status_code == 200
+    changes = client.get(f"/matches/{CATEGORY_ID}?since={version}").json()
+    assert changes["version"] > version and len(changes["matches"]) >= 2 and removed in changes["deleted_event_ids"]
+    local.update({m["id"]: m for m in changes["matches"]})
+    local_events = (local_events | {e["id"] for e in changes["events"]}) - set(changes["deleted_event_ids"])
+    db.expire_all()
+    assert sorted(local.values(), key=lambda m: m["id"]) == sorted(client.get(f"/matches/{CATEGORY_ID}").json(), key=lambda m: m["id"])
+    assert local_events == category_events(db)
+    # Renombrar un jugador cambia sus eventos (llevan nombre y número): vuelven en el delta siguiente
+    session = SessionLocal()
+    crud.update_player(session, home, schemas.PlayerUpdate(name="Jugador Renombrado", number=99))
+    session.close()
+    touched = [e for e in client.get(f"/matches/{CATEGORY_ID}?since={changes['version']}").json()["events"] if e["player_id"] == home]
+    assert touched and all(e["player"]["name"] == "Jugador Renombrado" and e["player"]["number"] == 99 for e in touched)
+
+def test_deleted_event_id_is_not_reused(client, admin, db):
+    # Cargar un gol, borrarlo, cargar otro y borrarlo: en SQLite el segundo tomaba el id del primero y el segundo
+    # borrado chocaba con su marca en deleted_match_events (500)
+    match = db.query(Match).filter(Match.category_id == 4, Match.is_played == False).first()
+    player_id = db.query(Player.id).filter(Player.team_id == match.home_team_id).first()[0]
+    version = int(client.get(f"/matches/{CATEGORY_ID}").headers["x-data-version"])
+    goal = {"match_id": match.id, "player_id": player_id, "event_type": "GOAL", "minute": 1}
+    first = client.post("/match-events", json=goal, headers=admin).json()["id"]
+    assert client.delete(f"/match-events/{first}", headers=admin).status_code == 200
+    second = client.post("/match-events", json=goal, headers=admin).json()["id"]
+    assert second != first
+    changes = client.get(f"/matches/4?since={version}").json()
+    assert first in changes["deleted_event_ids"] and second not in changes["deleted_event_ids"] and second in {e["id"] for e in changes["events"]}
+    assert client.delete(f"/match-events/{second}", headers=admin).status_code == 200
+    assert {first, second} <= set(client.get(f"/matches/4?since={version}").json()["deleted_event_ids"])
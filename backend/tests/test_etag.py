@@ -0,0 +1,44 @@
+import pytest
+import crud
+import schemas
+import main
+from database import SessionLocal
+from models import Match, Team, Club
+
+@pytest.mark.parametrize("path", ["/leaderboard/1", "/snapshot/1", "/clubs", "/matches/1"])
+def test_if_none_match_returns_304(client, path):
+    first = client.get(path)
+    assert first.status_code == 200 and first.headers["etag"].startswith('W/"') and "Accept-Encoding" in first.headers["vary"]
+    again = client.get(path, headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == first.headers["etag"]
+
+def test_result_changes_the_etag(client, admin, db):
+    first = client.get("/snapshot/1")
+    match_id = first.json()["matches"][0]["id"]
+    client.put(f"/matches/{match_id}/result", json={"home_score": 9, "away_score": 0, "is_played": True}, headers=admin)
+    after = client.get("/snapshot/1", headers={"If-None-Match": first.headers["etag"]})
+    assert after.status_code == 200 and after.headers["etag"] != first.headers["etag"]
+    assert next(m for m in after.json()["matches"] if m["id"] == match_id)["home_score"] == 9
+
+@pytest.mark.parametrize("path", ["/leaderboard/1", "/snapshot/1"])
+def test_write_during_load_is_not_cached_as_new(client, db, monkeypatch, path):
+    # Un resultado confirma mientras la respuesta se carga: la entrada queda con la versión anterior, la siguiente
+    # lectura vuelve a la base en vez de servir la tabla vieja con el ETag nuevo
+    # Partido de la serie HONOR (la de /leaderboard por defecto) con un marcador distinto al actual
+    match_id, score = db.query(Match.id, Match.home_score).join(Team, Match.home_team_id == Team.id).join(Club) \
+        .filter(Match.category_id == 1, Club.league_series == "HONOR").first()
+    real_read, pending = main.db_read, [score + 7]
+    async def racing_read(fn, *args, **kwargs):
+        rows = await real_read(fn, *args, **kwargs)
+        while pending:
+            session = SessionLocal()
+            crud.update_match_result(session, match_id, schemas.MatchUpdateResult(home_score=pending.pop(), away_score=0, is_played=True))
+            session.close(); main.invalidate_match_data(1)
+        return rows
+    monkeypatch.setattr(main, "db_read", racing_read)
+    goals = lambda body: sum(r["gf"] for r in (body if isinstance(body, list) else body["standings"]))
+    main.response_cache.clear()
+    first = client.get(path)
+    second = client.get(path, headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 200 and goals(second.json()) != goals(first.json())
+    assert client.get(path, headers={"If-None-Match": second.headers["etag"]}).status_code == 304
@@ -0,0 +1,49 @@
+import os
+import time
+import pandas as pd
+import crud
+from models import Player, Team
+from bench_data import generate_roster, legacy_bulk_create_players_from_excel
+
+def roster(tmp_path, n_rows):
+    path = os.path.join(tmp_path, f"plantel_{n_rows}.xlsx")
+    generate_roster(n_rows, path)
+    return pd.read_excel(path)
+
+def test_counts_match_legacy(db, tmp_path):
+    # Mismos creados/actualizados que la importación fila a fila, con RUTs nuevos y con los mismos RUTs ya cargados
+    team_a, team_b = [t for (t,) in db.query(Team.id).limit(2)]
+    df = roster(tmp_path, 200)
+    dnis = df["RUT"].str.replace(r"[.\-]", "", regex=True).tolist()
+    def fresh(): db.query(Player).filter(Player.dni.in_(dnis)).delete(synchronize_session=False); db.commit()
+    fresh(); legacy = legacy_bulk_create_players_from_excel(db, team_a, df.copy())
+    fresh(); assert crud.bulk_create_players_from_excel(db, team_a, df.copy()) == legacy == (200, 0, [])
+    assert crud.bulk_create_players_from_excel(db, team_b, df.copy()) == legacy_bulk_create_players_from_excel(db, team_b, df.copy()) == (0, 200, [])
+    assert db.query(Player).filter(Player.dni.in_(dnis), Player.team_id == team_b).count() == 200
+
+def test_invalid_rows_are_reported_by_row(db):
+    team_id = db.query(Team.id).first()[0]
+    df = pd.DataFrame({"Nombre": ["Ana Pérez", "", "Luis Soto", "Eva Rojas", "Ana Pérez", "Iván Mella"],
+                       "RUT": ["11.111.111-1", "22.222.222-2", "", "12.345.678-9", "11111111-1", "12.345.678-5"]})
+    created, updated, errors = crud.bulk_create_players_from_excel(db, team_id, df)
+    assert (created, updated) == (2, 0)
+    assert errors == ["Fila 3: falta el nombre (222222222)", "Fila 4: falta el RUT (Luis Soto)", "Fila 5: RUT inválido (123456789)",
+                      "Fila 6: RUT repetido en el archivo (111111111)"]
+    assert db.query(Player.name).filter(Player.dni == "123456785").scalar() == "Iván Mella"
+
+def test_missing_columns(db):
+    assert crud.bulk_create_players_from_excel(db, 1, pd.DataFrame({"Jugador": ["Ana"], "Club": ["X"]})) == (0, 0, ["Excel inválido."])
+
+def test_upload_runs_as_a_job(client, admin, db, tmp_path):
+    # /players/upload no procesa la planilla en el event loop: devuelve el job y el resultado queda en /jobs/{id}
+    team_id = db.query(Team.id).offset(3).first()[0]
+    path = os.path.join(tmp_path, "equipo.xlsx")
+    pd.DataFrame({"Nombre": ["Rosa Díaz", "Tomás Vera"], "RUT": ["7.654.321-6", "bad"]}).to_excel(path, index=False)
+    with open(path, "rb") as f:
+        job = client.post(f"/players/upload?team_id={team_id}", files={"file": ("equipo.xlsx", f)}, headers=admin).json()
+    assert job["kind"] == "roster_import" and job["status"] in ("PENDING", "RUNNING", "DONE")
+    deadline = time.monotonic() + 10
+    while job["status"] in ("PENDING", "RUNNING") and time.monotonic() < deadline:
+        time.sleep(0.05); job = client.get(f"/jobs/{job['id']}", headers=admin).json()
+    assert job["status"] == "DONE" and job["result"] == {"created": 1, "updated": 0, "errors": ["Fila 3: RUT inválido (BAD)"]}
+    assert db.query(Player.team_id).filter(Player.dni == "76543216").scalar() == team_id
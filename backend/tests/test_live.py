@@ -0,0 +1,26 @@
+import crud
+import schemas
+from live import live_bus
+from models import Match, Player
+
+def test_publish_is_delivered_only_on_commit(db, monkeypatch):
+    delivered = []
+    monkeypatch.setattr(live_bus, "deliver", lambda kind, data: delivered.append((kind, data["match_id"])))
+    live_bus.publish(db, "score", {"match_id": -1})
+    db.rollback()
+    live_bus.publish(db, "score", {"match_id": -2})
+    assert delivered == []
+    db.commit()
+    assert delivered == [("score", -2)]
+
+def test_write_paths_publish_with_their_commit(db, monkeypatch):
+    delivered = []
+    monkeypatch.setattr(live_bus, "has_subscribers", lambda: True)
+    monkeypatch.setattr(live_bus, "deliver", lambda kind, data: delivered.append((kind, data)))
+    match = db.query(Match).filter(Match.category_id == 3).first()
+    player_id = db.query(Player.id).filter(Player.team_id == match.away_team_id).first()[0]
+    event = crud.create_match_event(db, schemas.MatchEventCreate(match_id=match.id, player_id=player_id, event_type="GOAL", minute=70))
+    crud.delete_match_event(db, event.id)
+    [(added, goal), (deleted, removed)] = delivered
+    assert (added, goal["event"]["id"], deleted, removed["event_id"]) == ("event", event.id, "event_deleted", event.id)
+    assert removed["away_score"] == goal["away_score"] - 1
@@ -0,0 +1,47 @@
+import main
+from models import Match, MatchEvent, Player, User, AuditLog
+
+def authenticate(socket, admin):
+    socket.send_json({"type": "auth", "token": admin["Authorization"].split()[1]})
+    assert socket.receive_json()["type"] == "ready"
+
+def test_auth_is_required(client):
+    with client.websocket_connect("/ws/match-control") as socket:
+        socket.send_json({"type": "auth", "token": "no-es-un-jwt"})
+        message = socket.receive()
+        assert message["type"] == "websocket.close" and message["code"] == 1008
+
+def test_retried_key_is_applied_once(client, admin, db):
+    match = db.query(Match).filter(Match.category_id == 2).first()
+    player_id = db.query(Player.id).filter(Player.team_id == match.home_team_id).first()[0]
+    before = db.query(MatchEvent).filter(MatchEvent.match_id == match.id).count()
+    event = {"type": "event", "key": "tests-retry-1", "match_id": match.id, "player_id": player_id, "event_type": "GOAL", "minute": 33}
+    with client.websocket_connect("/ws/match-control") as socket:
+        authenticate(socket, admin)
+        socket.send_json(event)
+        first = socket.receive_json()
+        # El reintento (p.ej. tras reconectar sin recibir el ack) devuelve el mismo evento marcado como duplicado
+        socket.send_json(event)
+        second = socket.receive_json()
+    assert first == {"type": "ack", "key": "tests-retry-1", "event_id": first["event_id"], "duplicate": False}
+    assert second == {**first, "duplicate": True}
+    assert db.query(MatchEvent).filter(MatchEvent.match_id == match.id).count() == before + 1
+
+def test_batch_is_applied_in_arrival_order(admin, db):
+    # Corrección del planillero en un lote: borra el gol mal cargado y lo vuelve a cargar con otro jugador
+    match = db.query(Match).filter(Match.category_id == 2).offset(1).first()
+    scorer, fixed = [p for (p,) in db.query(Player.id).filter(Player.team_id == match.home_team_id).limit(2)]
+    user = db.query(User).filter(User.username == "tests_admin").one()
+    [added] = main.apply_control_batch(user, [{"type": "event", "key": "tests-order-1", "match_id": match.id, "player_id": scorer, "event_type": "GOAL", "minute": 5}])
+    goals = lambda: db.query(Match.home_score).filter(Match.id == match.id).scalar()
+    before = goals()
+    messages = [{"type": "delete", "key": "tests-order-2", "event_id": added["event_id"]},
+                {"type": "event", "key": "tests-order-3", "match_id": match.id, "player_id": fixed, "event_type": "GOAL", "minute": 5},
+                {"type": "bogus", "key": "tests-order-4"},
+                {"type": "event", "key": "tests-order-5", "match_id": match.id, "player_id": fixed, "event_type": "YELLOW_CARD", "minute": 6}]
+    acks = main.apply_control_batch(user, messages)
+    assert [a["key"] for a in acks] == [m["key"] for m in messages] and [a["type"] for a in acks] == ["ack", "ack", "error", "ack"]
+    db.expire_all()
+    assert goals() == before
+    log = [a for (a,) in db.query(AuditLog.action).filter(AuditLog.match_id == match.id).order_by(AuditLog.id.desc()).limit(3)][::-1]
+    assert log == ["DELETE_EVENT", "EVENT", "EVENT"]
@@ -0,0 +1,42 @@
+import os
+import sys
+import json
+import subprocess
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Corre en otro proceso con su propia base de destino (DATABASE_URL), para no mezclar filas con la liga de los tests
+SCRIPT = """
+import sys, json
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from database import engine
+from models import Base, Club, Category, Team, Match, AuditLog
+import migrate_local_to_cloud
+
+Base.metadata.create_all(engine)
+source = create_engine(f"sqlite:///{sys.argv[1]}")
+Base.metadata.create_all(source)
+with Session(source) as db:
+    db.add_all([Club(id=1, name="Club A", league_series="HONOR"), Club(id=2, name="Club B", league_series="HONOR"), Category(id=1, name="Senior")])
+    db.add_all([Team(id=1, club_id=1, category_id=1), Team(id=2, club_id=2, category_id=1)])
+    db.add(Match(id=1, category_id=1, home_team_id=1, away_team_id=2, home_score=2, away_score=1, is_played=True))
+    db.add_all([AuditLog(match_id=1, action="STATUS", details=f"cambio {i}") for i in range(7)])
+    db.commit()
+runs = [migrate_local_to_cloud.migrate(sys.argv[1], batch_size=3, rebuild=False) for _ in range(2)]
+with engine.begin() as conn: conn.execute(text("UPDATE audit_logs SET details = 'editado en la nube' WHERE id = (SELECT MIN(id) FROM audit_logs)"))
+runs.append(migrate_local_to_cloud.migrate(sys.argv[1], batch_size=3, rebuild=False))
+print(json.dumps(runs, default=str))
+"""
+
+def test_verify_streams_batches_and_detects_changes(tmp_path):
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{os.path.join(tmp_path, 'nube.db')}"}
+    result = subprocess.run([sys.executable, "-c", SCRIPT, os.path.join(tmp_path, "local.db")], cwd=BACKEND, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    first, second, edited = json.loads(result.stdout.strip().splitlines()[-1])
+    entities = ("clubs", "categories", "teams", "matches", "audit_logs")
+    assert all(first[e]["count_ok"] and first[e]["checksum_ok"] for e in entities)
+    assert first["audit_logs"]["inserted"] == first["audit_logs"]["mapped"] == 7
+    # Segunda corrida: nada nuevo y los mismos checksums
+    assert all(second[e]["inserted"] == 0 and second[e]["checksum_cloud"] == first[e]["checksum_cloud"] for e in entities)
+    assert edited["audit_logs"]["count_ok"] and not edited["audit_logs"]["checksum_ok"] and edited["clubs"]["checksum_ok"]
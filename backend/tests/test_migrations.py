@@ -0,0 +1,48 @@
+import os
+import sys
+import sqlite3
+import subprocess
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def migrate(path, revision="head"):
+    # En otro proceso: database.py toma DATABASE_URL al importarse y el de los tests ya está fijado
+    return subprocess.run([sys.executable, "-c", f"from migrate import upgrade_database; upgrade_database({revision!r})"], cwd=BACKEND,
+                          env={**os.environ, "DATABASE_URL": f"sqlite:///{path}"}, capture_output=True, text=True)
+
+def legacy_database(tmp_path, match_days):
+    # Base anterior a los índices únicos: el mismo cruce repetido, con las fechas indicadas (None = sin fecha)
+    path = os.path.join(tmp_path, "legacy.db")
+    assert migrate(path, "0001_baseline").returncode == 0
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO categories (id, name) VALUES (1, 'Senior')")
+        conn.execute("INSERT INTO match_days (id, name) VALUES (1, 'Fecha 1')")
+        conn.executemany("INSERT INTO clubs (id, name) VALUES (?, ?)", [(1, "Club A"), (2, "Club B")])
+        conn.executemany("INSERT INTO teams (id, club_id, category_id) VALUES (?, ?, 1)", [(1, 1), (2, 2)])
+        conn.executemany("INSERT INTO matches (category_id, match_day_id, home_team_id, away_team_id, home_score, away_score, is_played) VALUES (1, ?, 1, 2, 0, 0, 0)",
+                         [(day,) for day in match_days])
+    return path
+
+def test_repeated_fixture_without_match_day_migrates(tmp_path):
+    # NULL en la clave no choca en ux_matches_fixture (SQLite y Postgres): no es un duplicado
+    result = migrate(legacy_database(tmp_path, [None, None, 1]))
+    assert result.returncode == 0, result.stderr
+
+def test_duplicate_fixture_is_reported(tmp_path):
+    result = migrate(legacy_database(tmp_path, [1, 1]))
+    assert result.returncode != 0 and "No se puede crear ux_matches_fixture: hay 1 grupos duplicados" in result.stderr
+
+def test_match_event_ids_are_not_reused_after_upgrade(tmp_path):
+    # Base en 0009 que ya reutilizó ids: el 3 se borró (marca en deleted_match_events) y el 2 se borró y volvió a usarse
+    path = os.path.join(tmp_path, "events.db")
+    assert migrate(path, "0009_job_heartbeat").returncode == 0
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO matches (id, home_score, away_score, is_played) VALUES (1, 0, 0, 0)")
+        conn.executemany("INSERT INTO match_events (id, match_id, event_type, version) VALUES (?, 1, 'GOAL', ?)", [(1, 1), (2, 4)])
+        conn.executemany("INSERT INTO deleted_match_events (event_id, match_id, version) VALUES (?, 1, ?)", [(2, 2), (3, 3)])
+    result = migrate(path)
+    assert result.returncode == 0, result.stderr
+    with sqlite3.connect(path) as conn:
+        assert [e for (e,) in conn.execute("SELECT event_id FROM deleted_match_events")] == [3]
+        conn.execute("INSERT INTO match_events (match_id, event_type) VALUES (1, 'GOAL')")
+        assert conn.execute("SELECT MAX(id) FROM match_events").fetchone()[0] == 4
@@ -0,0 +1,43 @@
+import random
+import pytest
+import crud
+import schemas
+from models import Match, MatchEvent, Player, PlayerStats
+from bench_data import CATEGORIES, legacy_get_leaderboard, legacy_get_aggregated_adultos_leaderboard, legacy_get_top_scorers, legacy_get_club_full_details
+
+CATEGORY_IDS = range(1, len(CATEGORIES) + 1)
+
+@pytest.mark.parametrize("series", ["HONOR", "ASCENSO"])
+@pytest.mark.parametrize("category_id", CATEGORY_IDS)
+def test_leaderboard_matches_legacy(db, category_id, series):
+    assert crud.get_leaderboard(db, category_id, series) == legacy_get_leaderboard(db, category_id, series)
+
+@pytest.mark.parametrize("series", ["HONOR", "ASCENSO", "SIN_CLUBES"])
+def test_adultos_matches_legacy(db, series):
+    assert crud.get_aggregated_adultos_leaderboard(db, series) == legacy_get_aggregated_adultos_leaderboard(db, series)
+
+@pytest.mark.parametrize("series", ["HONOR", "ASCENSO"])
+@pytest.mark.parametrize("category_id", [1, 4, "adultos"])
+def test_top_scorers_match_legacy(db, category_id, series):
+    assert crud.get_top_scorers(db, category_id, series) == legacy_get_top_scorers(db, category_id, series)
+
+def test_incremental_tables_follow_writes(db):
+    # Resultados, goles y borrados por las rutas de escritura: standings y player_stats quedan igual que un recálculo
+    random.seed(7)
+    matches = db.query(Match).all()
+    for m in random.sample(matches, 30):
+        crud.update_match_result(db, m.id, schemas.MatchUpdateResult(home_score=random.randint(0, 5), away_score=random.randint(0, 5), is_played=random.random() < 0.7))
+    for m in random.sample(matches, 30):
+        player = db.query(Player).filter(Player.team_id.in_([m.home_team_id, m.away_team_id])).first()
+        crud.create_match_event(db, schemas.MatchEventCreate(match_id=m.id, player_id=player.id, event_type="GOAL", minute=10))
+    for e in random.sample(db.query(MatchEvent).all(), 15):
+        crud.delete_match_event(db, e.id)
+    for category_id in CATEGORY_IDS:
+        assert crud.get_leaderboard(db, category_id, "HONOR") == legacy_get_leaderboard(db, category_id, "HONOR")
+        assert crud.get_top_scorers(db, category_id, "HONOR") == legacy_get_top_scorers(db, category_id, "HONOR")
+    assert crud.get_aggregated_adultos_leaderboard(db, "ASCENSO") == legacy_get_aggregated_adultos_leaderboard(db, "ASCENSO")
+    assert crud.get_club_full_details(db, 1) == legacy_get_club_full_details(db, 1)
+    def player_stats(): return sorted((s.player_id, s.goals, s.yellow_cards, s.red_cards, s.appearances) for s in db.query(PlayerStats).all() if s.goals or s.yellow_cards or s.red_cards or s.appearances)
+    incremental = player_stats()
+    crud.rebuild_player_stats(db)
+    assert incremental == player_stats()
@@ -17,14 +17,16 @@ function AdminDashboard() {
   const token = localStorage.getItem('renca_token')
   const authHeader = { headers: { Authorization: `Bearer ${token}` } }
   
-  const getCurrentUser = () => {
+  const getTokenPayload = () => {
     try {
       if (!token) return null
-      const payload = JSON.parse(atob(token.split('.')[1]))
-      return payload.sub
+      return JSON.parse(atob(token.split('.')[1]))
     } catch (e) { return null }
   }
-  const currentUser = getCurrentUser()
+  const tokenPayload = getTokenPayload()
+  const currentUser = tokenPayload?.sub ?? null
+  // El rol viene en el token; los tokens emitidos antes del cambio solo traen el nombre
+  const isAdmin = tokenPayload?.role ? tokenPayload.role === 'admin' : currentUser === 'admin_renca'
 
   // Redirigir si no hay sesión
   if (!currentUser) {
@@ -78,7 +80,7 @@ function AdminDashboard() {
 
   // --- PETICIONES API ---
   const fetchUsers = async () => {
-    if (currentUser !== 'admin_renca') return
+    if (!isAdmin) return
     try {
       const res = await axios.get(`${API_BASE_URL}/users`, authHeader)
       setUsers(res.data)
@@ -142,7 +144,7 @@ function AdminDashboard() {
   // --- EFECTOS ---
   useEffect(() => {
     fetchClubs(); fetchCategories(); fetchVenues(); fetchMatchDays();
-    if (currentUser === 'admin_renca') fetchUsers();
+    if (isAdmin) fetchUsers();
   }, [])
 
   useEffect(() => {
@@ -208,7 +210,15 @@ function AdminDashboard() {
           const res = await axios.post(`${API_BASE_URL}/players/upload?team_id=${uploadTeamId}`, formData, {
               headers: { ...authHeader.headers, 'Content-Type': 'multipart/form-data' }
           })
-          const { created, updated } = res.data
+          // La planilla se procesa como job en segundo plano: se consulta hasta que termina
+          setUploadStatus('Procesando...')
+          let job = res.data
+          while (job.status === 'PENDING' || job.status === 'RUNNING') {
+              await new Promise(resolve => setTimeout(resolve, 1000))
+              job = (await axios.get(`${API_BASE_URL}/jobs/${job.id}`, authHeader)).data
+          }
+          if (job.status !== 'DONE') return setUploadStatus(`Error al procesar archivo.`)
+          const { created, updated } = job.result
           setUploadStatus(`Éxito: ${created} nuevos, ${updated} actualizados.`)
           setUploadFile(null)
           fetchTeamRoster(uploadTeamId)
@@ -342,7 +352,7 @@ function AdminDashboard() {
                 <tab.icon className="w-4 h-4" /> {tab.label}
             </button>
           ))}
-          {currentUser === 'admin_renca' && (
+          {isAdmin && (
             <button onClick={() => setActiveTab('users')} className={`px-5 py-2.5 rounded-xl transition-all flex items-center gap-2 text-[11px] font-black uppercase tracking-widest whitespace-nowrap ${activeTab === 'users' ? 'bg-indigo-600 text-white shadow-lg' : 'text-gray-400 hover:text-white hover:bg-gray-700'}`}>
                 <UserPlus className="w-4 h-4" /> Usuarios
             </button>
@@ -355,7 +365,7 @@ function AdminDashboard() {
       {error && <div className="bg-red-500/20 border border-red-500 text-red-200 p-4 rounded-xl mb-6 flex items-center gap-3"><AlertTriangle className="w-5 h-5" />{error}</div>}
 
       {/* --- VISTA: USUARIOS --- */}
-      {activeTab === 'users' && currentUser === 'admin_renca' && (
+      {activeTab === 'users' && isAdmin && (
         <div className="grid grid-cols-1 md:grid-cols-2 gap-8 animate-in fade-in">
            <div className="bg-gray-800 p-8 rounded-[32px] border border-gray-700 h-fit shadow-2xl">
               <h2 className="text-xl font-black mb-6 flex items-center gap-3 uppercase italic text-indigo-400"><UserPlus className="w-6 h-6" /> Crear Operador</h2>
@@ -371,13 +381,13 @@ function AdminDashboard() {
                  {users.map(u => (
                     <div key={u.id} className="bg-gray-900/50 p-4 rounded-2xl flex items-center justify-between border border-gray-800">
                        <div className="flex items-center gap-4">
-                          <div className="w-10 h-10 rounded-full bg-gray-800 flex items-center justify-center border border-gray-700"><ShieldCheck className={`w-5 h-5 ${u.username === 'admin_renca' ? 'text-indigo-500' : 'text-gray-500'}`} /></div>
+                          <div className="w-10 h-10 rounded-full bg-gray-800 flex items-center justify-center border border-gray-700"><ShieldCheck className={`w-5 h-5 ${u.role === 'admin' ? 'text-indigo-500' : 'text-gray-500'}`} /></div>
                           <div>
                              <div className="font-black text-sm text-white uppercase">{u.username}</div>
-                             <div className="text-[9px] font-black text-gray-600 uppercase tracking-tighter">{u.username === 'admin_renca' ? 'Super Administrador' : 'Operador de Liga'}</div>
+                             <div className="text-[9px] font-black text-gray-600 uppercase tracking-tighter">{u.role === 'admin' ? 'Super Administrador' : 'Operador de Liga'}</div>
                           </div>
                        </div>
-                       {u.username !== 'admin_renca' && (
+                       {u.role !== 'admin' && (
                           <button onClick={() => handleDeleteUser(u.id)} className="text-red-500/20 hover:text-red-500 p-2 transition-all"><Trash2 className="w-5 h-5" /></button>
                        )}
                     </div>
@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback } from 'react'
+import { useState, useEffect, useCallback, useRef } from 'react'
 import axios from 'axios'
 import { Save, Flag, Trash2, ArrowLeft, Search, Lock, Unlock } from 'lucide-react'
 
@@ -31,11 +31,48 @@ function MatchControl({ match, onClose }: { match: any, onClose: () => void }) {
 
   useEffect(() => { fetchMatchData() }, [fetchMatchData])
 
+  // CANAL EN VIVO: una conexión autenticada; cada evento lleva una key para que los reintentos no dupliquen
+  const socketRef = useRef<WebSocket | null>(null)
+  const outboxRef = useRef<Map<string, any>>(new Map())
+
+  useEffect(() => {
+    let closed = false
+    let retry: ReturnType<typeof setTimeout>
+    const connect = () => {
+      // El token va en el primer mensaje y no en la URL, que queda en los logs de acceso
+      const ws = new WebSocket(`${API_BASE_URL.replace(/^http/, 'ws')}/ws/match-control`)
+      socketRef.current = ws
+      ws.onopen = () => ws.send(JSON.stringify({ type: 'auth', token }))
+      ws.onmessage = (msg) => {
+        const data = JSON.parse(msg.data)
+        if (data.type === 'ready') outboxRef.current.forEach(m => ws.send(JSON.stringify(m)))
+        if (data.type === 'ack' || data.type === 'error') {
+          outboxRef.current.delete(data.key)
+          if (data.type === 'error') alert(data.detail)
+          fetchMatchData()
+        }
+      }
+      ws.onclose = () => { if (!closed) retry = setTimeout(connect, 2000) }
+    }
+    connect()
+    return () => { closed = true; clearTimeout(retry); socketRef.current?.close() }
+  }, [fetchMatchData])
+
+  const sendControl = (message: any) => {
+    const ws = socketRef.current
+    if (!ws || ws.readyState !== WebSocket.OPEN) return false
+    const payload = { ...message, key: crypto.randomUUID() }
+    outboxRef.current.set(payload.key, payload)
+    ws.send(JSON.stringify(payload))
+    return true
+  }
+
   // CÁLCULO DE MARCADOR EN TIEMPO REAL
   const currentHomeScore = events.filter(e => e.event_type === 'GOAL' && e.player.team_id === match.home_team_id).length
   const currentAwayScore = events.filter(e => e.event_type === 'GOAL' && e.player.team_id === match.away_team_id).length
 
   const handleAddEvent = async (playerId: number, type: string) => {
+    if (sendControl({ type: 'event', match_id: match.id, player_id: playerId, event_type: type, minute: parseInt(eventMinute) || 0 })) return setEventMinute('')
     try {
       await axios.post(`${API_BASE_URL}/match-events`, { 
         match_id: match.id, 
@@ -49,6 +86,7 @@ function MatchControl({ match, onClose }: { match: any, onClose: () => void }) {
   }
 
   const handleDeleteEvent = async (id: number) => {
+    if (sendControl({ type: 'delete', event_id: id })) return
     try {
       await axios.delete(`${API_BASE_URL}/match-events/${id}`, authHeader)
       fetchMatchData()
@@ -40,16 +40,18 @@ function PublicDashboard() {
   }, [])
 
   useEffect(() => {
-    if (activeView === 'fixture') {
-      fetchMatches()
-      const interval = setInterval(fetchMatches, 10000)
-      return () => clearInterval(interval)
-    } else if (activeView === 'scorers') {
-      fetchScorers()
-    } else if (selectedCategoryId) {
-      fetchLeaderboard()
-    }
-  }, [selectedCategoryId, adultSeries, activeView])
+    if (!selectedCategoryId) return
+    fetchSnapshot()
+    if (activeView !== 'fixture') return
+    // El feed en vivo avisa de goles y resultados al instante; el polling queda como respaldo
+    const interval = setInterval(fetchSnapshot, 10000)
+    const live = selectedCategoryId !== 'adultos' ? new EventSource(`${API_BASE_URL}/live/stream?category_id=${selectedCategoryId}&series=${adultSeries}`) : null
+    live?.addEventListener('score', fetchSnapshot)
+    live?.addEventListener('event', fetchSnapshot)
+    live?.addEventListener('event_deleted', fetchSnapshot)
+    live?.addEventListener('resync', fetchSnapshot)
+    return () => { clearInterval(interval); live?.close() }
+  }, [selectedCategoryId, adultSeries, activeView, matchDays, showAllMatchDays])
 
   const fetchCategories = async () => {
     try {
@@ -66,36 +68,36 @@ function PublicDashboard() {
     } catch (e) { console.error(e) }
   }
 
-  const fetchLeaderboard = async () => {
+  const fetchSnapshot = async () => {
     try {
-      let url = `${API_BASE_URL}/leaderboard/${selectedCategoryId}?series=${adultSeries}`
-      if (String(selectedCategoryId) === 'adultos') url = `${API_BASE_URL}/leaderboard/aggregated/adultos?series=${adultSeries}`
-      const res = await axios.get(url)
-      setLeaderboard(res.data || [])
+      // Fixture, tabla y goleadores en un solo request (el servidor los arma con una sesión y los cachea juntos).
+      // En la versión lite cada club y recinto viene una vez en una tabla; acá se rearman los objetos anidados.
+      // Sin el fixture completo solo se piden los partidos desde la fecha en curso.
+      const firstDay = showAllMatchDays ? null : getVisibleDays().map(d => d.start_date).sort()[0]
+      const res = await axios.get(`${API_BASE_URL}/snapshot/${selectedCategoryId}?series=${adultSeries}&view=lite${firstDay ? `&from=${firstDay}` : ''}`)
+      const { clubs = {}, venues = {} } = res.data
+      setMatches((res.data.matches || []).map((m: any) => ({
+        ...m,
+        home_team: { id: m.home_team_id, club_id: m.home_club_id, club: clubs[m.home_club_id] },
+        away_team: { id: m.away_team_id, club_id: m.away_club_id, club: clubs[m.away_club_id] },
+        venue: venues[m.venue_id] ?? null,
+      })))
+      setLeaderboard(res.data.standings || [])
+      setScorers(res.data.top_scorers || [])
     } catch (e) { console.error(e) }
   }
 
-  const fetchMatches = async () => {
-    if (selectedCategoryId === 'adultos') return setMatches([])
-    try {
-      const res = await axios.get(`${API_BASE_URL}/matches/${selectedCategoryId}?series=${adultSeries}`)
-      setMatches(res.data || [])
-    } catch (e) { console.error(e) }
-  }
-
-  const fetchScorers = async () => {
-    try {
-        const res = await axios.get(`${API_BASE_URL}/top-scorers/${selectedCategoryId}?series=${adultSeries}`)
-        setScorers(res.data || [])
-    } catch (e) { console.error(e); setScorers([]) }
+  const getVisibleDays = () => {
+    const now = new Date()
+    let visibleDays = showAllMatchDays ? matchDays : matchDays.filter(day => new Date(day.end_date) >= now)
+    if (visibleDays.length === 0 && matchDays.length > 0 && !showAllMatchDays) visibleDays = [[...matchDays].sort((a,b) => new Date(b.end_date).getTime() - new Date(a.end_date).getTime())[0]]
+    return visibleDays
   }
 
   const getMatchesByDay = () => {
     const grouped: Record<string, any[]> = {}
     if (!matchDays) return {}
-    const now = new Date()
-    let visibleDays = showAllMatchDays ? matchDays : matchDays.filter(day => new Date(day.end_date) >= now)
-    if (visibleDays.length === 0 && matchDays.length > 0 && !showAllMatchDays) visibleDays = [[...matchDays].sort((a,b) => new Date(b.end_date).getTime() - new Date(a.end_date).getTime())[0]]
+    const visibleDays = getVisibleDays()
     visibleDays.forEach(day => { grouped[day.name] = [] })
     if (showAllMatchDays) grouped['Otros'] = []
     matches.forEach(m => {